@@ -1,23 +1,27 @@
-from aiohttp.web import Request, Response, json_response
+from aiohttp.web import Request, Response, StreamResponse, json_response
 import psycopg2
 from typing import Union
-from cerberus import Validator
-from .utils import session_token
-from .db.DocumentRepository import DocumentRepository
-from .db.HistoryRepository import HistoryRepository
-import app.UserController as UserController
+from .utils import auth, pagination
+from .utils.pagination import PaginationError
+from .utils.streaming import write_line
+from .db.UserRepository import UserRepository
 
-async def index(request: Request) -> Response:
+
+async def index(request: Request) -> Union[Response, StreamResponse]:
   """
-  Return a list containing the history of the user's summarization requests
+  Return a page of the history of the user's summarization requests, most
+  recent first. The page holds at most `limit` entries, starting after the
+  entry of the `cursor` of the previous page. With `stream=true`, the entries
+  are streamed as lines of newline-delimited JSON instead, until there is no
+  entry left or `limit` of them are streamed.
   :param request: aiohttp.web.Request
   :return: Coroutine object that returns aiohttp.web.Response
   """
-  string_token = UserController.get_request_session_token(request)
+  string_token = auth.get_request_session_token(request)
   user_id = request.match_info['user_id']
 
   # Check that the user is logged
-  if UserController.has_access_right(string_token, user_id) is False:
+  if auth.has_access_right(string_token, user_id) is False:
     return json_response(
         status=404,
         data={
@@ -25,35 +29,108 @@ async def index(request: Request) -> Response:
           'message': 'The user must be logged in to access his or her history.'
         }
       )
-      
-   
+
+  is_streamed = request.query.get('stream') == 'true'
+  try:
+    limit = pagination.get_limit(
+      request.query.get('limit'), None if is_streamed else
+      pagination.DEFAULT_PAGE_SIZE
+    )
+    cursor = request.query.get('cursor')
+    after = None if cursor is None else UserRepository.HistoryCursor(
+      *pagination.decode_cursor(cursor)
+    )
+  except PaginationError as error:
+    return json_response(
+      status=400,
+      data={
+        'status': 400,
+        'message': 'Could not grab user\'s history information',
+        'errors': str(error)
+      }
+    )
+
   user = UserRepository(request.app['db_pool'])
+  if is_streamed:
+    return await stream_history(request, user, user_id, after, limit)
+
   try:
-    user_hist = await user.get_history_by_id(user_id)
+    user_hist = await user.get_history_by_id(user_id, limit, after)
   except psycopg2.Error as error:
     return json_response(
       status=400,
       data={
         'status': 400,
         'message': 'Could not grab user\'s history information',
-        'errors': error
+        'errors': str(error)
       }
     )
-    
-  if user_hist is None:
-    user_hist = []
-  else:
-    user_hist = list(map(lambda history_tuple: {
-      'url': history_tuple[0],
-      'summarizer_type': history_tuple[1],
-      'accessedAt': str(history_tuple[2])
-    }, user_hist.history))
-      
+
   return json_response(
     status=200,
     data={
       'status': 200,
       'message': 'The history of the user has been successfully found.',
-      'history': user_hist
+      'history': [
+        {
+          'url': url,
+          'summarizer_type': summarizer_type,
+          'accessedAt': str(accessed_at)
+        }
+        for url, summarizer_type, accessed_at in user_hist.history
+      ],
+      'nextCursor':
+        None if user_hist.next_cursor is None
+        else pagination.encode_cursor(user_hist.next_cursor)
     }
   )
+
+async def stream_history(
+    request: Request,
+    user: UserRepository,
+    user_id: str,
+    after: Union[UserRepository.HistoryCursor, None],
+    limit: Union[int, None]
+) -> StreamResponse:
+  """
+  Stream the history of a user, entry-by-entry, as lines of newline-delimited
+  JSON. Every entry has the cursor to resume the stream after it. The history
+  is read a page of at most MAX_PAGE_SIZE entries at a time, and no DB
+  connection is held while a page is written.
+  :param request: aiohttp.web.Request
+  :param user:
+  :param user_id:
+  :param after: cursor of the entry to start after, None to start from the
+  most recent one
+  :param limit: max. no. of entries, None for all of them
+  :return: Coroutine object that returns aiohttp.web.StreamResponse
+  """
+  response = StreamResponse(
+    status=200,
+    headers={'Content-Type': 'application/x-ndjson'}
+  )
+  await response.prepare(request)
+
+  history = user.stream_history_by_id(
+    user_id, after, limit, pagination.MAX_PAGE_SIZE
+  )
+  try:
+    async for url, summarizer_type, accessed_at, history_id in history:
+      await write_line(response, {
+        'url': url,
+        'summarizer_type': summarizer_type,
+        'accessedAt': str(accessed_at),
+        'cursor': pagination.encode_cursor((accessed_at, str(history_id)))
+      })
+  except psycopg2.Error as error:
+    await write_line(response, {
+      'status': 400,
+      'message': 'Could not grab user\'s history information',
+      'errors': str(error)
+    })
+  finally:
+    # The client may have gone away before the whole history was streamed
+    await history.aclose()
+
+  await response.write_eof()
+  return response
@@ -0,0 +1,38 @@
+from aiohttp.web import Request, Response, json_response
+from typing import NamedTuple
+
+
+def to_json(stats: NamedTuple) -> dict:
+  """
+  Convert the counters of a component to JSON, with camel-cased keys
+  :param stats: counters of the component
+  :return:
+  """
+  def camel_case(name: str) -> str:
+    first, *rest = name.split('_')
+    return first + ''.join(word.capitalize() for word in rest)
+
+  return {camel_case(name): value for name, value in stats._asdict().items()}
+
+async def index(request: Request) -> Response:
+  """
+  Return the counters of the in-process caches, the worker pools and the pool
+  of DB connections
+  :param request: aiohttp.web.Request
+  :return: Coroutine object that returns aiohttp.web.Response
+  """
+  return json_response(
+    status=200,
+    data={
+      'status': 200,
+      'message': 'The following are the current metrics.',
+      'data': {
+        'summaryCache': to_json(request.app['summary_cache'].stats()),
+        'pageCache': to_json(request.app['page_cache'].stats()),
+        'summaryFlights': to_json(request.app['summary_flights'].stats()),
+        'summarizerPool': to_json(request.app['summarizer_pool'].stats()),
+        'extractionPool': to_json(request.app['extraction_pool'].stats()),
+        'dbPool': to_json(request.app['db_pool'].stats())
+      }
+    }
+  )
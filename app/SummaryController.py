@@ -1,50 +1,533 @@
 from .db.DocumentRepository import DocumentRepository
 from .db.HistoryRepository import HistoryRepository
+from .db.SummaryRepository import SummaryRepository
+from .db import utils as db_utils
 from .utils import auth, session_token
+from .utils.cache import LRUCache, content_hash
+from .utils.workers import WorkerPool
+from .utils.fetcher import Fetcher, FetchError
+from .utils.page_cache import PageCache, CachedPage
+from .utils.singleflight import normalize_url
+from .utils.streaming import write_line, write_event
+from .utils import ingestion
+from .utils.ingestion import ContentTooLargeError
 
-from aiohttp.web import Request, Response, json_response
+from aiohttp.web import (
+  Application, Request, Response, StreamResponse, json_response
+)
+import asyncio
+import json
 import psycopg2
-from typing import Union
+import pytz
+from os import getenv
+from datetime import datetime, timedelta
+from typing import Union, List, Dict, Tuple, NamedTuple, AsyncIterable
 from cerberus import Validator
 from .summarizers import Summarizer
-from bs4 import BeautifulSoup
-import urllib.request
 from readability import readability
+import lxml.etree
+import lxml.html
+import re
 
 
-def extract_text_from_html(html: Union[str, None]) -> str:
+# Documents older than this are fetched again rather than answered from the
+# stored contents and summaries
+DOCUMENT_MAX_AGE = timedelta(seconds=int(getenv('DOCUMENT_MAX_AGE', '86400')))
+# Max. size of the body of a summary request (mostly the DOM content)
+MAX_DOM_CONTENT_BYTES = int(
+  getenv('MAX_DOM_CONTENT_BYTES', str(10 * 1024 * 1024))
+)
+# Max. no. of URLs of a batch summary request
+BATCH_MAX_URLS = int(getenv('BATCH_MAX_URLS', '1000'))
+# Max. no. of URLs of a batch that are summarized at the same time
+BATCH_CONCURRENCY = int(getenv('BATCH_CONCURRENCY', '10'))
+# No. of summarized URLs of a batch whose documents, summaries and history
+# are stored together
+BATCH_WRITE_SIZE = int(getenv('BATCH_WRITE_SIZE', '100'))
+
+# Line breaks, as split by str.splitlines
+LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+# A run of text that spans neither line breaks nor two spaces in a row,
+# without its surrounding whitespace
+TEXT_CHUNK_RE = re.compile(
+  r'\S+(?:(?:[^\S {}]| (?! ))+\S+)*'.format(LINE_BREAKS)
+)
+
+
+class SummaryError(Exception):
   """
-  Given a string with HTML, it extracts the text within it
+  Raised when a document can not be summarized, with the response to give
+  """
+
+  def __init__(
+      self,
+      status: int,
+      message: str,
+      errors: Union[str, dict, None]=None
+  ):
+    super().__init__(message)
+    self.status = status
+    self.message = message
+    self.errors = errors
+
+
+def get_unexpected_error(error: Exception) -> SummaryError:
+  """
+  Get the response to give for an error a document was not expected to fail
+  with, e.g. when its page can not be parsed or the DB is not available, for
+  the responses that are streamed and must go on for other documents
+  :param error:
+  :return:
+  """
+  if isinstance(error, psycopg2.Error):
+    return SummaryError(
+      400, 'Could not get or store the document.', str(error)
+    )
+  if isinstance(error, asyncio.TimeoutError):
+    return SummaryError(
+      503, 'Could not get or store the document in time.', 'Timed out.'
+    )
+  return SummaryError(
+    500, 'Could not summarize the document.', repr(error)
+  )
+
+
+class SummarizedDocument(NamedTuple):
+  # Stored document at the URL, None if there is none
+  document: Union[DocumentRepository.DocumentMetaView, None]
+  is_fresh: bool  # Whether the stored contents are fresh
+  text: str  # Text the summaries were computed from
+  summaries: Dict[str, List[str]]
+
+
+class SummaryRequest(NamedTuple):
+  # Validated payload of the request
+  body: dict
+  # Id of the logged in user
+  user_id: str
+  summarizer_types: List[str]
+
+
+class BatchSummary(NamedTuple):
+  url: str
+  document_id: Union[str, None]  # None for a document that is not stored
+  text: Union[str, None]  # Contents to store, None if they are stored
+  summaries: Dict[str, List[str]]
+  new_types: List[str]  # Summarizer types of the summaries to store
+
+
+def extract_text_from_tree(tree: lxml.html.HtmlElement) -> str:
+  """
+  Extract the text within a parsed HTML tree, with every line and every
+  multi-headline (i.e. phrases separated by two or more spaces) stripped and
+  joined by a single space
   Credit: part of this code was based on Hugh Bothwell's code as found
   in: https://stackoverflow.com/questions/22799990/beatifulsoup4-get-text-still-has-javascript
-  :param request: aiohttp.web.Request
-  :return: Coroutine object that returns aiohttp.web.Response
+  :param tree: lxml.html.HtmlElement, whose script and style tags are removed
+  :return:
   """
-  soup = BeautifulSoup(html, "html.parser")
-  
-  # Remove all script and style tags in the html
-  for s in soup(["style", "script"]):
-    s.extract()
-
-  text = soup.get_text()
-  # Break the text into lines and also remove all leading and trailing space 
-  # in any of the lines
-  lines = (line.strip() for line in text.splitlines())
-  # Break multi-headlines into individual lines
-  chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-  # Remove all blank lines
-  text = ' '.join(chunk for chunk in chunks if chunk)
+  lxml.etree.strip_elements(tree, 'script', 'style', with_tail=False)
+
+  return ' '.join(TEXT_CHUNK_RE.findall(tree.text_content()))
+
+def extract_text_from_html(html: Union[str, None]) -> str:
+  """
+  Given a string with HTML, it extracts the text within it
+  :param html:
+  :return:
+  """
+  if not html or html.isspace():
+    return ''
+  return extract_text_from_tree(lxml.html.fromstring(html))
   
+def extract_article_text(html: bytes) -> str:
+  # Entry point of the extraction workers
+  document = readability.Document(html)
+  article = document.summary()
+
+  # The summary is serialized from the tree readability parsed and cleaned,
+  # so the text is extracted from that same tree rather than parsing the
+  # summary again
+  tree = getattr(document, 'html', None)
+  if tree is None:
+    return extract_text_from_html(article)
+  return extract_text_from_tree(tree)
+
+async def fetch_page(
+    url: str,
+    fetcher: Fetcher,
+    page_cache: PageCache
+) -> Tuple[Fetcher.Response, Union[CachedPage, None]]:
+  """
+  Fetch a web page, or only check that it did not change since it was cached
+  :param url:
+  :param fetcher: fetches the web page
+  :param page_cache: articles of the web pages fetched before
+  :return: response and cached page, None if the page was not cached
+  """
+  cached_page = await page_cache.get(url)
+  page = await fetcher.fetch(url, page_cache.conditional_headers(cached_page))
+  if cached_page is not None:
+    page_cache.record_revalidation(not_modified=page.status == 304)
+  return page, cached_page
+
+async def extract_page_article(
+    url: str,
+    page: Fetcher.Response,
+    cached_page: Union[CachedPage, None],
+    pool: WorkerPool,
+    page_cache: PageCache
+) -> str:
+  """
+  Extract the text of the article of a fetched web page, reusing the cached
+  article when the page did not change
+  :param url:
+  :param page: response of fetch_page
+  :param cached_page: cached page of fetch_page
+  :param pool: workers parsing the web page
+  :param page_cache: articles of the web pages fetched before
+  :return:
+  """
+  if cached_page is not None and page.status == 304:
+    return cached_page.text
+
+  # Parsing is CPU-bound, so it runs in a worker process
+  text = await pool.run(extract_article_text, page.body)
+
+  await page_cache.put(CachedPage(
+    url, page.headers.get('ETag'), page.headers.get('Last-Modified'), text
+  ))
   return text
-  
-def extract_article(url: Union[str, None]) -> str:
-  page = urllib.request.urlopen(url)
-  html = page.read()
 
-  article = readability.Document(html).summary()
-  
-  return extract_text_from_html(article)
-  
+async def extract_article(
+    url: Union[str, None],
+    fetcher: Fetcher,
+    pool: WorkerPool,
+    page_cache: PageCache
+) -> str:
+  """
+  Fetch a web page and extract the text of its article. A page that was
+  cached before is only fetched again if it changed since.
+  :param url:
+  :param fetcher: fetches the web page
+  :param pool: workers parsing the web page
+  :param page_cache: articles of the web pages fetched before
+  :return:
+  """
+  page, cached_page = await fetch_page(url, fetcher, page_cache)
+  return await extract_page_article(url, page, cached_page, pool, page_cache)
+
+def get_summary_cache_key(text_hash: str, summarizer_type: str) -> tuple:
+  return (
+    text_hash, summarizer_type, Summarizer.get_summary_length(summarizer_type)
+  )
+
+def get_cached_summaries(
+    cache: LRUCache,
+    text_hash: str,
+    summarizer_types: List[str]
+) -> Dict[str, List[str]]:
+  """
+  Look up the cached summaries of a text
+  :param cache: summary cache
+  :param text_hash: content hash of the text
+  :param summarizer_types:
+  :return: summary of every summarizer type that is cached
+  """
+  summaries = {}
+  for summarizer_type in summarizer_types:
+    summary = cache.get(get_summary_cache_key(text_hash, summarizer_type))
+    if summary is not None:
+      summaries[summarizer_type] = summary
+  return summaries
+
+def cache_summaries(
+    cache: LRUCache,
+    text_hash: str,
+    summaries: Dict[str, List[str]]
+) -> None:
+  for summarizer_type, summary in summaries.items():
+    cache.put(get_summary_cache_key(text_hash, summarizer_type), summary)
+
+async def summarize_text(
+    cache: LRUCache,
+    pool: WorkerPool,
+    text: str,
+    summarizer_types: List[str],
+    backend: Union[str, None]
+) -> Dict[str, List[str]]:
+  """
+  Summarize a text, tokenizing it only once for all the summarizer types
+  whose summary is not cached yet
+  :param cache: summary cache
+  :param pool: workers running the summarizers
+  :param text:
+  :param summarizer_types:
+  :param backend: summarizer backend
+  :return: summary of every summarizer type
+  """
+  text_hash = content_hash(text)
+  summaries = get_cached_summaries(cache, text_hash, summarizer_types)
+  missing_types = [
+    summarizer_type for summarizer_type in summarizer_types
+    if summarizer_type not in summaries
+  ]
+  if missing_types:
+    new_summaries = await pool.run(
+      Summarizer.summarize_payload,
+      text.encode('utf-8'),
+      tuple(missing_types),
+      backend
+    )
+    cache_summaries(cache, text_hash, new_summaries)
+    summaries.update(new_summaries)
+  return summaries
+
+def get_fresh_after() -> datetime:
+  # Documents fetched before this time are stale and must be fetched again
+  return datetime.now(tz=pytz.timezone('US/Eastern')) - DOCUMENT_MAX_AGE
+
+async def extract_url_article_phases(
+    app: Application,
+    url: str
+) -> AsyncIterable[Tuple[str, Union[str, None]]]:
+  """
+  Extract the text of the article of the web page at a URL, reporting every
+  phase as soon as it is done
+  :param app: aiohttp.web.Application
+  :param url:
+  :return: ('fetched', None) once the web page is fetched and then
+  ('extracted', text)
+  :raises SummaryError: if the web page can not be accessed or its article
+  can not be extracted in time
+  """
+  try:
+    page, cached_page = await fetch_page(
+      url, app['fetcher'], app['page_cache']
+    )
+    yield 'fetched', None
+    yield 'extracted', await extract_page_article(
+      url, page, cached_page, app['extraction_pool'], app['page_cache']
+    )
+  except FetchError as error:
+    raise SummaryError(
+      400,
+      'Could not access the web page through the given URL.',
+      str(error)
+    )
+  except asyncio.TimeoutError:
+    raise SummaryError(
+      504,
+      'Could not extract the article of the web page in time.',
+      'Extraction timed out.'
+    )
+
+async def extract_url_article(app: Application, url: str) -> str:
+  """
+  Extract the text of the article of the web page at a URL
+  :param app: aiohttp.web.Application
+  :param url:
+  :return:
+  :raises SummaryError: if the web page can not be accessed or its article
+  can not be extracted in time
+  """
+  text = None
+  async for _, text in extract_url_article_phases(app, url):
+    pass
+  return text
+
+async def store_document(
+    app: Application,
+    user_id: str,
+    url: str,
+    document: Union[DocumentRepository.DocumentMetaView, None],
+    is_fresh: bool,
+    text: str,
+    summaries: Dict[str, List[str]],
+    new_types: List[str],
+    summarizer_types: List[str]
+) -> str:
+  """
+  Store a summarized document, unless its stored contents are fresh, and the
+  summaries computed from its contents, and record in the user's history
+  that it was summarized, all through a single statement
+  :param app: aiohttp.web.Application
+  :param user_id: id of the user summarizing the document
+  :param url:
+  :param document: stored document at the URL, None if there is none
+  :param is_fresh: whether the stored contents are fresh
+  :param text: text the summaries were computed from
+  :param summaries: summary of every summarizer type
+  :param new_types: summarizer types of the summaries to store
+  :param summarizer_types: summarizer types the user summarized the document
+  through
+  :return: id of the document
+  :raises SummaryError: if the document, its summaries or the history can
+  not be stored
+  """
+  # If the Document has not been summarized before, the Document object that
+  # represents it is created, and stale contents are replaced by the ones
+  # just fetched. Fresh contents are kept, but they may differ from the given
+  # DOM content, in which case the summaries are not stored.
+  is_current = not is_fresh or content_hash(text) == document.body_hash
+  try:
+    return await DocumentRepository(app['db_pool']).upsert_with_history(
+      DocumentRepository.DocumentCreate(user_id, url, text),
+      is_fresh,
+      [
+        (
+          summarizer_type,
+          Summarizer.get_summary_length(summarizer_type),
+          summaries[summarizer_type]
+        )
+        for summarizer_type in new_types
+      ] if is_current else [],
+      summarizer_types
+    )
+  except psycopg2.Error as error:
+    raise SummaryError(
+      400, 'Could not store the summarized document', str(error)
+    )
+
+async def get_stored_summaries(
+    app: Application,
+    url: str,
+    summarizer_types: List[str],
+    user_id: str
+) -> Dict[str, List[str]]:
+  """
+  Look up the stored summaries of a recently fetched document, recording in
+  the user's history that it was summarized at the same time
+  :param app: aiohttp.web.Application
+  :param url:
+  :param summarizer_types:
+  :param user_id: id of the user summarizing the document
+  :return: summary of every summarizer type that is stored
+  :raises SummaryError: if the stored summaries can not be looked up
+  """
+  try:
+    stored_summaries = await SummaryRepository(
+      app['db_pool']
+    ).getby_url_with_history(
+      url,
+      [
+        (summarizer_type, Summarizer.get_summary_length(summarizer_type))
+        for summarizer_type in summarizer_types
+      ],
+      get_fresh_after(),
+      user_id
+    )
+  except psycopg2.Error as error:
+    raise SummaryError(
+      400, 'Could not get the stored summaries of the document', str(error)
+    )
+  return {
+    stored_summary.summarizer_type: stored_summary.sentences
+    for stored_summary in stored_summaries
+  }
+
+async def summarize_url(
+    app: Application,
+    url: str,
+    dom_content: Union[str, None],
+    summarizer_types: List[str],
+    backend: Union[str, None]
+) -> SummarizedDocument:
+  """
+  Summarize the document at a URL, leaving it to the caller to store the
+  document and its summaries
+  :param app: aiohttp.web.Application
+  :param url:
+  :param dom_content: DOM content of the document's website, None to fetch
+  the document
+  :param summarizer_types:
+  :param backend: summarizer backend
+  :return:
+  :raises SummaryError: if the document can not be summarized
+  """
+  # Check whether this Document has been summarized before and whether its
+  # contents are still fresh
+  doc = DocumentRepository(app['db_pool'])
+  document = await doc.getby_url_meta(url)
+  is_fresh = document is not None and \
+    document.summarized_at >= get_fresh_after()
+
+  # Extract the text of the document from the DOM content, or else from the
+  # stored contents as long as they are fresh. The contents are only loaded
+  # in the latter case.
+  if dom_content:
+    text = dom_content
+  elif is_fresh:
+    text = await doc.get_contents(document.body_hash)
+  else:
+    text = await extract_url_article(app, url)
+
+  summaries = await summarize_text(
+    app['summary_cache'],
+    app['summarizer_pool'],
+    text,
+    summarizer_types,
+    backend
+  )
+  return SummarizedDocument(document, is_fresh, text, summaries)
+
+async def read_request_body(request: Request) -> Union[dict, None]:
+  """
+  Read the payload of a summary request. It is either JSON or, with a
+  text/html content type, the DOM content of the document's website with the
+  rest of the payload as query parameters. The HTML is then streamed into a
+  parser and only its text is kept.
+  :param request: aiohttp.web.Request
+  :return: payload, None if it is not valid or its charset is not known
+  :raises ContentTooLargeError: if the body has more than
+  MAX_DOM_CONTENT_BYTES bytes
+  """
+  ingestion.check_content_length(request.content_length, MAX_DOM_CONTENT_BYTES)
+
+  if request.content_type == 'text/html':
+    request_body = {}
+    for key in set(request.query.keys()):
+      values = request.query.getall(key)
+      request_body[key] = values[0] if len(values) == 1 else values
+    try:
+      text = await ingestion.read_html_text(
+        request.content, MAX_DOM_CONTENT_BYTES, request.charset or 'utf-8'
+      )
+    except LookupError:
+      return None
+    request_body['domContent'] = ' '.join(TEXT_CHUNK_RE.findall(text))
+    return request_body
+
+  body = await ingestion.read_body(request.content, MAX_DOM_CONTENT_BYTES)
+  try:
+    return json.loads(body.decode(request.charset or 'utf-8'))
+  except (LookupError, ValueError):
+    return None
+
+def get_requested_types(requested_type: Union[str, List[str]]) -> Union[
+  List[str], None
+]:
+  """
+  Get the summarizer types requested through a single type, a list of types
+  or ALL of them
+  :param requested_type:
+  :return: summarizer types without duplicates, None if any is not valid
+  """
+  if requested_type == Summarizer.ALL_SUMMARIZER_TYPES:
+    summarizer_types = Summarizer.SUMMARIZER_TYPES
+  elif isinstance(requested_type, list):
+    # Drop duplicated types while keeping the order they were requested in
+    summarizer_types = list(dict.fromkeys(requested_type))
+  else:
+    summarizer_types = [requested_type]
+
+  if not summarizer_types or any(
+    summarizer_type not in Summarizer.SUMMARIZER_TYPES
+    for summarizer_type in summarizer_types
+  ):
+    return None
+  return summarizer_types
+
 async def get_summarizer_types(request: Request) -> Response:
   """
   Return the available summarizer types (i.e. the types of algorithms
@@ -58,134 +541,666 @@ async def get_summarizer_types(request: Request) -> Response:
       'status': 200,
       'message': 'The following are the available summarizer types.',
       'data': {
-        'summarizerTypes': str(Summarizer.SUMMARIZER_TYPES)
+        'summarizerTypes': str(Summarizer.SUMMARIZER_TYPES),
+        'allSummarizerTypes': Summarizer.ALL_SUMMARIZER_TYPES,
+        'summarizerBackends': str(Summarizer.get_available_backends())
       }
     }
   )
   
 
-async def summarize(request: Request) -> Response:
-  """
-  Return a summarized version of the given document
-  :param request: aiohttp.web.Request
-  :return: Coroutine object that returns aiohttp.web.Response
-  """
-  
-  validator = Validator({
+def get_summary_validator() -> Validator:
+  # Validates the payload of a summary request
+  return Validator({
     'url': {'required': True, 'type': 'string'},
     'domContent': {'required': False, 'type': 'string'},
-    'summarizerType': {'required': True, 'type': 'string'}
+    'summarizerType': {
+      'required': True,
+      'type': ['string', 'list'],
+      'schema': {'type': 'string'}
+    },
+    'summarizerBackend': {
+      'required': False,
+      'type': 'string',
+      'allowed': Summarizer.get_available_backends()
+    }
   })
 
+async def read_summary_request(
+    request: Request,
+    validator: Validator,
+    too_large_message: str,
+    invalid_message: str,
+    invalid_type_message: str
+) -> SummaryRequest:
+  """
+  Read and validate the payload of a summary request, ensuring that the user
+  is logged in
+  :param request: aiohttp.web.Request
+  :param validator: validates the payload
+  :param too_large_message: message of the error if the payload is too large
+  :param invalid_message: message of the error if the payload is not valid
+  :param invalid_type_message: message of the error if the summarizer type
+  is not valid
+  :return:
+  :raises SummaryError: with the response to give if the request can not be
+  summarized
+  """
   try:
-    request_body = await request.json()
-  except:
-    request_body = None
+    request_body = await read_request_body(request)
+  except ContentTooLargeError as error:
+    raise SummaryError(413, too_large_message, str(error))
 
   if not validator.validate(request_body):
-    return json_response(
-      status=400,
-      data={
-        'status': 400,
-        'message': 'Payload must be JSON with URL of document, '
-                   'DOM content of the document\'s website and the type of '
-                   'summarizer',
-        'errors': validator.errors
-      }
-    )
-  
+    raise SummaryError(400, invalid_message, validator.errors)
+
   # Ensure that the user is logged in
   string_token = auth.get_request_session_token(request)
   if string_token is None:
-    return json_response(
-        status=404,
-        data={
-          'status': 404,
-          'message': 'The user must be logged in to access his or her history.'
-        }
-      )
+    raise SummaryError(
+      404, 'The user must be logged in to access his or her history.'
+    )
   token = session_token.get_contents(string_token)
+
+  summarizer_types = get_requested_types(request_body.get('summarizerType'))
+  if summarizer_types is None:
+    raise SummaryError(
+      400, invalid_type_message, 'The given summarizer type is not valid.'
+    )
+
+  return SummaryRequest(request_body, token.get('user_id'), summarizer_types)
+
+async def read_document_request(request: Request) -> SummaryRequest:
+  # Read the payload of a request summarizing a single document
+  return await read_summary_request(
+    request,
+    get_summary_validator(),
+    'The DOM content of the document\'s website is too large.',
+    'Payload must be JSON with URL of document, DOM content of the '
+    'document\'s website and the type of summarizer',
+    'Can not summarize document.'
+  )
+
+def get_error_response(error: SummaryError) -> Response:
+  data = {'status': error.status, 'message': error.message}
+  if error.errors is not None:
+    data['errors'] = error.errors
+  return json_response(status=error.status, data=data)
+
+async def summarize(request: Request) -> Response:
+  """
+  Return a summarized version of the given document
+  :param request: aiohttp.web.Request
+  :return: Coroutine object that returns aiohttp.web.Response
+  """
   
-  # Extract the text of the document from the DOM content
   try:
-    if request_body.get('domContent'):
-      text = request_body.get('domContent')
-    else:
-      text = extract_article(request_body.get('url'))
-  except urllib.error.HTTPError as error:
-    return json_response(
-      status=400,
-      data={
-        'status': 400,
-        'message': 'Could not access the web page through the given URL.',
-        'errors': str(error)
-      }
+    summary_request = await read_document_request(request)
+  except SummaryError as error:
+    return get_error_response(error)
+
+  # Summarize the document, either through one summarizer type or several of
+  # them (a list of types or ALL) at once
+  request_body = summary_request.body
+  requested_type = request_body.get('summarizerType')
+  summarizer_types = summary_request.summarizer_types
+  url = request_body.get('url')
+  dom_content = request_body.get('domContent')
+  user_id = summary_request.user_id
+
+  # Unless the DOM content is given, the summaries of a recently fetched
+  # document are answered straight from the DB, which records them in the
+  # user's history at the same time
+  summaries = {}
+  if not dom_content:
+    try:
+      summaries = await get_stored_summaries(
+        request.app, url, summarizer_types, user_id
+      )
+    except SummaryError as error:
+      return get_error_response(error)
+
+  missing_types = [
+    summarizer_type for summarizer_type in summarizer_types
+    if summarizer_type not in summaries
+  ]
+  if missing_types:
+    # Concurrent requests for the same document and summarizer types share a
+    # single summarization. Every request then stores the document and its
+    # summaries, and records them in the user's history, through a single
+    # statement.
+    flight_key = (
+      normalize_url(url),
+      tuple(missing_types),
+      content_hash(dom_content) if dom_content else None
     )
+    try:
+      summarized = await request.app['summary_flights'].run(
+        flight_key,
+        summarize_url,
+        request.app,
+        url,
+        dom_content,
+        missing_types,
+        request_body.get('summarizerBackend')
+      )
+      await store_document(
+        request.app,
+        user_id,
+        url,
+        summarized.document,
+        summarized.is_fresh,
+        summarized.text,
+        summarized.summaries,
+        missing_types,
+        summarizer_types
+      )
+    except SummaryError as error:
+      return get_error_response(error)
+    summaries.update(summarized.summaries)
+
+  # A single summarizer type keeps the response of a single summary
+  if isinstance(requested_type, str) and \
+      requested_type != Summarizer.ALL_SUMMARIZER_TYPES:
+    data = {
+      'summarizerType': requested_type,
+      'summary': summaries[requested_type]
+    }
+  else:
+    data = {
+      'summarizerTypes': summarizer_types,
+      'summaries': summaries
+    }
    
-  # Summarize the document 
-  summarizer_type = request_body.get('summarizerType')
-  if summarizer_type not in Summarizer.SUMMARIZER_TYPES:
-    return json_response(
-      status=400,
-      data={
-        'status': 400,
-        'message': 'Can not summarize document.',
-        'errors': 'The given summarizer type is not valid.'
-      }
+  return json_response(
+    status=200,
+    data={
+      'status': 200,
+      'message': 'Summarization was successful',
+      'data': data
+    }
+  )
+
+
+async def summarize_batch_url(
+    app: Application,
+    url: str,
+    document: Union[DocumentRepository.DocumentMetaView, None],
+    stored_summaries: List[SummaryRepository.SummaryView],
+    summarizer_types: List[str],
+    backend: Union[str, None],
+    fetched_after: datetime
+) -> BatchSummary:
+  """
+  Summarize the document at a URL of a batch, leaving it to the caller to
+  store the document and its summaries
+  :param app: aiohttp.web.Application
+  :param url:
+  :param document: stored document at the URL, None if there is none
+  :param stored_summaries: stored summaries of the document that are fresh
+  :param summarizer_types:
+  :param backend: summarizer backend
+  :param fetched_after: oldest time the stored contents may have been
+  fetched at
+  :return:
+  :raises SummaryError: if the document can not be summarized
+  """
+  summaries = {
+    stored_summary.summarizer_type: stored_summary.sentences
+    for stored_summary in stored_summaries
+  }
+  new_types = [
+    summarizer_type for summarizer_type in summarizer_types
+    if summarizer_type not in summaries
+  ]
+  if not new_types:
+    return BatchSummary(
+      url, stored_summaries[0].document_id, None, summaries, new_types
     )
-  
-  # Summarize the text
-  summary = Summarizer.summarize(text, summarizer_type)
-  
-  # Check whether this Document has been summarized before.
-  # If not, create the Document object in the DB that represents the document
-  # that was summarized.
-  doc = DocumentRepository(request.app['db_pool'])
-  new_doc = await doc.getby_url(request_body.get('url'))
-  if new_doc is None:
-    try:
-      new_doc = await doc.create(DocumentRepository.DocumentCreate(
-        token.get('user_id'),
-        request_body.get('url'),
-        text
-      ))
-    except psycopg2.Error as error:
-      return json_response(
-        status=400,
-        data={
-          'status': 400,
-          'message': 'Could not create Document instance',
-          'errors': str(error)
-        }
+
+  is_fresh = document is not None and document.summarized_at >= fetched_after
+  if is_fresh:
+    text = await DocumentRepository(app['db_pool']).get_contents(
+      document.body_hash
+    )
+  else:
+    text = await extract_url_article(app, url)
+
+  summaries.update(await summarize_text(
+    app['summary_cache'],
+    app['summarizer_pool'],
+    text,
+    new_types,
+    backend
+  ))
+  return BatchSummary(
+    url,
+    None if document is None else document.document_id,
+    None if is_fresh else text,
+    summaries,
+    new_types
+  )
+
+async def store_batch(
+    app: Application,
+    user_id: str,
+    batch: List[BatchSummary],
+    summarizer_types: List[str]
+) -> None:
+  """
+  Store the documents and summaries of summarized URLs of a batch, and record
+  them in the user's history, through a few statements of a single
+  transaction for all of them
+  :param app: aiohttp.web.Application
+  :param user_id: id of the user summarizing the documents
+  :param batch:
+  :param summarizer_types:
+  :return:
+  :raises psycopg2.Error:
+  """
+  # The statements share a single connection, and the whole batch is stored
+  # or none of it is
+  async with db_utils.transaction(app['db_pool']) as transaction:
+    doc = DocumentRepository(transaction)
+    created_docs = await doc.create_many([
+      DocumentRepository.DocumentCreate(user_id, summary.url, summary.text)
+      for summary in batch if summary.document_id is None
+    ])
+    await doc.update_contents_many([
+      (summary.document_id, summary.text)
+      for summary in batch
+      if summary.document_id is not None and summary.text is not None
+    ])
+
+    document_ids = {
+      summary.url: summary.document_id
+      for summary in batch if summary.document_id is not None
+    }
+    document_ids.update({
+      created_doc.url: created_doc.document_id for created_doc in created_docs
+    })
+
+    await SummaryRepository(transaction).create_many([
+      SummaryRepository.SummaryCreate(
+        document_ids[summary.url],
+        summarizer_type,
+        Summarizer.get_summary_length(summarizer_type),
+        summary.summaries[summarizer_type]
       )
-    
-  # Create the History object in the DB that records that this user summarized
-  # this document at this specific time.
+      for summary in batch for summarizer_type in summary.new_types
+    ])
+    await HistoryRepository(transaction).create_many([
+      HistoryRepository.HistoryCreate(
+        user_id,
+        document_ids[summary.url],
+        summarizer_type
+      )
+      for summary in batch for summarizer_type in summarizer_types
+    ])
+
+async def summarize_batch(request: Request) -> StreamResponse:
+  """
+  Summarize the documents at several URLs, streaming the result of every URL
+  as a line of newline-delimited JSON as soon as it is summarized
+  :param request: aiohttp.web.Request
+  :return: Coroutine object that returns aiohttp.web.StreamResponse
+  """
+
+  validator = Validator({
+    'urls': {
+      'required': True,
+      'type': 'list',
+      'minlength': 1,
+      'maxlength': BATCH_MAX_URLS,
+      'schema': {'type': 'string'}
+    },
+    'summarizerType': {
+      'required': True,
+      'type': ['string', 'list'],
+      'schema': {'type': 'string'}
+    },
+    'summarizerBackend': {
+      'required': False,
+      'type': 'string',
+      'allowed': Summarizer.get_available_backends()
+    }
+  })
+
+  try:
+    summary_request = await read_summary_request(
+      request,
+      validator,
+      'The batch is too large.',
+      'Payload must be JSON with the URLs of the documents and the type of '
+      'summarizer',
+      'Can not summarize documents.'
+    )
+  except SummaryError as error:
+    return get_error_response(error)
+  request_body = summary_request.body
+  summarizer_types = summary_request.summarizer_types
+
+  # Look up the stored summaries and documents of every URL at once
+  urls = list(dict.fromkeys(request_body.get('urls')))
+  fetched_after = get_fresh_after()
   try:
-    hist = HistoryRepository(request.app['db_pool'])
-    await hist.create(HistoryRepository.HistoryCreate(
-      token.get('user_id'),
-      new_doc.document_id,
-      summarizer_type
-    ))
+    stored_summaries = await SummaryRepository(
+      request.app['db_pool']
+    ).getby_urls(
+      urls,
+      [
+        (summarizer_type, Summarizer.get_summary_length(summarizer_type))
+        for summarizer_type in summarizer_types
+      ],
+      fetched_after
+    )
+    documents = await DocumentRepository(
+      request.app['db_pool']
+    ).getby_urls_meta([
+      url for url in urls
+      if len(stored_summaries.get(url, [])) < len(summarizer_types)
+    ])
   except psycopg2.Error as error:
     return json_response(
       status=400,
       data={
         'status': 400,
-        'message': 'Could not create History instance',
+        'message': 'Could not get the stored documents.',
         'errors': str(error)
       }
     )
-   
-  return json_response(
+
+  response = StreamResponse(
     status=200,
-    data={
-      'status': 200,
-      'message': 'Summarization was successful',
-      'data': {
-        'summarizerType': summarizer_type,
-        'summary': summary
-      }
-    }
+    headers={'Content-Type': 'application/x-ndjson'}
   )
+  await response.prepare(request)
+
+  # URLs are summarized by BATCH_CONCURRENCY workers, each taking the next
+  # URL of the queue once done with one, and the results are written in the
+  # order they are done in
+  url_queue = asyncio.Queue()
+  for url in urls:
+    url_queue.put_nowait(url)
+  results = asyncio.Queue()
+
+  async def summarize_queued_urls() -> None:
+    while not url_queue.empty():
+      url = url_queue.get_nowait()
+      try:
+        summary = await summarize_batch_url(
+          request.app,
+          url,
+          documents.get(url),
+          stored_summaries.get(url, []),
+          summarizer_types,
+          request_body.get('summarizerBackend'),
+          fetched_after
+        )
+      except SummaryError as error:
+        summary = error
+      except asyncio.CancelledError:
+        raise
+      except Exception as error:
+        # Only this URL fails, rather than the rest of the batch
+        summary = get_unexpected_error(error)
+      results.put_nowait((url, summary))
+
+  async def store(batch: List[BatchSummary]) -> None:
+    try:
+      await store_batch(
+        request.app, summary_request.user_id, batch, summarizer_types
+      )
+    except asyncio.CancelledError:
+      raise
+    except Exception as error:
+      error = get_unexpected_error(error)
+      await write_line(response, {
+        'status': error.status,
+        'message': 'Could not store the summarized documents.',
+        'errors': error.errors,
+        'urls': [summary.url for summary in batch]
+      })
+
+  workers = [
+    asyncio.ensure_future(summarize_queued_urls())
+    for _ in range(min(BATCH_CONCURRENCY, len(urls)))
+  ]
+  batch = []
+  try:
+    for _ in urls:
+      url, summary = await results.get()
+      if isinstance(summary, SummaryError):
+        await write_line(response, {
+          'url': url,
+          'status': summary.status,
+          'message': summary.message,
+          'errors': summary.errors
+        })
+        continue
+
+      batch.append(summary)
+      await write_line(response, {
+        'url': url,
+        'status': 200,
+        'summaries': summary.summaries
+      })
+
+      if len(batch) >= BATCH_WRITE_SIZE:
+        stored_batch, batch = batch, []
+        await store(stored_batch)
+
+    if batch:
+      stored_batch, batch = batch, []
+      await store(stored_batch)
+  finally:
+    # The client may have gone away before every URL was summarized. What is
+    # summarized already is stored all the same, but a failure to store it
+    # can not be reported on the response anymore.
+    for worker in workers:
+      worker.cancel()
+    while not results.empty():
+      _, summary = results.get_nowait()
+      if not isinstance(summary, SummaryError):
+        batch.append(summary)
+    if batch:
+      try:
+        await store_batch(
+          request.app, summary_request.user_id, batch, summarizer_types
+        )
+      except Exception:
+        pass
+
+  await response.write_eof()
+  return response
+
+
+async def write_summary_events(
+    response: StreamResponse,
+    summaries: Dict[str, List[str]],
+    source: str
+) -> None:
+  # Write a summary event for every summary that is stored or cached already
+  for summarizer_type, summary in summaries.items():
+    await write_event(response, 'summary', {
+      'summarizerType': summarizer_type,
+      'source': source,
+      'summary': summary
+    })
+
+async def stream_summaries(
+    app: Application,
+    response: StreamResponse,
+    url: str,
+    dom_content: Union[str, None],
+    summarizer_types: List[str],
+    backend: Union[str, None],
+    user_id: str
+) -> None:
+  """
+  Summarize the document at a URL, writing a summary event right away for
+  every summary that is stored or cached already. The other summaries are
+  computed while writing a phase event as soon as the document is fetched,
+  extracted and tokenized, and then a sentence event for every one of their
+  sentences. The document, its new summaries and the user's history are then
+  stored through store_document.
+  :param app: aiohttp.web.Application
+  :param response: response the events are written to
+  :param url:
+  :param dom_content: DOM content of the document's website, None to fetch
+  the document
+  :param summarizer_types:
+  :param backend: summarizer backend
+  :param user_id: id of the user summarizing the document
+  :return:
+  :raises SummaryError: if the document can not be summarized
+  """
+  # Like in summarize, the summaries of a recently fetched document are
+  # answered straight from the DB unless the DOM content is given
+  summaries = {}
+  if not dom_content:
+    summaries = await get_stored_summaries(
+      app, url, summarizer_types, user_id
+    )
+    await write_summary_events(response, summaries, 'stored')
+  missing_types = [
+    summarizer_type for summarizer_type in summarizer_types
+    if summarizer_type not in summaries
+  ]
+  if not missing_types:
+    return
+
+  doc = DocumentRepository(app['db_pool'])
+  document = await doc.getby_url_meta(url)
+  is_fresh = document is not None and \
+    document.summarized_at >= get_fresh_after()
+
+  if dom_content or is_fresh:
+    if dom_content:
+      text = dom_content
+    else:
+      text = await doc.get_contents(document.body_hash)
+    source = 'domContent' if dom_content else 'stored'
+    await write_event(response, 'phase', {'phase': 'fetched', 'source': source})
+    await write_event(response, 'phase', {
+      'phase': 'extracted', 'source': source
+    })
+  else:
+    async for phase, text in extract_url_article_phases(app, url):
+      await write_event(response, 'phase', {'phase': phase, 'source': 'web'})
+
+  text_hash = content_hash(text)
+  cached_summaries = get_cached_summaries(
+    app['summary_cache'], text_hash, missing_types
+  )
+  await write_summary_events(response, cached_summaries, 'cached')
+  summaries.update(cached_summaries)
+
+  new_types = [
+    summarizer_type for summarizer_type in missing_types
+    if summarizer_type not in summaries
+  ]
+  if new_types:
+    # Tokenizing and scoring run in a single call of a worker, so the
+    # document is only sent to it once. Concurrent streams of the same text
+    # and summarizer types share that call.
+    num_sentences, spans = await app['summary_flights'].run(
+      ('spans', text_hash, tuple(new_types)),
+      app['summarizer_pool'].run,
+      Summarizer.summarize_payload_spans,
+      text.encode('utf-8'),
+      tuple(new_types),
+      backend
+    )
+    await write_event(response, 'phase', {
+      'phase': 'tokenized', 'sentences': num_sentences
+    })
+
+    new_summaries = {}
+    for summarizer_type in new_types:
+      new_summaries[summarizer_type] = []
+      for sentence_id, start, end in spans[summarizer_type]:
+        sentence = text[start:end].replace('\n', ' ')
+        new_summaries[summarizer_type].append(sentence)
+        await write_event(response, 'sentence', {
+          'summarizerType': summarizer_type,
+          'index': sentence_id,
+          'start': start,
+          'end': end,
+          'sentence': sentence
+        })
+    cache_summaries(app['summary_cache'], text_hash, new_summaries)
+    summaries.update(new_summaries)
+
+  await store_document(
+    app,
+    user_id,
+    url,
+    document,
+    is_fresh,
+    text,
+    summaries,
+    missing_types,
+    summarizer_types
+  )
+
+async def summarize_stream(request: Request) -> StreamResponse:
+  """
+  Summarize the given document like summarize, streaming the progress and
+  then the sentences of the summaries as Server-Sent Events
+  :param request: aiohttp.web.Request
+  :return: Coroutine object that returns aiohttp.web.StreamResponse
+  """
+
+  try:
+    summary_request = await read_document_request(request)
+  except SummaryError as error:
+    return get_error_response(error)
+  request_body = summary_request.body
+
+  response = StreamResponse(
+    status=200,
+    headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+  )
+  await response.prepare(request)
+
+  try:
+    await stream_summaries(
+      request.app,
+      response,
+      request_body.get('url'),
+      request_body.get('domContent'),
+      summary_request.summarizer_types,
+      request_body.get('summarizerBackend'),
+      summary_request.user_id
+    )
+  except SummaryError as error:
+    summary_error = error
+  except asyncio.CancelledError:
+    raise
+  except Exception as error:
+    summary_error = get_unexpected_error(error)
+  else:
+    summary_error = None
+
+  # The stream always ends with a done event, so that a client tells a
+  # failure from a dropped connection
+  if summary_error is None:
+    await write_event(response, 'done', {
+      'status': 200,
+      'message': 'Summarization was successful'
+    })
+  else:
+    await write_event(response, 'error', {
+      'status': summary_error.status,
+      'message': summary_error.message,
+      'errors': summary_error.errors
+    })
+    await write_event(response, 'done', {
+      'status': summary_error.status,
+      'message': summary_error.message
+    })
+
+  await response.write_eof()
+  return response
+
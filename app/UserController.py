@@ -2,7 +2,8 @@ from aiohttp.web import Request, Response, json_response
 import psycopg2
 
 from cerberus import Validator
-from .utils import auth
+from .utils import auth, pagination
+from .utils.pagination import PaginationError
 from .db.UserRepository import UserRepository
 
 
@@ -61,7 +62,9 @@ async def create(request: Request) -> Response:
 
 async def get(request: Request) -> Response:
   """
-  Return information about a user
+  Return information about a user. With the appropriate token, a page of
+  the user's history is given as well, starting after the entry of the
+  `cursor` query parameter and with at most `limit` entries.
   :param request: aiohttp.web.Request
   :return: Coroutine object that returns aiohttp.web.Response
   """
@@ -107,7 +110,25 @@ async def get(request: Request) -> Response:
     )
 
   try:
-    obtained_user = await user.getby_id_private(user_id)
+    history_limit = pagination.get_limit(request.query.get('limit'))
+    cursor = request.query.get('cursor')
+    history_after = None if cursor is None else UserRepository.HistoryCursor(
+      *pagination.decode_cursor(cursor)
+    )
+  except PaginationError as error:
+    return json_response(
+      status=400,
+      data={
+        'status': 400,
+        'message': 'Could not grab user information',
+        'errors': str(error)
+      }
+    )
+
+  try:
+    obtained_user = await user.getby_id_private(
+      user_id, history_limit, history_after
+    )
   except psycopg2.Error as error:
     return json_response(
       status=400,
@@ -138,10 +159,13 @@ async def get(request: Request) -> Response:
         'username': obtained_user.username,
         'joinedAt': obtained_user.joined_at.isoformat(),
         'lastLoginAt': obtained_user.last_login_at.isoformat(),
-        'history': list(map(lambda history_tuple: {
-          'url': history_tuple[0],
-          'accessedAt': str(history_tuple[1])
-        }, obtained_user.history))
+        'history': [
+          {'url': url, 'accessedAt': str(accessed_at)}
+          for url, accessed_at in obtained_user.history
+        ],
+        'historyNextCursor':
+          None if obtained_user.history_next_cursor is None
+          else pagination.encode_cursor(obtained_user.history_next_cursor)
       }
     }
   )
@@ -0,0 +1,8 @@
+from aiohttp.web import Application
+
+async def on_cleanup(app: Application):
+
+  app['summary_cache'].clear()
+  app['summarizer_pool'].shutdown()
+  app['extraction_pool'].shutdown()
+  await app['fetcher'].close()
@@ -1,18 +1,46 @@
 import aiopg
 import pytz
-from typing import NamedTuple, Union, List, Tuple
+import zlib
+from typing import NamedTuple, Union, List, Tuple, Dict
 from datetime import datetime
 import aitertools
 from . import utils
+from ..utils.cache import content_hash
+
+# A document created at the URL of another one, e.g. by a concurrent request,
+# replaces the contents of that document instead
+UPSERT_BY_URL = (
+  'ON CONFLICT (url) DO UPDATE SET'
+  ' body_hash=EXCLUDED.body_hash,'
+  ' summarized_at=EXCLUDED.summarized_at '
+)
+
+
+def compress_contents(contents: str) -> Tuple[str, bytes]:
+  """
+  Compress the contents of a document, which are stored once per distinct
+  text
+  :param contents:
+  :return: content hash of the contents and compressed contents
+  """
+  return content_hash(contents), zlib.compress(contents.encode('utf-8'))
+
+def decompress_contents(body: bytes) -> str:
+  return zlib.decompress(body).decode('utf-8')
 
 
 class DocumentRepository:
+  """
+  Documents reference their contents by hash, so that documents at different
+  URLs with the same text (e.g. syndicated articles) share a single
+  compressed body in document_body.
+  """
 
   class DocumentCreate(NamedTuple):
     user_id: str
     url: str
     contents: str
-    
+
   class DocumentView(NamedTuple):
     document_id: str
     user_id: str
@@ -20,38 +48,135 @@ class DocumentRepository:
     contents: str
     summarized_at: datetime
 
-  def __init__(self, pool: aiopg.Pool):
+  class DocumentMetaView(NamedTuple):
+    # A document without its contents, which get_contents loads on demand
+    document_id: str
+    user_id: str
+    url: str
+    body_hash: str
+    summarized_at: datetime
+
+  def __init__(self, pool: Union[aiopg.Pool, utils.Transaction]):
     self.pool = pool
 
-  async def startup(self) -> None:
-    await utils.query(
-      pool=self.pool,
-      query=
-      'CREATE TABLE document('
-      ' id UUID DEFAULT uuid_generate_v4(),'
-      ' user_id UUID              NOT NULL REFERENCES "user",'
-      ' url TEXT                  NOT NULL,'
-      ' contents TEXT             NOT NULL,'
-      ' summarized_at TIMESTAMPTZ NOT NULL,'
-      ' PRIMARY KEY (id)'
-      ');'
-    )
-    
   async def create(self, doc: DocumentCreate) -> Union[
     DocumentView, None
   ]:
+    """
+    Create a document, or replace the contents of the document at its URL
+    :param doc:
+    :return:
+    """
     current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    body_hash, body = compress_contents(doc.contents)
 
+    # The body is only inserted if no other document has the same contents
     datasource_generator = utils.query_with_result(
       pool=self.pool,
       query=
+      'WITH body AS ('
+      ' INSERT INTO "document_body"(hash, contents) VALUES (%s, %s)'
+      ' ON CONFLICT (hash) DO NOTHING'
+      ') '
       'INSERT INTO "document"('
-      ' user_id, url, contents, summarized_at'
-      ') VALUES (%s, %s, %s, %s) '
-      'RETURNING id, user_id, url, contents, summarized_at',
+      ' user_id, url, body_hash, summarized_at'
+      ') VALUES (%s, %s, %s, %s) ' + UPSERT_BY_URL +
+      'RETURNING id, user_id, url, summarized_at',
       query_tuple=(
-        doc.user_id, doc.url, doc.contents, current_time
+        body_hash, body, doc.user_id, doc.url, body_hash, current_time
+      ),
+      statement_name='document_create'
+    )
+
+    doc_raw = await aitertools.anext(
+      datasource_generator,
+      None
+    )
+    await datasource_generator.aclose()
+
+    if doc_raw is None:
+      return None
+    return self.DocumentView(*doc_raw[:3], doc.contents, doc_raw[3])
+
+  async def upsert_with_history(
+      self,
+      doc: DocumentCreate,
+      keep_contents: bool,
+      summaries: List[Tuple[str, int, List[str]]],
+      summarizer_types: List[str]
+  ) -> Union[str, None]:
+    """
+    Get or create the document at a URL, store the summaries of its contents
+    and record in the history of the user that it was summarized, all through
+    a single statement
+    :param doc: document summarized by the user
+    :param keep_contents: whether the stored contents of the document are
+    kept, rather than replaced by the contents of doc
+    :param summaries: (summarizer type, summary length, sentences) of every
+    summary to store
+    :param summarizer_types: summarizer types the document was summarized
+    through
+    :return: id of the document, None if its stored contents are kept but it
+    has none
+    """
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+
+    if keep_contents:
+      query = 'WITH doc AS (SELECT id FROM "document" WHERE url=%s), '
+      query_tuple = [doc.url]
+    else:
+      body_hash, body = compress_contents(doc.contents)
+      query = (
+        'WITH body AS ('
+        ' INSERT INTO "document_body"(hash, contents) VALUES (%s, %s)'
+        ' ON CONFLICT (hash) DO NOTHING'
+        '), doc AS ('
+        ' INSERT INTO "document"('
+        '  user_id, url, body_hash, summarized_at'
+        ' ) VALUES (%s, %s, %s, %s) ' + UPSERT_BY_URL +
+        ' RETURNING id'
+        '), '
+      )
+      query_tuple = [
+        body_hash, body, doc.user_id, doc.url, body_hash, current_time
+      ]
+
+    # The summaries are created at the same time as the contents, so that
+    # they count as computed from them
+    if summaries:
+      query += (
+        'new_summary AS ('
+        ' INSERT INTO "summary"('
+        '  document_id, summarizer_type, summary_length, sentences, created_at'
+        ' ) SELECT doc.id, s.summarizer_type, s.summary_length, s.sentences,'
+        ' %s FROM doc, (VALUES ' +
+        ', '.join(['(%s, %s::INTEGER, %s::TEXT[])'] * len(summaries)) +
+        ' ) AS s(summarizer_type, summary_length, sentences)'
+        ' ON CONFLICT (document_id, summarizer_type) DO UPDATE SET'
+        '  summary_length=EXCLUDED.summary_length,'
+        '  sentences=EXCLUDED.sentences,'
+        '  created_at=EXCLUDED.created_at'
+        '), '
       )
+      query_tuple.append(current_time)
+      for summary in summaries:
+        query_tuple.extend(summary)
+
+    query += (
+      'new_history AS ('
+      ' INSERT INTO "history"('
+      '  user_id, document_id, summarizer_type, accessed_at'
+      ' ) SELECT %s, doc.id, summarizer_type, %s'
+      ' FROM doc, unnest(%s::TEXT[]) AS summarizer_type'
+      ') '
+      'SELECT id FROM doc'
+    )
+    query_tuple.extend((doc.user_id, current_time, list(summarizer_types)))
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=query,
+      query_tuple=tuple(query_tuple)
     )
 
     doc_raw = await aitertools.anext(
@@ -62,18 +187,153 @@ class DocumentRepository:
 
     if doc_raw is None:
       return None
-    return self.DocumentView(*doc_raw)
-    
+    return doc_raw[0]
+
+  async def update_contents(self, doc_id: str, contents: str) -> Union[
+    DocumentView, None
+  ]:
+    """
+    Replace the contents of a document that was fetched again
+    :param doc_id:
+    :param contents:
+    :return:
+    """
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    body_hash, body = compress_contents(contents)
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'WITH body AS ('
+      ' INSERT INTO "document_body"(hash, contents) VALUES (%s, %s)'
+      ' ON CONFLICT (hash) DO NOTHING'
+      ') '
+      'UPDATE "document" '
+      'SET body_hash=%s, summarized_at=%s '
+      'WHERE id=%s '
+      'RETURNING id, user_id, url, summarized_at',
+      query_tuple=(body_hash, body, body_hash, current_time, doc_id),
+      statement_name='document_update_contents'
+    )
+
+    doc_raw = await aitertools.anext(
+      datasource_generator,
+      None
+    )
+    await datasource_generator.aclose()
+
+    if doc_raw is None:
+      return None
+    return self.DocumentView(*doc_raw[:3], contents, doc_raw[3])
+
+  async def create_many(self, docs: List[DocumentCreate]) -> List[
+    DocumentView
+  ]:
+    """
+    Create several documents, and their bodies, through a single statement.
+    The documents must be at distinct URLs.
+    :param docs:
+    :return:
+    """
+    if not docs:
+      return []
+
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    bodies = {}
+    body_tuple = []
+    document_tuple = []
+    for doc in docs:
+      body_hash, body = compress_contents(doc.contents)
+      if body_hash not in bodies:
+        bodies[body_hash] = doc.contents
+        body_tuple.extend((body_hash, body))
+      document_tuple.extend((doc.user_id, doc.url, body_hash, current_time))
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'WITH body AS ('
+      ' INSERT INTO "document_body"(hash, contents) VALUES ' +
+      ', '.join(['(%s, %s)'] * len(bodies)) +
+      ' ON CONFLICT (hash) DO NOTHING'
+      ') '
+      'INSERT INTO "document"('
+      ' user_id, url, body_hash, summarized_at'
+      ') VALUES ' + ', '.join(['(%s, %s, %s, %s)'] * len(docs)) + ' ' +
+      UPSERT_BY_URL +
+      'RETURNING id, user_id, url, body_hash, summarized_at',
+      query_tuple=tuple(body_tuple + document_tuple)
+    )
+
+    docs_raw = await aitertools.alist(datasource_generator)
+    await datasource_generator.aclose()
+
+    return [
+      self.DocumentView(*doc_raw[:3], bodies[doc_raw[3]], doc_raw[4])
+      for doc_raw in docs_raw
+    ]
+
+  async def update_contents_many(
+      self,
+      contents: List[Tuple[str, str]]
+  ) -> List[DocumentView]:
+    """
+    Replace the contents of several documents that were fetched again through
+    a single statement
+    :param contents: (document id, contents) of every document
+    :return:
+    """
+    if not contents:
+      return []
+
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    bodies = {}
+    body_tuple = []
+    document_tuple = []
+    for doc_id, doc_contents in contents:
+      body_hash, body = compress_contents(doc_contents)
+      if body_hash not in bodies:
+        bodies[body_hash] = doc_contents
+        body_tuple.extend((body_hash, body))
+      document_tuple.extend((doc_id, body_hash))
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'WITH body AS ('
+      ' INSERT INTO "document_body"(hash, contents) VALUES ' +
+      ', '.join(['(%s, %s)'] * len(bodies)) +
+      ' ON CONFLICT (hash) DO NOTHING'
+      ') '
+      'UPDATE "document" d '
+      'SET body_hash=v.body_hash, summarized_at=%s '
+      'FROM (VALUES ' + ', '.join(['(%s::UUID, %s)'] * len(contents)) +
+      ') AS v(id, body_hash) '
+      'WHERE d.id=v.id '
+      'RETURNING d.id, d.user_id, d.url, d.body_hash, d.summarized_at',
+      query_tuple=tuple(body_tuple + [current_time] + document_tuple)
+    )
+
+    docs_raw = await aitertools.alist(datasource_generator)
+    await datasource_generator.aclose()
+
+    return [
+      self.DocumentView(*doc_raw[:3], bodies[doc_raw[3]], doc_raw[4])
+      for doc_raw in docs_raw
+    ]
+
   async def getby_id(self, doc_id: str) -> Union[
     DocumentView, None
   ]:
     datasource_generator = utils.query_with_result(
       pool=self.pool,
       query=
-      'SELECT id, user_id, url, contents, summarized_at '
-      'FROM "document" '
-      'WHERE id=%s',
-      query_tuple=(doc_id,)
+      'SELECT d.id, d.user_id, d.url, b.contents, d.summarized_at '
+      'FROM "document" d '
+      'INNER JOIN "document_body" b ON b.hash = d.body_hash '
+      'WHERE d.id=%s',
+      query_tuple=(doc_id,),
+      statement_name='document_getby_id'
     )
 
     doc_raw = await aitertools.anext(
@@ -84,18 +344,66 @@ class DocumentRepository:
 
     if doc_raw is None:
       return None
-    return self.DocumentView(*doc_raw)
-    
+    return self.to_view(doc_raw)
+
   async def getby_url(self, url: str) -> Union[
     DocumentView, None
   ]:
     datasource_generator = utils.query_with_result(
       pool=self.pool,
       query=
-      'SELECT id, user_id, url, contents, summarized_at '
+      'SELECT d.id, d.user_id, d.url, b.contents, d.summarized_at '
+      'FROM "document" d '
+      'INNER JOIN "document_body" b ON b.hash = d.body_hash '
+      'WHERE d.url=%s',
+      query_tuple=(url,),
+      statement_name='document_getby_url'
+    )
+
+    doc_raw = await aitertools.anext(
+      datasource_generator,
+      None
+    )
+    await datasource_generator.aclose()
+
+    if doc_raw is None:
+      return None
+    return self.to_view(doc_raw)
+
+  async def getby_id_meta(self, doc_id: str) -> Union[
+    DocumentMetaView, None
+  ]:
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'SELECT id, user_id, url, body_hash, summarized_at '
+      'FROM "document" '
+      'WHERE id=%s',
+      query_tuple=(doc_id,),
+      statement_name='document_getby_id_meta'
+    )
+
+    doc_raw = await aitertools.anext(
+      datasource_generator,
+      None
+    )
+    await datasource_generator.aclose()
+
+    if doc_raw is None:
+      return None
+    return self.DocumentMetaView(*doc_raw)
+
+  async def getby_url_meta(self, url: str) -> Union[
+    DocumentMetaView, None
+  ]:
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'SELECT id, user_id, url, body_hash, summarized_at '
       'FROM "document" '
       'WHERE url=%s',
-      query_tuple=(url,)
+      query_tuple=(url,),
+      statement_name='document_getby_url_meta'
     )
 
     doc_raw = await aitertools.anext(
@@ -106,4 +414,80 @@ class DocumentRepository:
 
     if doc_raw is None:
       return None
-    return self.DocumentView(*doc_raw)
+    return self.DocumentMetaView(*doc_raw)
+
+  async def getby_urls_meta(self, urls: List[str]) -> Dict[
+    str, DocumentMetaView
+  ]:
+    """
+    Get the documents at several URLs, without their contents, through a
+    single SELECT
+    :param urls:
+    :return: document at every URL that has one
+    """
+    if not urls:
+      return {}
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'SELECT id, user_id, url, body_hash, summarized_at '
+      'FROM "document" '
+      'WHERE url=ANY(%s)',
+      query_tuple=(list(urls),),
+      statement_name='document_getby_urls_meta'
+    )
+
+    docs_raw = await aitertools.alist(datasource_generator)
+    await datasource_generator.aclose()
+
+    docs = [self.DocumentMetaView(*doc_raw) for doc_raw in docs_raw]
+    return {doc.url: doc for doc in docs}
+
+  async def get_contents(self, body_hash: str) -> Union[str, None]:
+    """
+    Load the contents of a document, as referenced by its body hash
+    :param body_hash:
+    :return:
+    """
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'SELECT contents '
+      'FROM "document_body" '
+      'WHERE hash=%s',
+      query_tuple=(body_hash,),
+      statement_name='document_get_contents'
+    )
+
+    body_raw = await aitertools.anext(
+      datasource_generator,
+      None
+    )
+    await datasource_generator.aclose()
+
+    if body_raw is None:
+      return None
+    return decompress_contents(body_raw[0])
+
+  async def delete_unused_bodies(self) -> None:
+    """
+    Delete the bodies that no document references anymore, e.g. after the
+    contents of documents were replaced
+    :return:
+    """
+    await utils.query(
+      pool=self.pool,
+      query=
+      'DELETE FROM "document_body" b '
+      'WHERE NOT EXISTS ('
+      ' SELECT 1 FROM "document" d WHERE d.body_hash = b.hash'
+      ')'
+    )
+
+  def to_view(self, doc_raw: tuple) -> DocumentView:
+    # Rows of the document joined with its body, which is decompressed
+    doc_id, user_id, url, body, summarized_at = doc_raw
+    return self.DocumentView(
+      doc_id, user_id, url, decompress_contents(body), summarized_at
+    )
@@ -19,33 +19,45 @@ class HistoryRepository:
     summarizer_type: str
     accessed_at: datetime
 
-  def __init__(self, pool: aiopg.Pool):
+  def __init__(self, pool: Union[aiopg.Pool, utils.Transaction]):
     self.pool = pool
 
-  async def startup(self) -> None:
+  async def create(self, hist: HistoryCreate) -> None:
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+
     await utils.query(
       pool=self.pool,
       query=
-      'CREATE TABLE history('
-      ' id UUID DEFAULT uuid_generate_v4(),'
-      ' user_id UUID            NOT NULL REFERENCES "user",'
-      ' document_id UUID        NOT NULL REFERENCES document,'
-      ' summarizer_type TEXT	NOT NULL,'
-      ' accessed_at TIMESTAMPTZ NOT NULL,'
-      ' PRIMARY KEY (id)'
-      ');'
+      'INSERT INTO "history"('
+      ' user_id, document_id, summarizer_type, accessed_at'
+      ') VALUES (%s, %s, %s, %s)',
+      query_tuple=(
+        hist.user_id, hist.document_id, hist.summarizer_type, current_time
+      ),
+      statement_name='history_create'
     )
 
-  async def create(self, hist: HistoryCreate) -> None:
+  async def create_many(self, hists: List[HistoryCreate]) -> None:
+    """
+    Record several history entries through a single INSERT
+    :param hists:
+    :return:
+    """
+    if not hists:
+      return
+
     current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    query_tuple = []
+    for hist in hists:
+      query_tuple.extend((
+        hist.user_id, hist.document_id, hist.summarizer_type, current_time
+      ))
 
     await utils.query(
       pool=self.pool,
       query=
       'INSERT INTO "history"('
       ' user_id, document_id, summarizer_type, accessed_at'
-      ') VALUES (%s, %s, %s, %s)',
-      query_tuple=(
-        hist.user_id, hist.document_id, hist.summarizer_type, current_time
-      )
+      ') VALUES ' + ', '.join(['(%s, %s, %s, %s)'] * len(hists)),
+      query_tuple=tuple(query_tuple)
     )
@@ -0,0 +1,182 @@
+import aiopg
+import pytz
+from typing import NamedTuple, Union, List, Tuple, Dict
+from datetime import datetime
+import aitertools
+from . import utils
+
+
+class SummaryRepository:
+
+  class SummaryCreate(NamedTuple):
+    document_id: str
+    summarizer_type: str
+    summary_length: int
+    sentences: List[str]
+
+  class SummaryView(NamedTuple):
+    document_id: str
+    summarizer_type: str
+    summary_length: int
+    sentences: List[str]
+    created_at: datetime
+
+  def __init__(self, pool: Union[aiopg.Pool, utils.Transaction]):
+    self.pool = pool
+
+  async def create_many(self, summaries: List[SummaryCreate]) -> None:
+    """
+    Store several summaries through a single statement, replacing the stored
+    summaries of the same document and summarizer type
+    :param summaries:
+    :return:
+    """
+    if not summaries:
+      return
+
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    query_tuple = []
+    for summary in summaries:
+      query_tuple.extend((
+        summary.document_id, summary.summarizer_type, summary.summary_length,
+        summary.sentences, current_time
+      ))
+
+    await utils.query(
+      pool=self.pool,
+      query=
+      'INSERT INTO "summary"('
+      ' document_id, summarizer_type, summary_length, sentences, created_at'
+      ') VALUES ' + ', '.join(['(%s, %s, %s, %s, %s)'] * len(summaries)) +
+      ' ON CONFLICT (document_id, summarizer_type) DO UPDATE SET'
+      ' summary_length=EXCLUDED.summary_length,'
+      ' sentences=EXCLUDED.sentences,'
+      ' created_at=EXCLUDED.created_at',
+      query_tuple=tuple(query_tuple)
+    )
+
+  async def getby_url(
+      self,
+      url: str,
+      summary_keys: List[Tuple[str, int]],
+      fetched_after: datetime
+  ) -> List[SummaryView]:
+    """
+    Get the stored summaries of the document at a URL, as long as the
+    document was fetched recently enough and the summaries were computed from
+    its current contents
+    :param url:
+    :param summary_keys: (summarizer type, summary length) of every summary
+    :param fetched_after: oldest time the document may have been fetched at
+    :return:
+    """
+    if not summary_keys:
+      return []
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'SELECT s.document_id, s.summarizer_type, s.summary_length,'
+      ' s.sentences, s.created_at '
+      'FROM "document" d '
+      'INNER JOIN "summary" s ON s.document_id = d.id '
+      'WHERE d.url=%s AND d.summarized_at >= %s'
+      ' AND s.created_at >= d.summarized_at'
+      ' AND (s.summarizer_type, s.summary_length) IN %s',
+      query_tuple=(url, fetched_after, tuple(summary_keys))
+    )
+
+    summaries = await aitertools.alist(datasource_generator)
+    await datasource_generator.aclose()
+
+    return [self.SummaryView(*summary) for summary in summaries]
+
+  async def getby_url_with_history(
+      self,
+      url: str,
+      summary_keys: List[Tuple[str, int]],
+      fetched_after: datetime,
+      user_id: str
+  ) -> List[SummaryView]:
+    """
+    Get the stored summaries of the document at a URL, under the same
+    conditions as getby_url, and record in the history of the user that they
+    were summarized if every one of them is stored, all through a single
+    statement
+    :param url:
+    :param summary_keys: (summarizer type, summary length) of every summary
+    :param fetched_after: oldest time the document may have been fetched at
+    :param user_id: id of the user summarizing the document
+    :return:
+    """
+    if not summary_keys:
+      return []
+
+    current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'WITH stored AS ('
+      ' SELECT s.document_id, s.summarizer_type, s.summary_length,'
+      '  s.sentences, s.created_at'
+      ' FROM "document" d'
+      ' INNER JOIN "summary" s ON s.document_id = d.id'
+      ' WHERE d.url=%s AND d.summarized_at >= %s'
+      '  AND s.created_at >= d.summarized_at'
+      '  AND (s.summarizer_type, s.summary_length) IN %s'
+      '), new_history AS ('
+      ' INSERT INTO "history"('
+      '  user_id, document_id, summarizer_type, accessed_at'
+      ' ) SELECT %s, document_id, summarizer_type, %s'
+      ' FROM stored'
+      ' WHERE (SELECT count(*) FROM stored) = %s'
+      ') '
+      'SELECT * FROM stored',
+      query_tuple=(
+        url, fetched_after, tuple(summary_keys),
+        user_id, current_time, len(summary_keys)
+      )
+    )
+
+    summaries = await aitertools.alist(datasource_generator)
+    await datasource_generator.aclose()
+
+    return [self.SummaryView(*summary) for summary in summaries]
+
+  async def getby_urls(
+      self,
+      urls: List[str],
+      summary_keys: List[Tuple[str, int]],
+      fetched_after: datetime
+  ) -> Dict[str, List[SummaryView]]:
+    """
+    Get the stored summaries of the documents at several URLs through a
+    single SELECT, under the same conditions as getby_url
+    :param urls:
+    :param summary_keys: (summarizer type, summary length) of every summary
+    :param fetched_after: oldest time the documents may have been fetched at
+    :return: summaries of the document at every URL that has some
+    """
+    if not urls or not summary_keys:
+      return {}
+
+    datasource_generator = utils.query_with_result(
+      pool=self.pool,
+      query=
+      'SELECT d.url, s.document_id, s.summarizer_type, s.summary_length,'
+      ' s.sentences, s.created_at '
+      'FROM "document" d '
+      'INNER JOIN "summary" s ON s.document_id = d.id '
+      'WHERE d.url=ANY(%s) AND d.summarized_at >= %s'
+      ' AND s.created_at >= d.summarized_at'
+      ' AND (s.summarizer_type, s.summary_length) IN %s',
+      query_tuple=(list(urls), fetched_after, tuple(summary_keys))
+    )
+
+    summaries_raw = await aitertools.alist(datasource_generator)
+    await datasource_generator.aclose()
+
+    summaries = {}
+    for url, *summary in summaries_raw:
+      summaries.setdefault(url, []).append(self.SummaryView(*summary))
+    return summaries
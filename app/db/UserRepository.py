@@ -1,6 +1,6 @@
 import aiopg
 import pytz
-from typing import NamedTuple, Union, List, Tuple
+from typing import AsyncIterable, NamedTuple, Union, List, Tuple
 from datetime import datetime
 import aitertools
 from . import utils
@@ -39,8 +39,13 @@ class UserRepository:
     joined_at: datetime
     last_login_at: datetime
     
+  class HistoryCursor(NamedTuple):
+    accessed_at: datetime
+    history_id: str
+
   class UserHistoryView(NamedTuple):
     history: List[Tuple[str, str, datetime]]
+    next_cursor: Union['UserRepository.HistoryCursor', None]
 
   class UserPrivateView(NamedTuple):
     first_name: str
@@ -50,6 +55,7 @@ class UserRepository:
     joined_at: datetime
     last_login_at: datetime
     history: List[Tuple[str, datetime]]
+    history_next_cursor: Union['UserRepository.HistoryCursor', None]
 
   class UserCredentialView(NamedTuple):
     user_id: str
@@ -62,23 +68,6 @@ class UserRepository:
   def __init__(self, pool: aiopg.Pool):
     self.pool = pool
 
-  async def startup(self) -> None:
-    await utils.query(
-      pool=self.pool,
-      query=
-      'CREATE EXTENSION IF NOT EXISTS "uuid-ossp";'
-      'CREATE TABLE "user"('
-      ' id UUID DEFAULT uuid_generate_v4(),'
-      ' first_name TEXT           NOT NULL,'
-      ' last_name TEXT            NOT NULL,'
-      ' username VARCHAR(30)      NOT NULL UNIQUE,'
-      ' password VARCHAR(100)     NOT NULL,'
-      ' joined_at TIMESTAMPTZ     NOT NULL,'
-      ' last_login_at TIMESTAMPTZ NOT NULL,'
-      ' PRIMARY KEY (id)'
-      ');'
-    )
-
   async def create(self, user: UserCreate) -> None:
     current_time = datetime.now(tz=pytz.timezone('US/Eastern'))
 
@@ -91,7 +80,8 @@ class UserRepository:
       query_tuple=(
         user.first_name, user.last_name, user.username,
         user.password, current_time, current_time
-      )
+      ),
+      statement_name='user_create'
     )
 
   async def updateby_id(self, user_id: str, user: UserUpdate) -> Union[
@@ -112,7 +102,8 @@ class UserRepository:
       query_tuple=(
         user.first_name, user.last_name, user.username,
         user.password, user_id
-      )
+      ),
+      statement_name='user_updateby_id'
     )
 
     updated_user_raw = await aitertools.anext(
@@ -135,7 +126,8 @@ class UserRepository:
       ' joined_at, last_login_at '
       'FROM "user" '
       'WHERE id=%s',
-      query_tuple=(user_id,)
+      query_tuple=(user_id,),
+      statement_name='user_getby_id_public'
     )
 
     user_raw = await aitertools.anext(
@@ -148,53 +140,135 @@ class UserRepository:
       return None
     return self.UserPublicView(*user_raw)
 
-  async def getby_id_private(self, user_id: str) -> Union[
-    UserPrivateView, None
-  ]:
+  async def getby_id_private(
+      self,
+      user_id: str,
+      history_limit: int,
+      history_after: Union[HistoryCursor, None] = None
+  ) -> Union[UserPrivateView, None]:
+    """
+    Get a user along with a page of their history, most recent first
+    :param user_id:
+    :param history_limit: max. no. of history entries
+    :param history_after: cursor of the entry the page starts after, None for
+    the first page
+    :return:
+    """
     public_info_user = await self.getby_id_public(user_id)
 
     if public_info_user is None:
       return None
 
-    history_list_raw = utils.query_with_result(
-      pool=self.pool,
-      query=
-      'SELECT document.url, history.accessed_at '
-      'FROM history, document '
-      'WHERE history.user_id=%s'
-      ' AND history.document_id = document.id',
-      query_tuple=(user_id,)
+    user_history = await self.get_history_by_id(
+      user_id, history_limit, history_after
     )
 
     params = list(public_info_user)
-    params.append(
-      await aitertools.alist(history_list_raw)
-    )
-    await history_list_raw.aclose()
+    params.append([
+      (url, accessed_at)
+      for url, _, accessed_at in user_history.history
+    ])
+    params.append(user_history.next_cursor)
 
     return self.UserPrivateView(*params)
-    
-  async def get_history_by_id(self, user_id: str) -> Union[
-    UserHistoryView, None
-  ]:
-	  
-    history_list_raw  = utils.query_with_result(
-      pool=self.pool,
-      query=
-      'SELECT document.url, history.summarizer_type, history.accessed_at '
-      'FROM history, document '
-      'WHERE history.user_id=%s'
-      ' AND history.document_id = document.id',
-      query_tuple=(user_id,)
+
+  async def get_history_by_id(
+      self,
+      user_id: str,
+      limit: int,
+      after: Union[HistoryCursor, None] = None
+  ) -> UserHistoryView:
+    """
+    Get a page of the history of a user, most recent first. Pages are found
+    through the position of their first entry in the index of history rather
+    than an offset, so that any page is as fast to get as the first one.
+    :param user_id:
+    :param limit: max. no. of entries of the page
+    :param after: cursor of the entry the page starts after, None for the
+    first page
+    :return: entries of the page, with the cursor of the next page if there
+    is one
+    """
+    # One more entry tells whether there is a next page
+    history_raw = await self.get_history_page(user_id, limit + 1, after)
+
+    next_cursor = None
+    if len(history_raw) > limit:
+      history_raw = history_raw[:limit]
+      next_cursor = self.HistoryCursor(
+        history_raw[-1][2], str(history_raw[-1][3])
+      )
+
+    return self.UserHistoryView(
+      [history_tuple[:3] for history_tuple in history_raw],
+      next_cursor
     )
 
-    params = []
-    params.append(
-      await aitertools.alist(history_list_raw)
+  async def get_history_page(
+      self,
+      user_id: str,
+      limit: int,
+      after: Union[HistoryCursor, None] = None
+  ) -> List[Tuple[str, str, datetime, str]]:
+    """
+    Get at most `limit` entries of the history of a user, most recent first,
+    through a single query
+    :param user_id:
+    :param limit:
+    :param after: cursor of the entry to start after, None to start from the
+    most recent one
+    :return: URL of the document, type of summarizer, time it was accessed
+    at and id of every entry
+    """
+    query, query_tuple = get_history_query(user_id, limit, after)
+    history_list_raw = utils.query_with_result(
+      pool=self.pool,
+      query=query,
+      query_tuple=query_tuple,
+      statement_name=
+      'user_get_history_by_id' if after is None
+      else 'user_get_history_by_id_after'
     )
+
+    history_raw = await aitertools.alist(history_list_raw)
     await history_list_raw.aclose()
+    return history_raw
 
-    return self.UserHistoryView(*params)
+  async def stream_history_by_id(
+      self,
+      user_id: str,
+      after: Union[HistoryCursor, None] = None,
+      limit: Union[int, None] = None,
+      page_size: Union[int, None] = None
+  ) -> AsyncIterable[Tuple[str, str, datetime, str]]:
+    """
+    Get the history of a user entry-by-entry, most recent first, a page at a
+    time. Like in get_history_by_id, every page is a query of its own that
+    starts after the last entry of the previous page, and its connection is
+    released before its entries are consumed.
+    :param user_id:
+    :param after: cursor of the entry to start after, None to start from the
+    most recent one
+    :param limit: max. no. of entries, None for all of them
+    :param page_size: no. of entries fetched from the DB at a time,
+    utils.FETCH_SIZE by default
+    :return: asynchronous generator of the URL of the document, the type of
+    summarizer, the time it was accessed at and the id of every entry
+    """
+    page_size = page_size or utils.FETCH_SIZE
+    while limit is None or limit > 0:
+      if limit is not None:
+        page_size = min(page_size, limit)
+        limit -= page_size
+
+      history_raw = await self.get_history_page(user_id, page_size, after)
+      for history_tuple in history_raw:
+        yield history_tuple
+      if len(history_raw) < page_size:
+        break
+      after = self.HistoryCursor(
+        history_raw[-1][2], str(history_raw[-1][3])
+      )
 
   async def getby_credentials(
       self,
@@ -207,7 +281,8 @@ class UserRepository:
       'SELECT id, username, last_login_at '
       'FROM "user"'
       'WHERE username=%s AND password=%s',
-      query_tuple=(username, password)
+      query_tuple=(username, password),
+      statement_name='user_getby_credentials'
     )
 
     user_raw = await aitertools.anext(
@@ -226,7 +301,8 @@ class UserRepository:
       'UPDATE "user" '
       'SET last_login_at=%s '
       'WHERE id=%s',
-      query_tuple=(current_time, user_raw[0])
+      query_tuple=(current_time, user_raw[0]),
+      statement_name='user_update_last_login_at'
     )
 
     return self.UserCredentialView(
@@ -238,5 +314,41 @@ class UserRepository:
       pool=self.pool,
       query=
       'DELETE FROM "user" WHERE id=%s',
-      query_tuple=(user_id,)
+      query_tuple=(user_id,),
+      statement_name='user_deleteby_id'
     )
+
+
+def get_history_query(
+    user_id: str,
+    limit: Union[int, None],
+    after: Union[UserRepository.HistoryCursor, None]
+) -> Tuple[str, tuple]:
+  """
+  Build the query of the history of a user, most recent first, starting after
+  the given entry. The order matches history_user_id_accessed_at_idx, so that
+  the entries are read from the index from where the page starts.
+  :param user_id:
+  :param limit: max. no. of entries, None for all of them
+  :param after: cursor of the entry to start after, None to start from the
+  most recent one
+  :return: query and its parameters
+  """
+  query_tuple = (user_id,)
+  keyset_condition = ''
+  if after is not None:
+    keyset_condition = \
+      ' AND (history.accessed_at, history.id) < (%s::TIMESTAMPTZ, %s::UUID)'
+    query_tuple += (after.accessed_at, after.history_id)
+
+  return (
+    'SELECT document.url, history.summarizer_type, history.accessed_at,'
+    ' history.id '
+    'FROM history, document '
+    'WHERE history.user_id=%s'
+    ' AND history.document_id = document.id' + keyset_condition +
+    ' ORDER BY history.accessed_at DESC, history.id DESC '
+    # No limit when NULL
+    'LIMIT %s',
+    query_tuple + (limit,)
+  )
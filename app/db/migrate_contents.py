@@ -0,0 +1,112 @@
+"""
+Moves the contents of the documents created before they were stored by hash
+into document_body, as migration 2 of the schema
+"""
+import aiopg
+import aitertools
+from . import utils
+from .DocumentRepository import compress_contents
+
+# No. of documents moved through each statement
+BATCH_SIZE = 500
+
+
+async def has_contents_column(pool: aiopg.Pool) -> bool:
+  datasource_generator = utils.query_with_result(
+    pool=pool,
+    query=
+    'SELECT 1 FROM information_schema.columns '
+    'WHERE table_name=%s AND column_name=%s',
+    query_tuple=('document', 'contents')
+  )
+
+  column = await aitertools.anext(datasource_generator, None)
+  await datasource_generator.aclose()
+
+  return column is not None
+
+async def migrate_batch(pool: aiopg.Pool, batch_size: int) -> int:
+  """
+  Move the contents of a batch of documents into document_body
+  :param pool:
+  :param batch_size:
+  :return: no. of documents moved
+  """
+  datasource_generator = utils.query_with_result(
+    pool=pool,
+    query=
+    'SELECT id, contents FROM "document" '
+    'WHERE body_hash IS NULL '
+    'LIMIT %s',
+    query_tuple=(batch_size,)
+  )
+  docs_raw = await aitertools.alist(datasource_generator)
+  await datasource_generator.aclose()
+
+  if not docs_raw:
+    return 0
+
+  bodies = {}
+  document_tuple = []
+  for doc_id, contents in docs_raw:
+    body_hash, body = compress_contents(contents)
+    bodies[body_hash] = body
+    document_tuple.extend((doc_id, body_hash))
+  body_tuple = []
+  for body_hash, body in bodies.items():
+    body_tuple.extend((body_hash, body))
+
+  await utils.query(
+    pool=pool,
+    query=
+    'WITH body AS ('
+    ' INSERT INTO "document_body"(hash, contents) VALUES ' +
+    ', '.join(['(%s, %s)'] * len(bodies)) +
+    ' ON CONFLICT (hash) DO NOTHING'
+    ') '
+    'UPDATE "document" d '
+    'SET body_hash=v.body_hash '
+    'FROM (VALUES ' + ', '.join(['(%s::UUID, %s)'] * len(docs_raw)) +
+    ') AS v(id, body_hash) '
+    'WHERE d.id=v.id',
+    query_tuple=tuple(body_tuple + document_tuple)
+  )
+  return len(docs_raw)
+
+async def migrate(pool: aiopg.Pool, batch_size: int=BATCH_SIZE) -> int:
+  """
+  Move the contents of every document into document_body, and then drop the
+  contents column. Running it again once done has no effect.
+  :param pool:
+  :param batch_size: no. of documents moved through each statement
+  :return: no. of documents moved
+  """
+  if not await has_contents_column(pool):
+    return 0
+
+  await utils.query(
+    pool=pool,
+    query=
+    'CREATE TABLE IF NOT EXISTS document_body('
+    ' hash TEXT     NOT NULL,'
+    ' contents BYTEA NOT NULL,'
+    ' PRIMARY KEY (hash)'
+    ');'
+    'ALTER TABLE document_body ALTER COLUMN contents SET STORAGE EXTERNAL;'
+    'ALTER TABLE document '
+    'ADD COLUMN IF NOT EXISTS body_hash TEXT REFERENCES document_body;'
+  )
+
+  migrated = 0
+  num_docs = await migrate_batch(pool, batch_size)
+  while num_docs:
+    migrated += num_docs
+    num_docs = await migrate_batch(pool, batch_size)
+
+  await utils.query(
+    pool=pool,
+    query=
+    'ALTER TABLE document ALTER COLUMN body_hash SET NOT NULL;'
+    'ALTER TABLE document DROP COLUMN contents;'
+  )
+  return migrated
@@ -0,0 +1,216 @@
+"""
+Versioned migrations of the schema, applied in order at startup. Every
+applied version is recorded in schema_migrations, so a migration only runs
+once. Migrations are written so that running one again after it was
+interrupted has no effect beyond completing it.
+"""
+import asyncio
+import aiopg
+import pytz
+from typing import Awaitable, Callable, List, NamedTuple
+from datetime import datetime
+import aitertools
+from . import utils
+from . import migrate_contents
+from .DocumentRepository import DocumentRepository
+
+# Key of the advisory lock that lets a single backend migrate at a time
+MIGRATION_LOCK_ID = 7158209
+
+
+class Migration(NamedTuple):
+  version: int
+  description: str
+  apply: Callable[[aiopg.Pool], Awaitable]
+
+
+def run_statements(*statements: str) -> Callable[[aiopg.Pool], Awaitable]:
+  # A migration running every statement in order, in a single transaction
+  async def apply(pool: aiopg.Pool) -> None:
+    async with utils.transaction(pool) as transaction:
+      for statement in statements:
+        await utils.query(pool=transaction, query=statement)
+  return apply
+
+
+MIGRATIONS = [
+  # Tables created by earlier versions without migrations are left as they
+  # are, so that those databases continue from here
+  Migration(1, 'Create the tables', run_statements(
+    'CREATE EXTENSION IF NOT EXISTS "uuid-ossp";',
+    'CREATE TABLE IF NOT EXISTS "user"('
+    ' id UUID DEFAULT uuid_generate_v4(),'
+    ' first_name TEXT           NOT NULL,'
+    ' last_name TEXT            NOT NULL,'
+    ' username VARCHAR(30)      NOT NULL UNIQUE,'
+    ' password VARCHAR(100)     NOT NULL,'
+    ' joined_at TIMESTAMPTZ     NOT NULL,'
+    ' last_login_at TIMESTAMPTZ NOT NULL,'
+    ' PRIMARY KEY (id)'
+    ');',
+    'CREATE TABLE IF NOT EXISTS document_body('
+    ' hash TEXT     NOT NULL,'
+    ' contents BYTEA NOT NULL,'
+    ' PRIMARY KEY (hash)'
+    ');',
+    # The contents are compressed already, so they are not compressed again
+    'ALTER TABLE document_body ALTER COLUMN contents SET STORAGE EXTERNAL;',
+    'CREATE TABLE IF NOT EXISTS document('
+    ' id UUID DEFAULT uuid_generate_v4(),'
+    ' user_id UUID              NOT NULL REFERENCES "user",'
+    ' url TEXT                  NOT NULL,'
+    ' body_hash TEXT            NOT NULL REFERENCES document_body,'
+    ' summarized_at TIMESTAMPTZ NOT NULL,'
+    ' PRIMARY KEY (id)'
+    ');',
+    'CREATE TABLE IF NOT EXISTS history('
+    ' id UUID DEFAULT uuid_generate_v4(),'
+    ' user_id UUID            NOT NULL REFERENCES "user",'
+    ' document_id UUID        NOT NULL REFERENCES document,'
+    ' summarizer_type TEXT    NOT NULL,'
+    ' accessed_at TIMESTAMPTZ NOT NULL,'
+    ' PRIMARY KEY (id)'
+    ');',
+    'CREATE TABLE IF NOT EXISTS summary('
+    ' document_id UUID       NOT NULL REFERENCES document ON DELETE CASCADE,'
+    ' summarizer_type TEXT   NOT NULL,'
+    ' summary_length INTEGER NOT NULL,'
+    ' sentences TEXT[]       NOT NULL,'
+    ' created_at TIMESTAMPTZ NOT NULL,'
+    ' PRIMARY KEY (document_id, summarizer_type)'
+    ');'
+  )),
+  Migration(
+    2,
+    'Move the contents of documents into document_body',
+    migrate_contents.migrate
+  ),
+  Migration(3, 'Index the lookups of documents and history', run_statements(
+    'CREATE INDEX IF NOT EXISTS document_url_idx ON document (url);',
+    # Finds whether a body is still referenced
+    'CREATE INDEX IF NOT EXISTS document_body_hash_idx '
+    'ON document (body_hash);',
+    # Covers the columns of history read when joining it with document, so
+    # that the history of a user is read from the index alone
+    'CREATE INDEX IF NOT EXISTS history_user_id_idx '
+    'ON history (user_id, accessed_at DESC, document_id, summarizer_type);',
+    'CREATE INDEX IF NOT EXISTS history_document_id_idx '
+    'ON history (document_id);'
+  )),
+  # Documents created concurrently for a same URL used to be duplicated. The
+  # most recently fetched one is kept, and the history of the others is
+  # moved to it.
+  Migration(4, 'Make the URL of documents unique', run_statements(
+    'LOCK TABLE document IN SHARE ROW EXCLUSIVE MODE;',
+    'CREATE TEMPORARY TABLE duplicate_document ON COMMIT DROP AS '
+    'SELECT id, kept_id FROM ('
+    ' SELECT id, first_value(id) OVER ('
+    '  PARTITION BY url ORDER BY summarized_at DESC, id'
+    ' ) AS kept_id'
+    ' FROM document'
+    ') AS d '
+    'WHERE id <> kept_id;',
+    'UPDATE history h SET document_id = d.kept_id '
+    'FROM duplicate_document d '
+    'WHERE h.document_id = d.id;',
+    # Their summaries are deleted with them
+    'DELETE FROM document '
+    'WHERE id IN (SELECT id FROM duplicate_document);',
+    'CREATE UNIQUE INDEX IF NOT EXISTS document_url_key ON document (url);',
+    'DROP INDEX IF EXISTS document_url_idx;'
+  )),
+  # Pages of the history of a user are found by the time and id of the entry
+  # they start after, so the id breaks ties between entries accessed at the
+  # same time. The index still covers the columns read when joining history
+  # with document.
+  Migration(5, 'Index the pages of history', run_statements(
+    'CREATE INDEX IF NOT EXISTS history_user_id_accessed_at_idx '
+    'ON history (user_id, accessed_at DESC, id DESC, document_id,'
+    ' summarizer_type);',
+    'DROP INDEX IF EXISTS history_user_id_idx;'
+  ))
+]
+
+
+async def get_applied_versions(pool: aiopg.Pool) -> List[int]:
+  datasource_generator = utils.query_with_result(
+    pool=pool,
+    query='SELECT version FROM schema_migrations'
+  )
+
+  versions_raw = await aitertools.alist(datasource_generator)
+  await datasource_generator.aclose()
+
+  return [version_raw[0] for version_raw in versions_raw]
+
+async def migrate(
+    pool: aiopg.Pool,
+    migrations: List[Migration]=MIGRATIONS
+) -> List[int]:
+  """
+  Apply the migrations that were not applied yet, in order. Backends starting
+  at the same time wait for each other through an advisory lock.
+  :param pool:
+  :param migrations:
+  :return: versions of the migrations applied
+  """
+  # The lock belongs to the session that takes it, so this connection is held
+  # until the migrations are done
+  connection = await pool.acquire()
+  try:
+    cursor = await connection.cursor()
+    await cursor.execute('SELECT pg_advisory_lock(%s)', (MIGRATION_LOCK_ID,))
+    try:
+      await utils.query(
+        pool=pool,
+        query=
+        'CREATE TABLE IF NOT EXISTS schema_migrations('
+        ' version INTEGER        NOT NULL,'
+        ' description TEXT       NOT NULL,'
+        ' applied_at TIMESTAMPTZ NOT NULL,'
+        ' PRIMARY KEY (version)'
+        ');'
+      )
+      applied_versions = set(await get_applied_versions(pool))
+
+      applied = []
+      for migration in migrations:
+        if migration.version in applied_versions:
+          continue
+
+        await migration.apply(pool)
+        await utils.query(
+          pool=pool,
+          query=
+          'INSERT INTO schema_migrations(version, description, applied_at) '
+          'VALUES (%s, %s, %s)',
+          query_tuple=(
+            migration.version,
+            migration.description,
+            datetime.now(tz=pytz.timezone('US/Eastern'))
+          )
+        )
+        applied.append(migration.version)
+      return applied
+    finally:
+      await cursor.execute(
+        'SELECT pg_advisory_unlock(%s)', (MIGRATION_LOCK_ID,)
+      )
+  finally:
+    pool.release(connection)
+
+async def main() -> None:
+  # Applies the migrations without starting the backend, and deletes the
+  # document bodies that no document references anymore
+  pool = await aiopg.create_pool(dsn=utils.get_dsn())
+  try:
+    applied = await migrate(pool)
+    print('Applied migrations {}'.format(applied))
+    await DocumentRepository(pool).delete_unused_bodies()
+  finally:
+    pool.close()
+    await pool.wait_closed()
+
+
+if __name__ == '__main__':
+  asyncio.get_event_loop().run_until_complete(main())
@@ -0,0 +1,140 @@
+import asyncio
+import aiopg
+import weakref
+from time import perf_counter
+from typing import NamedTuple, Union
+
+
+class InstrumentedPool:
+  """
+  Wraps a pool of connections to record how long connections are waited for
+  and how long queries run through them, so that the pool can be sized from
+  data. Connections are closed once they are older than the recycle age,
+  rather than being kept for as long as the backend runs.
+  """
+
+  class Stats(NamedTuple):
+    size: int
+    min_size: int
+    max_size: int
+    in_use: int
+    idle: int
+    waiting: int
+    acquisitions: int
+    acquire_timeouts: int
+    acquire_wait_time: float
+    max_acquire_wait_time: float
+    queries: int
+    query_time: float
+    max_query_time: float
+    statement_timeouts: int
+    recycled: int
+
+  def __init__(
+      self,
+      pool: aiopg.Pool,
+      acquire_timeout: Union[float, None]=None,
+      recycle: Union[float, None]=None
+  ):
+    """
+    :param pool:
+    :param acquire_timeout: max. time to wait for a connection, in seconds,
+    None to wait for as long as it takes
+    :param recycle: age after which a connection is closed once released, in
+    seconds, None to keep connections open
+    """
+    self.pool = pool
+    self.acquire_timeout = acquire_timeout
+    self.recycle = recycle
+
+    # Time every connection was first acquired at
+    self.acquired_first_at = weakref.WeakKeyDictionary()
+
+    self.waiting = 0
+    self.acquisitions = 0
+    self.acquire_timeouts = 0
+    self.acquire_wait_time = 0.0
+    self.max_acquire_wait_time = 0.0
+    self.queries = 0
+    self.query_time = 0.0
+    self.max_query_time = 0.0
+    self.statement_timeouts = 0
+    self.recycled = 0
+
+  async def acquire(self) -> aiopg.Connection:
+    """
+    Acquire a connection of the pool, waiting for one to be released if they
+    are all in use
+    :return:
+    :raises asyncio.TimeoutError: if no connection is released in time
+    """
+    started_at = perf_counter()
+    self.waiting += 1
+    try:
+      connection = await asyncio.wait_for(
+        self.pool.acquire(), self.acquire_timeout
+      )
+    except asyncio.TimeoutError:
+      self.acquire_timeouts += 1
+      raise
+    finally:
+      self.waiting -= 1
+
+    wait_time = perf_counter() - started_at
+    self.acquisitions += 1
+    self.acquire_wait_time += wait_time
+    self.max_acquire_wait_time = max(self.max_acquire_wait_time, wait_time)
+    self.acquired_first_at.setdefault(connection, started_at)
+    return connection
+
+  def release(self, connection: aiopg.Connection) -> None:
+    acquired_first_at = self.acquired_first_at.get(connection)
+    if self.recycle is not None and acquired_first_at is not None and \
+        perf_counter() - acquired_first_at > self.recycle:
+      # The pool opens a new connection in its place when one is needed
+      connection.close()
+      self.recycled += 1
+
+    self.pool.release(connection)
+
+  def record_query(self, query_time: float, timed_out: bool) -> None:
+    """
+    Record a query run through a connection of the pool
+    :param query_time: time the query ran for, in seconds
+    :param timed_out: whether the DB cancelled the query for running longer
+    than the statement timeout
+    :return:
+    """
+    self.queries += 1
+    self.query_time += query_time
+    self.max_query_time = max(self.max_query_time, query_time)
+    if timed_out:
+      self.statement_timeouts += 1
+
+  def close(self) -> None:
+    self.pool.close()
+
+  def terminate(self) -> None:
+    self.pool.terminate()
+
+  async def wait_closed(self) -> None:
+    await self.pool.wait_closed()
+
+  def stats(self) -> Stats:
+    return InstrumentedPool.Stats(
+      self.pool.size,
+      self.pool.minsize,
+      self.pool.maxsize,
+      self.pool.size - self.pool.freesize,
+      self.pool.freesize,
+      self.waiting,
+      self.acquisitions,
+      self.acquire_timeouts,
+      self.acquire_wait_time,
+      self.max_acquire_wait_time,
+      self.queries,
+      self.query_time,
+      self.max_query_time,
+      self.statement_timeouts,
+      self.recycled
+    )
@@ -1,36 +1,50 @@
 from aiohttp.web import Application
 import aiopg
-from os import getenv
 from asyncio import sleep
-from .UserRepository import UserRepository
-from .HistoryRepository import HistoryRepository
-from .DocumentRepository import DocumentRepository
+from os import getenv
+from . import migrations
+from .pool import InstrumentedPool
+from .utils import get_dsn
 
 async def on_startup(app: Application):
 
-  db_name = getenv('POSTGRES_DB_NAME')
-  db_username = getenv('POSTGRES_DB_USERNAME')
-  db_password = getenv('POSTGRES_DB_PASSWORD')
-  db_host = getenv('POSTGRES_DB_HOST')
-
-  if not (db_name and db_username and db_password and db_host):
-    raise RuntimeError('DB environment variables not set!')
+  dsn = get_dsn()
 
   await sleep(10)
 
-  dsn = 'dbname={} user={} password={} host={}'.format(
-    getenv('POSTGRES_DB_NAME'),
-    getenv('POSTGRES_DB_USERNAME'),
-    getenv('POSTGRES_DB_PASSWORD'),
-    getenv('POSTGRES_DB_HOST')
-  )
+  # Migrations run on a pool of their own, so that they are not bound by the
+  # statement timeout
+  migration_pool = await aiopg.create_pool(dsn=dsn, loop=app.loop)
+  try:
+    await migrations.migrate(migration_pool)
+  finally:
+    migration_pool.close()
+    await migration_pool.wait_closed()
+
+  # Statements running for longer than the timeout are cancelled by the DB
+  # (0 for no timeout)
+  statement_timeout = float(getenv('DB_STATEMENT_TIMEOUT', '30'))
+  options = {}
+  if statement_timeout > 0:
+    options['options'] = '-c statement_timeout={}'.format(
+      int(statement_timeout * 1000)
+    )
+
   db_pool = await aiopg.create_pool(
     dsn=dsn,
-    loop=app.loop
+    minsize=int(getenv('DB_POOL_MIN_SIZE', '1')),
+    maxsize=int(getenv('DB_POOL_MAX_SIZE', '10')),
+    loop=app.loop,
+    **options
   )
 
-  await UserRepository(db_pool).startup()
-  await DocumentRepository(db_pool).startup()
-  await HistoryRepository(db_pool).startup()
-
-  app['db_pool'] = db_pool
+  # Handlers wait for a connection for at most the acquire timeout, and
+  # connections are replaced once they are older than the recycle age (0 for
+  # neither)
+  acquire_timeout = float(getenv('DB_ACQUIRE_TIMEOUT', '10'))
+  recycle = float(getenv('DB_POOL_RECYCLE', '3600'))
+  app['db_pool'] = InstrumentedPool(
+    db_pool,
+    acquire_timeout=acquire_timeout if acquire_timeout > 0 else None,
+    recycle=recycle if recycle > 0 else None
+  )
@@ -1,48 +1,268 @@
+import asyncio
 import aiopg
-from typing import AsyncIterable, Union, Tuple
+import itertools
+import re
+import weakref
+from os import getenv
+from time import perf_counter
+from typing import Any, AsyncIterable, Awaitable, Union, Tuple
+from psycopg2.extensions import QueryCanceledError
+from .pool import InstrumentedPool
+
+# No. of times a named statement runs on a connection before it is prepared
+# on it, so that statements that hardly run are not prepared for nothing (0
+# to never prepare statements)
+PREPARE_THRESHOLD = int(getenv('DB_PREPARE_THRESHOLD', '5'))
+
+# No. of rows of a result fetched at a time
+FETCH_SIZE = int(getenv('DB_FETCH_SIZE', '500'))
+
+# Placeholders of psycopg2, and escaped percent signs
+PLACEHOLDER_RE = re.compile(r'%%|%s')
+
+# No. of runs of every named statement, by connection, up to PREPARE_THRESHOLD
+# once it is prepared. Entries go away with their connection.
+statement_runs = weakref.WeakKeyDictionary()
+
+
+class Transaction:
+  """
+  Unit of work that runs the queries of the repositories sharing it, in place
+  of a pool, through a single connection and a single transaction. The
+  transaction is committed once the block is left, or rolled back if the
+  block raised. The connection is closed rather than reused if it can not be
+  committed or rolled back:
+
+    async with utils.transaction(pool) as transaction:
+      await DocumentRepository(transaction).create_many(docs)
+      await SummaryRepository(transaction).create_many(summaries)
+
+  Queries of a unit of work must be run one after the other, as they share
+  a connection.
+  """
+
+  def __init__(self, pool: Union[aiopg.Pool, InstrumentedPool]):
+    self.pool = pool
+    self.connection = None
+
+  async def __aenter__(self) -> 'Transaction':
+    self.connection = await self.pool.acquire()
+    try:
+      cursor = await self.connection.cursor()
+      await cursor.execute('BEGIN')
+    except BaseException:
+      self.pool.release(self.connection)
+      raise
+    return self
+
+  async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+    connection = self.connection
+    self.connection = None
+    try:
+      cursor = await connection.cursor()
+      await cursor.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+    except BaseException as error:
+      # The connection may be broken, or still within the transaction, so the
+      # pool opens a new connection in its place rather than reusing it
+      connection.close()
+      # A failing ROLLBACK must not hide the error the block raised, which is
+      # raised once the block is left
+      if exc_type is None or not isinstance(error, Exception) or \
+          isinstance(error, asyncio.CancelledError):
+        raise
+    finally:
+      self.pool.release(connection)
+
+  async def acquire(self) -> aiopg.Connection:
+    return self.connection
+
+  def release(self, connection: aiopg.Connection) -> None:
+    # The connection is released once the transaction is over
+    pass
+
+
+def transaction(pool: Union[aiopg.Pool, InstrumentedPool]) -> Transaction:
+  return Transaction(pool)
+
+
+class QueryTimer:
+  """
+  Measures the time a query waits for the DB, leaving out the time the caller
+  spends between the rows of its result
+  """
+
+  def __init__(self):
+    self.query_time = 0.0
+    self.timed_out = False
+
+  async def run(self, awaitable: Awaitable) -> Any:
+    started_at = perf_counter()
+    try:
+      return await awaitable
+    except asyncio.CancelledError as error:
+      # aiopg reports a statement cancelled by the DB, e.g. for running longer
+      # than the statement timeout, as if the query itself was cancelled
+      if not isinstance(error.__context__, QueryCanceledError):
+        raise
+      self.timed_out = True
+      raise error.__context__
+    finally:
+      self.query_time += perf_counter() - started_at
+
+  def record(self, pool: Union[aiopg.Pool, Transaction]) -> None:
+    # Only instrumented pools keep track of their queries
+    if isinstance(pool, Transaction):
+      pool = pool.pool
+    if isinstance(pool, InstrumentedPool):
+      pool.record_query(self.query_time, self.timed_out)
+
+
+def to_numbered_parameters(query: str) -> str:
+  """
+  Turn the placeholders of a query for psycopg2 (%s) into the numbered
+  parameters of a prepared statement ($1, $2, ...)
+  :param query:
+  :return:
+  """
+  numbers = itertools.count(1)
+  return PLACEHOLDER_RE.sub(
+    lambda match: '%' if match.group() == '%%' else '${}'.format(
+      next(numbers)
+    ),
+    query
+  )
+
+async def execute(
+    connection: aiopg.Connection,
+    cursor: aiopg.Cursor,
+    query: str,
+    query_tuple: tuple,
+    statement_name: Union[str, None]
+) -> None:
+  """
+  Run a query through a cursor of a connection. A named query is prepared on
+  the connection once it ran PREPARE_THRESHOLD times on it, and is executed
+  by name from then on, so that the DB no longer parses and plans it again
+  on every run.
+  :param connection:
+  :param cursor:
+  :param query:
+  :param query_tuple:
+  :param statement_name: name of the prepared statement of the query, None
+  to never prepare it
+  :return:
+  """
+  if statement_name is None or PREPARE_THRESHOLD <= 0:
+    await cursor.execute(query, query_tuple)
+    return
+
+  runs = statement_runs.setdefault(connection, {})
+  run = runs.get(statement_name, 0) + 1
+  if run < PREPARE_THRESHOLD:
+    runs[statement_name] = run
+    await cursor.execute(query, query_tuple)
+    return
+
+  if run == PREPARE_THRESHOLD:
+    # It may be prepared already, by a run that was interrupted before it was
+    # counted. Preparing it again would fail, and abort the transaction the
+    # connection may be in, so it is looked up first.
+    await cursor.execute(
+      'SELECT 1 FROM pg_prepared_statements WHERE name=%s', (statement_name,)
+    )
+    if await cursor.fetchone() is None:
+      await cursor.execute('PREPARE {} AS {}'.format(
+        statement_name, to_numbered_parameters(query)
+      ))
+    runs[statement_name] = run
+
+  if query_tuple:
+    await cursor.execute(
+      'EXECUTE {}({})'.format(
+        statement_name, ', '.join(['%s'] * len(query_tuple))
+      ),
+      query_tuple
+    )
+  else:
+    await cursor.execute('EXECUTE {}'.format(statement_name))
+
 
 async def query(
-    pool: aiopg.Pool,
+    pool: Union[aiopg.Pool, InstrumentedPool, Transaction],
     query: str,
-    query_tuple: tuple = tuple()
+    query_tuple: tuple = tuple(),
+    statement_name: Union[str, None] = None
 ) -> None:
   """
   Run a query without getting the result
-  :param pool:
+  :param pool: pool, or unit of work, the connection is taken from
   :param query:
   :param query_tuple:
+  :param statement_name: name to prepare the query under, for queries run
+  often enough, None to never prepare it
   :return:
   """
   connection = await pool.acquire()
+  timer = QueryTimer()
 
   try:
     cursor = await connection.cursor()
-    await cursor.execute(query, query_tuple)
+    await timer.run(
+      execute(connection, cursor, query, query_tuple, statement_name)
+    )
   finally:
     pool.release(connection)
+    timer.record(pool)
 
 async def query_with_result(
-    pool: aiopg.Pool,
+    pool: Union[aiopg.Pool, InstrumentedPool, Transaction],
     query: str,
-    query_tuple: tuple = tuple()
+    query_tuple: tuple = tuple(),
+    statement_name: Union[str, None] = None,
+    fetch_size: Union[int, None] = None
 ) -> AsyncIterable[Union[Tuple, None]]:
   """
   Run a query and get the result piece-by-piece through an
-  asynchronous generator
-  :param pool:
+  asynchronous generator, fetching rows in batches
+  :param pool: pool, or unit of work, the connection is taken from
   :param query:
   :param query_tuple:
+  :param statement_name: name to prepare the query under, for queries run
+  often enough, None to never prepare it
+  :param fetch_size: no. of rows fetched at a time, FETCH_SIZE by default
   :return:
   """
+  fetch_size = fetch_size or FETCH_SIZE
   connection = await pool.acquire()
+  timer = QueryTimer()
 
   try:
     cursor = await connection.cursor()
-    await cursor.execute(query, query_tuple)
+    await timer.run(
+      execute(connection, cursor, query, query_tuple, statement_name)
+    )
 
-    record = await cursor.fetchone()
-    while record is not None:
-      yield record
-      record = await cursor.fetchone()
+    records = await timer.run(cursor.fetchmany(fetch_size))
+    while records:
+      for record in records:
+        yield record
+      records = await timer.run(cursor.fetchmany(fetch_size))
   finally:
-    pool.release(connection)
\ No newline at end of file
+    pool.release(connection)
+    timer.record(pool)
+
+def get_dsn() -> str:
+  db_name = getenv('POSTGRES_DB_NAME')
+  db_username = getenv('POSTGRES_DB_USERNAME')
+  db_password = getenv('POSTGRES_DB_PASSWORD')
+  db_host = getenv('POSTGRES_DB_HOST')
+
+  if not (db_name and db_username and db_password and db_host):
+    raise RuntimeError('DB environment variables not set!')
+
+  return 'dbname={} user={} password={} host={}'.format(
+    db_name,
+    db_username,
+    db_password,
+    db_host
+  )
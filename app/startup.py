@@ -0,0 +1,61 @@
+from aiohttp.web import Application
+from os import getenv, cpu_count
+from .utils.cache import LRUCache
+from .utils.workers import WorkerPool
+from .utils.fetcher import Fetcher, create_session
+from .utils.page_cache import PageCache
+from .utils.singleflight import SingleFlight
+
+async def on_startup(app: Application):
+
+  # Summaries of recently summarized documents, keyed by the hash of the
+  # document's text, the summarizer type and the length of the summary
+  app['summary_cache'] = LRUCache(
+    max_entries=int(getenv('SUMMARY_CACHE_MAX_ENTRIES', '10000')),
+    max_size=int(getenv('SUMMARY_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    ttl=float(getenv('SUMMARY_CACHE_TTL', '900'))
+  )
+
+  # Summarization is CPU-bound, so it runs in worker processes rather than on
+  # the event loop (by default, one per core)
+  app['summarizer_pool'] = WorkerPool(
+    max_workers=int(getenv('SUMMARIZER_WORKERS', str(cpu_count() or 1)))
+  )
+
+  # Extracting the article of a web page means parsing its whole HTML, so it
+  # runs in its own worker processes, each extraction bounded by a timeout
+  app['extraction_pool'] = WorkerPool(
+    max_workers=int(getenv('EXTRACTION_WORKERS', str(cpu_count() or 1))),
+    timeout=float(getenv('EXTRACTION_TIMEOUT', '10'))
+  )
+
+  # Web pages are fetched through a single session, so that connections to a
+  # same host are kept alive and reused
+  app['fetcher'] = Fetcher(
+    create_session(
+      max_connections=int(getenv('FETCH_MAX_CONNECTIONS', '100')),
+      max_connections_per_host=int(
+        getenv('FETCH_MAX_CONNECTIONS_PER_HOST', '10')
+      ),
+      keepalive_timeout=float(getenv('FETCH_KEEPALIVE_TIMEOUT', '30')),
+      connect_timeout=float(getenv('FETCH_CONNECT_TIMEOUT', '5')),
+      read_timeout=float(getenv('FETCH_READ_TIMEOUT', '10'))
+    ),
+    max_body_size=int(getenv('FETCH_MAX_BODY_BYTES', str(5 * 1024 * 1024))),
+    timeout=float(getenv('FETCH_TIMEOUT', '30'))
+  )
+
+  # Articles of the fetched web pages, revalidated with the server rather than
+  # fetched again in full
+  app['page_cache'] = PageCache(
+    max_entries=int(getenv('PAGE_CACHE_MAX_ENTRIES', '10000')),
+    max_size=int(getenv('PAGE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    directory=getenv('PAGE_CACHE_DIR') or None,
+    max_disk_size=int(
+      getenv('PAGE_CACHE_DISK_MAX_BYTES', str(1024 * 1024 * 1024))
+    )
+  )
+
+  # Summarizations in flight, shared by concurrent requests for the same
+  # document and summarizer types
+  app['summary_flights'] = SingleFlight()
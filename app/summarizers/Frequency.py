@@ -1,33 +1,37 @@
 from operator import itemgetter
 from . import utils
+from . import matrix
+from .matrix import numpy
 
 NUM_SUMMARIZED_SENTENCES = 5
 MIN_SENTENCE_LENGTH = 5
 
-def freq_summarize(text, num_summarized_sentences):
-  word_freq = {}
-  sentence_score = {}
+def freq_summarize(doc, num_summarized_sentences):
+  return [
+    doc.sentences[s] for s in freq_summarize_ids(doc, num_summarized_sentences)
+  ]
 
-  # Split the text into sentences
-  sentences = utils.split_into_sentences(text)
-  
+# Same as freq_summarize, returning the ids of the sentences of the summary.
+# A sentence appearing more than once is given the id of its first appearance.
+def freq_summarize_ids(doc, num_summarized_sentences):
+  word_freq = []
+  sentence_score = {}
 
-  # Count the frequency of each word in the text
-  word_freq = utils.calc_word_freq(sentences)
+  # Get the frequency of each word in the text
+  word_freq = utils.calc_word_freq(doc)
 
   order = 0
   # Calculate the rank of each sentence based on its words' frequencies
-  for s in sentences:
-    words = s.split()
-
+  for sentence_id, tokens in enumerate(doc.sentence_tokens):
+    s = doc.sentences[sentence_id]
     # Reject smaller sentence which probably don't have much info
-    if len(words) < MIN_SENTENCE_LENGTH : continue
+    if len(tokens) < MIN_SENTENCE_LENGTH : continue
 
     # Store the relative order in which this sentence appears in the text
-    sentence_score[s] = [0, order]
-    for word in words:
-      word = word.strip('.!?,()\n').lower()
-      sentence_score[s][0] += word_freq[word]
+    first_id = sentence_score[s][2] if s in sentence_score else sentence_id
+    sentence_score[s] = [0, order, first_id]
+    for token in tokens:
+      sentence_score[s][0] += word_freq[token]
     # Normalize the ranking of the sentence by dividing by its no. of words
     sentence_score[s][0] /= len(s)
     
@@ -40,4 +44,42 @@ def freq_summarize(text, num_summarized_sentences):
   # Sort the sentences by the order they appear in the text
   ranked_sentences = sorted(ranked_sentences, key=lambda x: x[1][1])
    
-  return [s[0] for s in ranked_sentences]
+  return [s[1][2] for s in ranked_sentences]
+
+def freq_summarize_matrix(doc, term_matrix, num_summarized_sentences):
+  return [
+    doc.sentences[s]
+    for s in freq_summarize_matrix_ids(
+      doc, term_matrix, num_summarized_sentences
+    )
+  ]
+
+def freq_summarize_matrix_ids(doc, term_matrix, num_summarized_sentences):
+  word_freq = numpy.array(utils.calc_word_freq(doc))
+  # Add up the frequencies of the words of every sentence
+  word_freq_sums = matrix.row_sums(term_matrix, word_freq[term_matrix.columns])
+
+  # Like in freq_summarize_ids, a sentence appearing more than once is ranked
+  # where it first appears but sorted by the order of its last appearance
+  entries = {}
+  order = 0
+  long_sentences = numpy.flatnonzero(
+    term_matrix.sentence_lengths >= MIN_SENTENCE_LENGTH
+  )
+  for sentence_id in long_sentences.tolist():
+    s = doc.sentences[sentence_id]
+    first_id = entries[s][0] if s in entries else sentence_id
+    entries[s] = (first_id, order)
+    order += 1
+
+  sentence_ids = [entry[0] for entry in entries.values()]
+  orders = [entry[1] for entry in entries.values()]
+  sentence_sizes = numpy.array([len(doc.sentences[i]) for i in sentence_ids])
+  # Normalize the ranking of the sentence by dividing by its no. of characters
+  scores = word_freq_sums[numpy.array(sentence_ids, dtype=int)] / sentence_sizes
+
+  # Grab the highest ranked sentences, sorted by the order they appear in
+  ranked_sentences = matrix.top_k(scores, num_summarized_sentences).tolist()
+  ranked_sentences = sorted(ranked_sentences, key=orders.__getitem__)
+
+  return [sentence_ids[i] for i in ranked_sentences]
@@ -1,7 +1,9 @@
 from operator import itemgetter
-import re
+import os
 import sys
 from . import utils
+from . import matrix
+from .matrix import numpy
 
 FILE_STOP_WORD_LIST = "stop-word-list.txt"
 MIN_FREQ = 0.00001
@@ -9,51 +11,43 @@ MAX_FREQ = 0.5
 NUM_SUMMARIZED_SENTENCES = 5
 MIN_SENTENCE_LENGTH = 5
 
-# Returns the stop word list
-def get_stop_word_list():
-  l = []
-    
-  f = open("tidbit/app/summarizers/" + FILE_STOP_WORD_LIST)
-  for word in f.read().split():
-    l.append(word)
+# Returns the set of stop words shipped alongside this module
+def load_stop_words():
+  path = os.path.join(os.path.dirname(__file__), FILE_STOP_WORD_LIST)
+  with open(path) as f:
+    return frozenset(f.read().split())
 
-  f.close()
-
-  return l
+# Loaded once on import and shared by every request
+STOP_WORDS = load_stop_words()
   
-# Returns a list of the signifcant words extracted from the text
-def get_significant_words(word_freq, stop_words):
-  significant_words = []
+# Returns the set of the ids of the signifcant words extracted from the text
+def get_significant_words(doc, word_freq, stop_words):
+  significant_words = set()
   
   """ Remove all the words in the list that either are:
   - Stop words OR
   - Their frequency is below or above the min or max thresholds
   """
-  for word, freq in word_freq.items():
+  for word_id, freq in enumerate(word_freq):
+    word = doc.vocabulary[word_id]
     if word not in stop_words and freq > MIN_FREQ and freq < MAX_FREQ:
-      significant_words.append(word)
+      significant_words.add(word_id)
 
-  return significant_words
+  return frozenset(significant_words)
 
-# Returns the score of a sentence
-def calc_sentence_score(sentence, significant_words):
-  if len(sentence.split()) < MIN_SENTENCE_LENGTH:
+# Returns the score of a sentence given the ids of its words
+def calc_sentence_score(tokens, significant_words):
+  if len(tokens) < MIN_SENTENCE_LENGTH:
     return 0.0
 
   num_important_words = 0
-  max_dist = 0 # Maximum distance between two significant words
-  pos_last_sign_word = 0
-  curr_pos = 0
+  # Distance from the start of the sentence to its last significant word
+  max_dist = 0
 
-  for word in sentence.split():
-    word = word.strip('.!?,()\n').lower()
-    if word in significant_words:
+  for curr_pos, token in enumerate(tokens):
+    if token in significant_words:
       num_important_words += 1
-      dist = curr_pos - pos_last_sign_word
-      if dist > max_dist:
-        max_dist  = dist    
-
-    curr_pos += 1
+      max_dist = curr_pos
   
   score = sys.float_info.max
   if max_dist > 0:
@@ -62,32 +56,61 @@ def calc_sentence_score(sentence, significant_words):
   return score
   
 
-def luhn_summarize(text, num_summarized_sentences):
-  stop_words = []
-  sentences = []
-  word_freq = {}
-  significant_words = []
-
-  # Get list of stop words
-  stop_words = get_stop_word_list()
-  # Split the text into sentences
-  sentences = utils.split_into_sentences(text)
-  # Calculate the word frequencies
-  word_freq = utils.calc_word_freq(sentences)
+def luhn_summarize(doc, num_summarized_sentences):
+  return [
+    doc.sentences[s] for s in luhn_summarize_ids(doc, num_summarized_sentences)
+  ]
+
+# Same as luhn_summarize, returning the ids of the sentences of the summary
+def luhn_summarize_ids(doc, num_summarized_sentences):
+  word_freq = []
+  significant_words = frozenset()
+
+  # Get the word frequencies
+  word_freq = utils.calc_word_freq(doc)
   # Find the significant words in the text
-  significant_words = get_significant_words(word_freq, stop_words)
+  significant_words = get_significant_words(doc, word_freq, STOP_WORDS)
  
   # Calc the score of every sentence and also note its overall position in the text
-  scored_sentences = [(s, calc_sentence_score(s, significant_words), order) for order, s in enumerate(sentences)]
+  scored_sentences = [
+    (order, calc_sentence_score(tokens, significant_words))
+    for order, tokens in enumerate(doc.sentence_tokens)
+  ]
 
   # Sort by the ranking of the sentence
   ranked_sentences = sorted(scored_sentences, key=lambda x: x[1], reverse=True)
   # Grab the first NUM_SENTENCES highest ranked sentences
   ranked_sentences = ranked_sentences[0:num_summarized_sentences]
   # Sort the sentences by the order they appear in the text
-  ranked_sentences = sorted(ranked_sentences, key=lambda x: x[2])
+  ranked_sentences = sorted(ranked_sentences, key=lambda x: x[0])
 
 
   return [s[0] for s in ranked_sentences]
 
-	
+def luhn_summarize_matrix(doc, term_matrix, num_summarized_sentences):
+  return [
+    doc.sentences[s]
+    for s in luhn_summarize_matrix_ids(
+      doc, term_matrix, num_summarized_sentences
+    )
+  ]
+
+def luhn_summarize_matrix_ids(doc, term_matrix, num_summarized_sentences):
+  word_freq = utils.calc_word_freq(doc)
+  significant_words = get_significant_words(doc, word_freq, STOP_WORDS)
+
+  is_significant = numpy.zeros(len(doc.vocabulary), dtype=bool)
+  is_significant[numpy.fromiter(significant_words, dtype=int)] = True
+  is_significant_entry = is_significant[term_matrix.columns]
+
+  num_important_words = matrix.row_sums(term_matrix, is_significant_entry)
+  max_dist = matrix.last_positions(term_matrix, is_significant_entry)
+
+  # Same scores as calc_sentence_score, for every sentence at once
+  scores = numpy.full(len(doc.sentences), sys.float_info.max)
+  has_dist = max_dist > 0
+  scores[has_dist] = num_important_words[has_dist] ** 2 / max_dist[has_dist]
+  scores[term_matrix.sentence_lengths < MIN_SENTENCE_LENGTH] = 0.0
+
+  # Grab the highest ranked sentences, sorted by the order they appear in
+  return sorted(matrix.top_k(scores, num_summarized_sentences).tolist())
@@ -1,72 +1,151 @@
 from operator import itemgetter
-import re
+import heapq
 
 NUM_SUMMARIZED_SENTENCES = 5
 MIN_SENTENCE_LENGTH = 5
 from . import utils
+from . import matrix
+from .matrix import numpy
 
 # Calculates the score, or rank, of the given sentence based on the
 # frequency of its words
-def calc_sentence_score(sentence, word_prob):
-  if len(sentence.split()) < MIN_SENTENCE_LENGTH: return 0
+def calc_sentence_score(tokens, word_prob):
+  if len(tokens) < MIN_SENTENCE_LENGTH: return 0
 
   score = 0
-  num_words = 0
-  words = []
-
-  words = sentence.split()
-  num_words = len(words)
-  for word in words:
-    word = word.strip('.!?,()\n').lower()
-    score += word_prob[word] / float(num_words)
+  num_words = len(tokens)
+  for token in tokens:
+    score += word_prob[token] / float(num_words)
     
   return score
 
-# Returns the word in the dictionary with the highest frequency
-def get_max_freq_word(word_prob):
-  return max(word_prob, key=word_prob.get)
-
-def sumbasic_summarize(text, num_summarized_sentences):
-  sentences = []
-  word_prob = {}
-  summary_sentences = []
-
-  # Split the text into sentences
-  sentences = utils.split_into_sentences(text)
-
-  if len(sentences) <= num_summarized_sentences:
-    return sentences
-
-  # Calculate the word frequencies (i.e. their probabilities)
-  word_prob = utils.calc_word_freq(sentences)
-  
-  # Calc the score of every sentence and also note its overall position in 
-  scored_sentences = [(s, calc_sentence_score(s, word_prob), order) for order, s in enumerate(sentences)]
-  # Sort by the ranking of the sentence
-  ranked_sentences = sorted(scored_sentences, key=lambda x: x[1], reverse=True)
-
-  highest_freq_word = ""
-  words = []
-  while len(summary_sentences) < num_summarized_sentences:
-    highest_freq_word = get_max_freq_word(word_prob)
-
-    for s in ranked_sentences:
-      words = [word.strip('.!?,()\n').lower() for word in s[0].split()]
-      
-      # Check that the max. freq. word is in the sentence
-      if highest_freq_word in words:
-        # If the sentence is already included in the summary, skip it
-        if s in summary_sentences: continue
-        # Otherwise, append the sentence to the summary
-        summary_sentences.append(s)
-
-        # Update the prob. of each word in the chosen sentence
-        for word in words:
-          word_prob[word] = word_prob[word] * word_prob[word]
-
-        break
+# Returns the ids of the sentences sorted by their score, highest first
+def rank_sentences(doc, word_prob):
+  scores = [calc_sentence_score(tokens, word_prob) for tokens in doc.sentence_tokens]
+  return sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+
+# Same as rank_sentences, scoring every sentence at once through the
+# term-sentence matrix
+def rank_sentences_matrix(term_matrix, word_prob):
+  word_prob = numpy.array(word_prob)
+  lengths = term_matrix.sentence_lengths
+  scores = matrix.row_sums(
+    term_matrix, word_prob[term_matrix.columns] / lengths[term_matrix.rows]
+  )
+  scores[lengths < MIN_SENTENCE_LENGTH] = 0
+  return matrix.rank(scores)
+
+# Returns, for every word, the sentences containing it in rank order. The
+# sentences containing word id w are sentence_ids[offsets[w]:offsets[w + 1]].
+def build_inverted_index(doc, ranked_sentences):
+  sentences_with_word = [[] for _ in doc.vocabulary]
+  for sentence_id in ranked_sentences:
+    for token in set(doc.sentence_tokens[sentence_id]):
+      sentences_with_word[token].append(sentence_id)
+
+  sentence_ids = []
+  offsets = [0]
+  for sentences in sentences_with_word:
+    sentence_ids.extend(sentences)
+    offsets.append(len(sentence_ids))
+
+  return sentence_ids, offsets
+
+def select_sentences(doc, inverted_index, word_prob, num_summarized_sentences):
+  """
+  Repeatedly pick the highest ranked sentence containing the word with the
+  highest probability, and then square the probability of every word in it.
+  Yields the ids of the picked sentences in the order in which they are
+  picked.
+
+  The probabilities are kept in a max-heap that is updated lazily: a picked
+  sentence pushes new entries for its words and outdated entries are skipped
+  when popped. A word whose sentences have all been picked is dropped, so
+  the selection always ends.
+  :param doc: utils.TokenizedDocument
+  :param inverted_index: sentences containing every word, highest ranked
+  first, as returned by build_inverted_index
+  :param word_prob: probability of every word id, updated in place
+  :param num_summarized_sentences:
+  """
+  sentences_with_word, offsets = inverted_index
+  # Position in sentences_with_word of the next sentence to check per word
+  next_candidate = offsets[:-1]
+  is_picked = [False] * len(doc.sentences)
+
+  heap = [(-prob, token) for token, prob in enumerate(word_prob)]
+  heapq.heapify(heap)
+
+  num_picked = 0
+  while num_picked < num_summarized_sentences and heap:
+    neg_prob, highest_freq_word = heapq.heappop(heap)
+    if -neg_prob != word_prob[highest_freq_word]:
+      continue
+
+    pos = next_candidate[highest_freq_word]
+    end = offsets[highest_freq_word + 1]
+    while pos < end and is_picked[sentences_with_word[pos]]:
+      pos += 1
+    next_candidate[highest_freq_word] = pos
+    if pos == end:
+      continue
+
+    sentence_id = sentences_with_word[pos]
+    is_picked[sentence_id] = True
+    num_picked += 1
+    yield sentence_id
+
+    # Update the prob. of each word in the chosen sentence
+    tokens = doc.sentence_tokens[sentence_id]
+    for token in tokens:
+      word_prob[token] = word_prob[token] * word_prob[token]
+    for token in set(tokens):
+      heapq.heappush(heap, (-word_prob[token], token))
+
+def sumbasic_summarize(doc, num_summarized_sentences):
+  return [
+    doc.sentences[s]
+    for s in sumbasic_summarize_ids(doc, num_summarized_sentences)
+  ]
+
+# Same as sumbasic_summarize, returning the ids of the sentences of the summary
+def sumbasic_summarize_ids(doc, num_summarized_sentences):
+  if len(doc.sentences) <= num_summarized_sentences:
+    return list(range(len(doc.sentences)))
+
+  # Get the word frequencies (i.e. their probabilities)
+  word_prob = utils.calc_word_freq(doc)
+  ranked_sentences = rank_sentences(doc, word_prob)
+  inverted_index = build_inverted_index(doc, ranked_sentences)
+
+  summary_sentences = select_sentences(
+    doc, inverted_index, word_prob, num_summarized_sentences
+  )
 
   # Sort the sentences by the order they appear in the text
-  summary_sentences = sorted(summary_sentences, key=lambda x: x[2])
+  return sorted(summary_sentences)
 
-  return [s[0] for s in summary_sentences]
+def sumbasic_summarize_matrix(doc, term_matrix, num_summarized_sentences):
+  return [
+    doc.sentences[s]
+    for s in sumbasic_summarize_matrix_ids(
+      doc, term_matrix, num_summarized_sentences
+    )
+  ]
+
+def sumbasic_summarize_matrix_ids(doc, term_matrix, num_summarized_sentences):
+  if len(doc.sentences) <= num_summarized_sentences:
+    return list(range(len(doc.sentences)))
+
+  word_prob = utils.calc_word_freq(doc)
+  ranked_sentences = rank_sentences_matrix(term_matrix, word_prob)
+  inverted_index = matrix.inverted_index(
+    term_matrix, len(doc.vocabulary), ranked_sentences
+  )
+
+  summary_sentences = select_sentences(
+    doc, inverted_index, word_prob, num_summarized_sentences
+  )
+
+  # Sort the sentences by the order they appear in the text
+  return sorted(summary_sentences)
@@ -1,17 +1,129 @@
+from os import getenv
 from . import Frequency
 from . import Luhn
 from . import SumBasic
+from . import utils
+from . import matrix
 
 SUMMARIZER_TYPES = ["FREQUENCY", "LUHN", "SUMBASIC"]
+# Stands for every summarizer type when requesting several summaries
+ALL_SUMMARIZER_TYPES = "ALL"
+# PYTHON scores sentences through plain Python loops, NUMPY through array
+# operations over a term-sentence matrix. Both give the same summaries.
+SUMMARIZER_BACKENDS = ["PYTHON", "NUMPY"]
+DEFAULT_SUMMARIZER_BACKEND = getenv('SUMMARIZER_BACKEND', SUMMARIZER_BACKENDS[0])
+# A misspelled backend would otherwise go unnoticed, as the PYTHON backend is
+# used for any backend that is not NUMPY
+if DEFAULT_SUMMARIZER_BACKEND not in SUMMARIZER_BACKENDS:
+  raise ValueError('SUMMARIZER_BACKEND must be one of {}, not {}'.format(
+    ', '.join(SUMMARIZER_BACKENDS), DEFAULT_SUMMARIZER_BACKEND
+  ))
 
-def summarize(text, summarizer_type):
-  summary = ""
+# Returns the backends that can be used in this installation
+def get_available_backends():
+  if matrix.is_available():
+    return SUMMARIZER_BACKENDS
+  return SUMMARIZER_BACKENDS[:1]
+
+# Returns the no. of sentences of the summaries of a summarizer type
+def get_summary_length(summarizer_type):
+  if summarizer_type == SUMMARIZER_TYPES[0]:
+    return Frequency.NUM_SUMMARIZED_SENTENCES
+  elif summarizer_type == SUMMARIZER_TYPES[1]:
+    return Luhn.NUM_SUMMARIZED_SENTENCES
+  elif summarizer_type == SUMMARIZER_TYPES[2]:
+    return SumBasic.NUM_SUMMARIZED_SENTENCES
+  return 0
+
+def summarize(text, summarizer_type, backend=None):
+  return summarize_document(utils.tokenize(text), summarizer_type, backend)
+
+# Returns a dict with the summary of the text for each of the given
+# summarizer types, tokenizing the text only once
+def summarize_many(text, summarizer_types, backend=None):
+  return summarize_tokenized(utils.tokenize(text), summarizer_types, backend)
+
+# Same as summarize_many, for a document that is tokenized already
+def summarize_tokenized(doc, summarizer_types, backend=None):
+  return {
+    summarizer_type: [doc.sentences[s] for s in sentence_ids]
+    for summarizer_type, sentence_ids in
+    summarize_tokenized_ids(doc, summarizer_types, backend).items()
+  }
+
+# Same as summarize_tokenized, returning the ids of the sentences of every
+# summary instead of the sentences themselves
+def summarize_tokenized_ids(doc, summarizer_types, backend=None):
+  if backend is None:
+    backend = DEFAULT_SUMMARIZER_BACKEND
+
+  if backend == SUMMARIZER_BACKENDS[1] and matrix.is_available():
+    term_matrix = matrix.build(doc)
+    return {
+      summarizer_type: summarize_matrix_ids(doc, term_matrix, summarizer_type)
+      for summarizer_type in summarizer_types
+    }
+
+  return {
+    summarizer_type: summarize_document_ids(doc, summarizer_type, backend)
+    for summarizer_type in summarizer_types
+  }
+
+# Entry point of the summarizer workers. The text of a document is sent once
+# for all of its summarizer types, as UTF-8 bytes.
+def summarize_payload(payload, summarizer_types, backend=None):
+  return summarize_many(payload.decode("utf-8"), summarizer_types, backend)
+
+# Entry point of the summarizer workers when streaming summaries. Returns the
+# no. of sentences of the document and, for each of the given summarizer
+# types, the id and span in the text of every sentence of its summary.
+def summarize_payload_spans(payload, summarizer_types, backend=None):
+  doc = utils.tokenize(payload.decode("utf-8"))
+  summaries = summarize_tokenized_ids(doc, summarizer_types, backend)
+  return len(doc.sentences), {
+    summarizer_type: [
+      (sentence_id,) + doc.spans[sentence_id] for sentence_id in sentence_ids
+    ]
+    for summarizer_type, sentence_ids in summaries.items()
+  }
+
+def summarize_document(doc, summarizer_type, backend=None):
+  return [
+    doc.sentences[s]
+    for s in summarize_document_ids(doc, summarizer_type, backend)
+  ]
+
+# Same as summarize_document, returning the ids of the sentences of the summary
+def summarize_document_ids(doc, summarizer_type, backend=None):
+  if backend is None:
+    backend = DEFAULT_SUMMARIZER_BACKEND
+  # Fall back to the PYTHON backend when NumPy is not installed
+  if backend == SUMMARIZER_BACKENDS[1] and matrix.is_available():
+    return summarize_matrix_ids(doc, matrix.build(doc), summarizer_type)
+
+  summary = []
   if summarizer_type == SUMMARIZER_TYPES[0]: 	# Frequency summarizer
-    summary = Frequency.freq_summarize(text, Frequency.NUM_SUMMARIZED_SENTENCES)
+    summary = Frequency.freq_summarize_ids(doc, Frequency.NUM_SUMMARIZED_SENTENCES)
   elif summarizer_type == SUMMARIZER_TYPES[1]: 	# Luhn summarizer
-    summary = Luhn.luhn_summarize(text, Luhn.NUM_SUMMARIZED_SENTENCES)
+    summary = Luhn.luhn_summarize_ids(doc, Luhn.NUM_SUMMARIZED_SENTENCES)
   elif summarizer_type == SUMMARIZER_TYPES[2]: 	# SumBasic summarizer
-    summary = SumBasic.sumbasic_summarize(text, SumBasic.NUM_SUMMARIZED_SENTENCES)		
+    summary = SumBasic.sumbasic_summarize_ids(doc, SumBasic.NUM_SUMMARIZED_SENTENCES)
     
   return summary
-  
+
+def summarize_matrix(doc, term_matrix, summarizer_type):
+  return [
+    doc.sentences[s]
+    for s in summarize_matrix_ids(doc, term_matrix, summarizer_type)
+  ]
+
+def summarize_matrix_ids(doc, term_matrix, summarizer_type):
+  summary = []
+  if summarizer_type == SUMMARIZER_TYPES[0]: 	# Frequency summarizer
+    summary = Frequency.freq_summarize_matrix_ids(doc, term_matrix, Frequency.NUM_SUMMARIZED_SENTENCES)
+  elif summarizer_type == SUMMARIZER_TYPES[1]: 	# Luhn summarizer
+    summary = Luhn.luhn_summarize_matrix_ids(doc, term_matrix, Luhn.NUM_SUMMARIZED_SENTENCES)
+  elif summarizer_type == SUMMARIZER_TYPES[2]: 	# SumBasic summarizer
+    summary = SumBasic.sumbasic_summarize_matrix_ids(doc, term_matrix, SumBasic.NUM_SUMMARIZED_SENTENCES)
+
+  return summary
@@ -0,0 +1,133 @@
+from itertools import chain
+from typing import NamedTuple, Any, List, Tuple
+
+# The NUMPY backend is optional; without NumPy only the PYTHON backend is
+# available
+try:
+  import numpy
+except ImportError:
+  numpy = None
+
+
+class TermSentenceMatrix(NamedTuple):
+  """
+  Sparse sentence x term count matrix of a TokenizedDocument, in coordinate
+  form with one entry per word occurrence (the entries of a same sentence and
+  word add up to its count). Entries are sorted by sentence and then by
+  position within the sentence, so row sums add up words in the same order
+  as the pure-Python summarizers do.
+  """
+  rows: Any              # Sentence id of every entry
+  columns: Any           # Word id of every entry
+  positions: Any         # Position of every entry within its sentence
+  sentence_lengths: Any  # No. of words of every sentence
+
+
+def is_available() -> bool:
+  return numpy is not None
+
+def build(doc) -> TermSentenceMatrix:
+  """
+  Build the term-sentence matrix of a document
+  :param doc: utils.TokenizedDocument
+  :return:
+  """
+  num_sentences = len(doc.sentence_tokens)
+  sentence_lengths = numpy.fromiter(
+    (len(tokens) for tokens in doc.sentence_tokens),
+    dtype=numpy.intp, count=num_sentences
+  )
+  columns = numpy.fromiter(
+    chain.from_iterable(doc.sentence_tokens),
+    dtype=numpy.intp, count=doc.total_words
+  )
+  rows = numpy.repeat(numpy.arange(num_sentences), sentence_lengths)
+  sentence_starts = numpy.cumsum(sentence_lengths) - sentence_lengths
+  positions = numpy.arange(doc.total_words) - sentence_starts[rows]
+
+  return TermSentenceMatrix(rows, columns, positions, sentence_lengths)
+
+def row_sums(matrix: TermSentenceMatrix, weights) -> Any:
+  """
+  Add up the weight of every entry of each sentence
+  :param matrix:
+  :param weights: weight of every entry
+  :return: sum of every sentence
+  """
+  return numpy.bincount(
+    matrix.rows, weights=weights, minlength=len(matrix.sentence_lengths)
+  )
+
+def last_positions(matrix: TermSentenceMatrix, mask) -> Any:
+  """
+  Find the position of the last masked entry of each sentence
+  :param matrix:
+  :param mask: boolean mask over the entries
+  :return: position of every sentence's last masked entry, 0 if it has none
+  """
+  last = numpy.zeros(len(matrix.sentence_lengths), dtype=numpy.intp)
+  rows = matrix.rows[mask]
+  positions = matrix.positions[mask]
+  if len(rows):
+    # Entries are sorted by sentence, so the last one of a sentence is
+    # followed by an entry of another sentence (or is the very last one)
+    is_last = numpy.ones(len(rows), dtype=bool)
+    is_last[:-1] = rows[1:] != rows[:-1]
+    last[rows[is_last]] = positions[is_last]
+  return last
+
+def top_k(scores, k: int) -> Any:
+  """
+  Find the k highest scores, breaking ties by position like a stable sort
+  :param scores:
+  :param k:
+  :return: indices of the k highest scores, highest first
+  """
+  if k <= 0:
+    return numpy.zeros(0, dtype=numpy.intp)
+
+  candidates = numpy.arange(len(scores))
+  if k < len(scores):
+    # Every score tied with the k-th highest is a candidate, so that the
+    # same ones as in a full stable sort are kept
+    kth_highest = scores[numpy.argpartition(-scores, k - 1)[k - 1]]
+    candidates = numpy.flatnonzero(scores >= kth_highest)
+
+  ranked = candidates[numpy.argsort(-scores[candidates], kind="mergesort")]
+  return ranked[:k]
+
+def inverted_index(
+    matrix: TermSentenceMatrix,
+    num_words: int,
+    ranked_sentences
+) -> Tuple[List[int], List[int]]:
+  """
+  List the sentences containing every word
+  :param matrix:
+  :param num_words: size of the vocabulary
+  :param ranked_sentences: order in which to list the sentences
+  :return: flat list of sentence ids and offsets into it, where the sentences
+  containing word id w are sentence_ids[offsets[w]:offsets[w + 1]]
+  """
+  num_sentences = len(matrix.sentence_lengths)
+  ranked_sentences = numpy.asarray(ranked_sentences, dtype=numpy.intp)
+  sentence_rank = numpy.empty(num_sentences, dtype=numpy.intp)
+  sentence_rank[ranked_sentences] = numpy.arange(num_sentences)
+
+  # Sorting the (word, sentence rank) pairs groups them by word
+  pairs = numpy.sort(
+    matrix.columns.astype(numpy.int64) * num_sentences +
+    sentence_rank[matrix.rows]
+  )
+  is_distinct = numpy.ones(len(pairs), dtype=bool)
+  is_distinct[1:] = pairs[1:] != pairs[:-1]
+  pairs = pairs[is_distinct]
+  words = pairs // num_sentences
+  sentence_ids = ranked_sentences[pairs % num_sentences]
+  offsets = numpy.searchsorted(words, numpy.arange(num_words + 1))
+
+  return sentence_ids.tolist(), offsets.tolist()
+
+def rank(scores) -> Any:
+  # Indices of all scores, highest first, ties broken by position
+  return numpy.argsort(-scores, kind="mergesort")
@@ -0,0 +1,175 @@
+import re
+from typing import List, Tuple, Union
+
+# Single-scan replacement for the regex cascade originally written by
+# D Greenberg, found at:
+# https://stackoverflow.com/questions/4576077/python-split-text-on-sentences
+#
+# Rather than rewriting the text once per rule, every candidate sentence
+# terminator is visited once and the rules of the cascade are checked around
+# it. The text is never copied; sentences are returned as (start, end)
+# offsets into it.
+
+PREFIXES = ("Mr", "St", "Mrs", "Ms", "Dr")
+SUFFIXES = ("Inc", "Ltd", "Jr", "Sr", "Co", "Corp")
+WEBSITES = ("com", "net", "org", "io", "gov")
+
+_CAPS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# Last letters of the suffixes, used to quickly rule most periods out
+_SUFFIX_ENDINGS = "".join(set(suffix[-1] for suffix in SUFFIXES))
+_SUFFIX_LENGTHS = sorted(set(len(suffix) for suffix in SUFFIXES))
+
+# Words that, following an acronym or a suffix such as "Inc.", denote the
+# beginning of a new sentence
+_STARTER_RE = re.compile(
+  r"Mr|Mrs|Ms|Dr|Wherever|"
+  r"(?:He|She|It|They|Their|Our|We|But|However|That|This)(?:\s|\Z)"
+)
+
+# Candidate sentence terminators. Periods of titles (e.g. "Mr."), websites
+# and "Ph.D." never end a sentence so they are filtered out here already.
+_TERMINATOR_RE = re.compile(
+  r"[.!?]" +
+  "".join(r"(?<!{}\.)".format(prefix) for prefix in PREFIXES) +
+  r"(?<!Ph\.D\.)(?!(?<=Ph\.)D\.)"
+  r"(?!(?<=\.)(?:" + "|".join(WEBSITES) + r"))"
+)
+
+# Characters treated as a plain space by the rules (newlines are collapsed
+# into spaces before splitting)
+_SPACES = " \n"
+
+
+def _is_space(text: str, pos: int) -> bool:
+  # Outside of the text counts as space
+  return pos < 0 or pos >= len(text) or text[pos] in _SPACES
+
+def _after_quote(text: str, pos: int, quotes: str) -> int:
+  # A terminator followed by a closing quote ends the sentence after the quote
+  if pos < len(text) and text[pos] in quotes:
+    return pos + 1
+  return pos
+
+def _starter_end(text: str, pos: int) -> int:
+  """
+  Find a sentence starter right after the space at pos
+  :param text:
+  :param pos:
+  :return: offset where the starter ends, -1 if there is none
+  """
+  if not _is_space(text, pos):
+    return -1
+  match = _STARTER_RE.match(text, pos + 1)
+  return match.end() if match else -1
+
+def _suffix_start(text: str, pos: int) -> Union[int, None]:
+  """
+  Find a suffix such as "Inc" preceded by a space right before the period at
+  pos
+  :param text:
+  :param pos: position of the period
+  :return: offset of the space preceding the suffix, None if there is none
+  """
+  for length in _SUFFIX_LENGTHS:
+    if pos >= length and text[pos - length:pos] in SUFFIXES and \
+        _is_space(text, pos - length - 1):
+      return pos - length - 1
+  return None
+
+def _initials_end(text: str, pos: int) -> int:
+  """
+  Find the end of the run of capital initials (e.g. "U.S.A.") whose first
+  period is at pos
+  :param text:
+  :param pos:
+  :return: offset right after the last period of the run
+  """
+  end = pos + 1
+  while (
+    end + 1 < len(text) and text[end] in _CAPS and text[end + 1] == "." and
+    not text.startswith(WEBSITES, end + 2)
+  ):
+    end += 2
+  return end
+
+def _initials_boundary(text: str, start: int, end: int) -> int:
+  """
+  Decide whether a run of capital initials (e.g. "U.S.") ends a sentence
+  :param text:
+  :param start: position of the first initial
+  :param end: position right after the last period of the run
+  :return: offset where the sentence ends, -1 if it does not end here
+  """
+  num_initials = (end - start) // 2
+
+  # An acronym followed by a sentence starter ends the sentence
+  if num_initials >= 2 and _starter_end(text, end) >= 0:
+    return end
+
+  # Initials are grouped in threes and then twos (e.g. "U.S.A." or "U.S.");
+  # a leftover single initial keeps its period unless it follows a space
+  if num_initials % 3 != 1:
+    return -1
+  if num_initials == 1:
+    if _is_space(text, start - 1):
+      return -1
+    if text[start - 1].isspace() and _is_space(text, end):
+      return -1
+
+  return _after_quote(text, end, "\"”")
+
+def split_spans(text: str) -> List[Tuple[int, int]]:
+  """
+  Split text into sentences
+  :param text:
+  :return: (start, end) offsets of every sentence, with surrounding
+  whitespace excluded. Trailing text that is not terminated is dropped.
+  """
+  spans = []
+  sentence_start = 0
+  # Position up to which the text was already looked at (i.e. the end of the
+  # last run of initials)
+  scanned_end = 0
+  # A suffix only ends a sentence when followed by a starter, and only if its
+  # preceding space was not already taken by the previous suffix's starter
+  starter_end = -1
+
+  for match in _TERMINATOR_RE.finditer(text):
+    pos = match.start()
+    if pos < scanned_end:
+      continue
+    char = text[pos]
+
+    if char != ".":
+      boundary = _after_quote(text, pos + 1, "\"")
+    elif pos > 0 and text[pos - 1] in _CAPS:
+      scanned_end = _initials_end(text, pos)
+      boundary = _initials_boundary(text, pos - 1, scanned_end)
+    else:
+      suffix_start = None
+      if pos > 0 and text[pos - 1] in _SUFFIX_ENDINGS:
+        suffix_start = _suffix_start(text, pos)
+
+      if suffix_start is None:
+        boundary = _after_quote(text, pos + 1, "\"”")
+      else:
+        boundary = -1
+        if suffix_start >= starter_end:
+          suffix_starter_end = _starter_end(text, pos + 1)
+          if suffix_starter_end >= 0:
+            boundary = pos + 1
+            starter_end = suffix_starter_end
+
+    if boundary < 0:
+      continue
+
+    span_start, span_end = sentence_start, boundary
+    while span_start < span_end and text[span_start].isspace():
+      span_start += 1
+    while span_end > span_start and text[span_end - 1].isspace():
+      span_end -= 1
+    if span_start < span_end:
+      spans.append((span_start, span_end))
+    sentence_start = boundary
+
+  return spans
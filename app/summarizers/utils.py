@@ -1,58 +1,62 @@
-import re
+from typing import NamedTuple, List, Tuple
+from . import splitter
 
-# The code for this function was made by D Greenberg and can be found at:
-# https://stackoverflow.com/questions/4576077/python-split-text-on-sentences
+# Returns the sentences of the text. Newlines within a sentence are turned
+# into spaces.
 def split_into_sentences(text):
-  caps = "([A-Z])"
-  prefixes = "(Mr|St|Mrs|Ms|Dr)[.]"
-  suffixes = "(Inc|Ltd|Jr|Sr|Co|Corp)"
-  starters = "(Mr|Mrs|Ms|Dr|He\s|She\s|It\s|They\s|Their\s|Our\s|We\s|But\s|However\s|That\s|This\s|Wherever)"
-  acronyms = "([A-Z][.][A-Z][.](?:[A-Z][.])?)"
-  websites = "[.](com|net|org|io|gov)"
-
-  text = " " + text + "  "
-  text = text.replace("\n"," ")
-  text = re.sub(prefixes,"\\1<prd>",text)
-  text = re.sub(websites,"<prd>\\1",text)
-  if "Ph.D" in text: text = text.replace("Ph.D.","Ph<prd>D<prd>")
-  text = re.sub("\s" + caps + "[.] "," \\1<prd> ",text)
-  text = re.sub(acronyms+" "+starters,"\\1<stop> \\2",text)
-  text = re.sub(caps + "[.]" + caps + "[.]" + caps + "[.]","\\1<prd>\\2<prd>\\3<prd>",text)
-  text = re.sub(caps + "[.]" + caps + "[.]","\\1<prd>\\2<prd>",text)
-  text = re.sub(" "+suffixes+"[.] "+starters," \\1<stop> \\2",text)
-  text = re.sub(" "+suffixes+"[.]"," \\1<prd>",text)
-  text = re.sub(" " + caps + "[.]"," \\1<prd>",text)
-  if "”" in text: text = text.replace(".”","”.")
-  if "\"" in text: text = text.replace(".\"","\".")
-  if "!" in text: text = text.replace("!\"","\"!")
-  if "?" in text: text = text.replace("?\"","\"?")
-  text = text.replace(".",".<stop>")
-  text = text.replace("?","?<stop>")
-  text = text.replace("!","!<stop>")
-  text = text.replace("<prd>",".")
-  sentences = text.split("<stop>")
-  sentences = sentences[:-1]
-  sentences = [s.strip() for s in sentences]
-  return sentences
-  
-# Returns a dict with every word in the text and its relative frequency
-def calc_word_freq(sentences):
-  word_count = {}
+  return [
+    text[start:end].replace("\n", " ")
+    for start, end in splitter.split_spans(text)
+  ]
+
+class TokenizedDocument(NamedTuple):
+  """
+  A document split into sentences and normalized words in a single pass.
+
+  Every distinct normalized word is given an integer id (in order of first
+  appearance) so the summarizers can work with lists indexed by id instead
+  of re-splitting and re-normalizing the sentences themselves.
+  """
+  sentences: List[str]
+  spans: List[Tuple[int, int]]      # Offsets of every sentence in the text
+  sentence_tokens: List[List[int]]  # Word ids of every sentence, in order
+  vocabulary: List[str]             # Normalized word of every id
+  term_counts: List[int]            # No. of times every id appears
+  total_words: int
+
+# Returns the normalized form of a word as used by the summarizers
+def normalize_word(word):
+  return word.strip('.!?,()\n').lower()
+
+# Splits the text into sentences and words and normalizes every word once
+def tokenize(text):
+  spans = splitter.split_spans(text)
+  sentences = [text[start:end].replace("\n", " ") for start, end in spans]
+  sentence_tokens = []
+  vocabulary = []
+  term_counts = []
+  word_ids = {}
   total_words = 0
-  word_freq = {}
 
-  # Count the number of times each word appears in the text
   for s in sentences:
+    tokens = []
     for word in s.split():
-      word = word.strip('.!?,()\n').lower()
-      if word not in word_count:
-        word_count[word] = 1
-      else:
-        word_count[word] += 1
-      total_words += 1
-
-  # Calculate the frequency of each word
-  for word, count in word_count.items():
-    word_freq[word] = count / total_words
-
-  return word_freq
+      word = normalize_word(word)
+      word_id = word_ids.get(word)
+      if word_id is None:
+        word_id = len(vocabulary)
+        word_ids[word] = word_id
+        vocabulary.append(word)
+        term_counts.append(0)
+      term_counts[word_id] += 1
+      tokens.append(word_id)
+    total_words += len(tokens)
+    sentence_tokens.append(tokens)
+
+  return TokenizedDocument(
+    sentences, spans, sentence_tokens, vocabulary, term_counts, total_words
+  )
+
+# Returns a list with the relative frequency of every word id in the document
+def calc_word_freq(doc):
+  return [count / doc.total_words for count in doc.term_counts]
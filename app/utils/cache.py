@@ -0,0 +1,144 @@
+from collections import OrderedDict
+from hashlib import sha256
+from time import monotonic
+from typing import Any, Callable, Hashable, NamedTuple, Union
+
+
+def content_hash(text: str) -> str:
+  """
+  Hash the contents of a document so that equal contents share cache entries
+  :param text:
+  :return: hex digest of the SHA-256 of the UTF-8 encoded text
+  """
+  return sha256(text.encode('utf-8')).hexdigest()
+
+def summary_size(summary: list) -> int:
+  """
+  Estimate the memory taken by a summary
+  :param summary: list of sentences
+  :return: no. of bytes of the UTF-8 encoded sentences
+  """
+  return sum(len(sentence.encode('utf-8')) for sentence in summary)
+
+
+class LRUCache:
+  """
+  In-process cache bounded both by no. of entries and by total size, evicting
+  the least recently used entries first. Entries expire once they are older
+  than the time to live.
+  """
+
+  class Entry(NamedTuple):
+    value: Any
+    size: int
+    expires_at: float
+
+  class Stats(NamedTuple):
+    entries: int
+    size: int
+    max_entries: int
+    max_size: int
+    ttl: Union[float, None]
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+  def __init__(
+      self,
+      max_entries: int,
+      max_size: int,
+      ttl: Union[float, None],
+      sizeof: Callable[[Any], int]=summary_size,
+      clock: Callable[[], float]=monotonic
+  ):
+    """
+    :param max_entries: max. no. of entries kept
+    :param max_size: max. total size of the entries kept, as given by sizeof
+    :param ttl: time to live of every entry, in seconds, None for entries
+    that only leave the cache when evicted
+    :param sizeof: estimates the size of a value
+    :param clock: current time, in seconds
+    """
+    self.max_entries = max_entries
+    self.max_size = max_size
+    self.ttl = ttl
+    self.sizeof = sizeof
+    self.clock = clock
+
+    self.entries = OrderedDict()
+    self.size = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expirations = 0
+
+  def __len__(self) -> int:
+    return len(self.entries)
+
+  def get(self, key: Hashable) -> Union[Any, None]:
+    """
+    Get the value of a key, marking it as the most recently used
+    :param key:
+    :return: value, None if it is not cached or has expired
+    """
+    entry = self.entries.get(key)
+    if entry is None:
+      self.misses += 1
+      return None
+
+    if entry.expires_at <= self.clock():
+      self._remove(key)
+      self.expirations += 1
+      self.misses += 1
+      return None
+
+    self.entries.move_to_end(key)
+    self.hits += 1
+    return entry.value
+
+  def put(self, key: Hashable, value: Any) -> None:
+    """
+    Cache the value of a key, evicting the least recently used entries if the
+    cache goes over its bounds. Values larger than the whole cache are not
+    cached.
+    :param key:
+    :param value:
+    :return:
+    """
+    size = self.sizeof(value)
+    if key in self.entries:
+      self._remove(key)
+    if size > self.max_size or self.max_entries <= 0:
+      return
+
+    expires_at = float('inf')
+    if self.ttl is not None:
+      expires_at = self.clock() + self.ttl
+    self.entries[key] = LRUCache.Entry(value, size, expires_at)
+    self.size += size
+
+    while len(self.entries) > self.max_entries or self.size > self.max_size:
+      self._remove(next(iter(self.entries)))
+      self.evictions += 1
+
+  def clear(self) -> None:
+    self.entries.clear()
+    self.size = 0
+
+  def stats(self) -> Stats:
+    return LRUCache.Stats(
+      len(self.entries),
+      self.size,
+      self.max_entries,
+      self.max_size,
+      self.ttl,
+      self.hits,
+      self.misses,
+      self.evictions,
+      self.expirations
+    )
+
+  def _remove(self, key: Hashable) -> None:
+    entry = self.entries.pop(key)
+    self.size -= entry.size
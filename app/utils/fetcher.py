@@ -0,0 +1,136 @@
+import asyncio
+import aiohttp
+from typing import Dict, Mapping, NamedTuple, Union
+
+# Size of the pieces in which response bodies are read
+CHUNK_SIZE = 64 * 1024
+
+
+class FetchError(Exception):
+  """
+  Raised when a web page can not be fetched
+  """
+
+
+class BodyTooLargeError(FetchError):
+  """
+  Raised when the body of a web page is larger than allowed
+  """
+
+
+class Fetcher:
+  """
+  Fetches web pages through a shared aiohttp.ClientSession, reusing
+  keep-alive connections across requests. Bodies compressed with gzip or
+  deflate are decoded by the session.
+  """
+
+  class Response(NamedTuple):
+    url: str
+    status: int
+    headers: Mapping[str, str]  # Case-insensitive
+    body: bytes
+
+  def __init__(
+      self,
+      session: aiohttp.ClientSession,
+      max_body_size: int,
+      timeout: Union[float, None]=None
+  ):
+    """
+    :param session: session used for every request
+    :param max_body_size: max. no. of bytes of a (decoded) body
+    :param timeout: max. total time of a request, in seconds
+    """
+    self.session = session
+    self.max_body_size = max_body_size
+    self.timeout = timeout
+
+  async def fetch(
+      self,
+      url: str,
+      headers: Union[Dict[str, str], None]=None
+  ) -> Response:
+    """
+    Fetch a web page
+    :param url:
+    :param headers: additional request headers
+    :return: response, whose status is either successful or 304
+    :raises FetchError: if the page can not be fetched or has an error status
+    :raises BodyTooLargeError: if the body is larger than max_body_size
+    """
+    try:
+      async with self.session.get(
+        url, headers=headers, timeout=self.timeout
+      ) as response:
+        if response.status >= 400:
+          raise FetchError('{} responded with status {}'.format(
+            url, response.status
+          ))
+
+        # Reject bodies that are announced to be too large right away
+        content_length = response.headers.get('Content-Length')
+        if content_length is not None and content_length.isdigit() and \
+            int(content_length) > self.max_body_size:
+          raise BodyTooLargeError('{} has a body of {} bytes'.format(
+            url, content_length
+          ))
+
+        body = await self.read_body(response)
+        return Fetcher.Response(
+          str(response.url), response.status, response.headers.copy(), body
+        )
+    except aiohttp.ClientError as error:
+      raise FetchError('Could not fetch {}: {}'.format(url, error)) from error
+    except asyncio.TimeoutError as error:
+      raise FetchError('Fetching {} timed out'.format(url)) from error
+
+  async def read_body(self, response: aiohttp.ClientResponse) -> bytes:
+    # Read the body piece-by-piece, so that a body larger than allowed is
+    # dropped as soon as it goes over the limit (e.g. when decompressed)
+    chunks = []
+    size = 0
+    chunk = await response.content.read(CHUNK_SIZE)
+    while chunk:
+      size += len(chunk)
+      if size > self.max_body_size:
+        raise BodyTooLargeError('{} has a body of more than {} bytes'.format(
+          response.url, self.max_body_size
+        ))
+      chunks.append(chunk)
+      chunk = await response.content.read(CHUNK_SIZE)
+
+    return b''.join(chunks)
+
+  async def close(self) -> None:
+    await self.session.close()
+
+
+def create_session(
+    max_connections: int,
+    max_connections_per_host: int,
+    keepalive_timeout: float,
+    connect_timeout: float,
+    read_timeout: float
+) -> aiohttp.ClientSession:
+  """
+  Create the session shared by every fetch
+  :param max_connections: max. no. of simultaneous connections
+  :param max_connections_per_host: max. no. of simultaneous connections to a
+  same host
+  :param keepalive_timeout: time an idle connection is kept open, in seconds
+  :param connect_timeout: max. time to connect to a host, in seconds
+  :param read_timeout: max. time to wait for the host to send data, in
+  seconds
+  :return:
+  """
+  connector = aiohttp.TCPConnector(
+    limit=max_connections,
+    limit_per_host=max_connections_per_host,
+    keepalive_timeout=keepalive_timeout
+  )
+  return aiohttp.ClientSession(
+    connector=connector,
+    conn_timeout=connect_timeout,
+    read_timeout=read_timeout
+  )
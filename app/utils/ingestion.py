@@ -0,0 +1,106 @@
+import lxml.etree
+from aiohttp.streams import StreamReader
+from typing import Union
+
+# Size of the pieces in which request bodies are read
+CHUNK_SIZE = 64 * 1024
+# Tags whose contents are not text of the document
+SKIPPED_TAGS = frozenset(['script', 'style'])
+
+
+class ContentTooLargeError(Exception):
+  """
+  Raised when a request body is larger than allowed
+  """
+
+
+class HTMLTextTarget:
+  """
+  lxml parser target that keeps the text of an HTML document (i.e. what
+  lxml.html's text_content() gives once script and style tags are removed)
+  without building its tree
+  """
+
+  def __init__(self):
+    self.chunks = []
+    # No. of script and style tags the parser is within
+    self.skipped_depth = 0
+
+  def start(self, tag: str, attrib: dict) -> None:
+    if tag in SKIPPED_TAGS:
+      self.skipped_depth += 1
+
+  def end(self, tag: str) -> None:
+    if tag in SKIPPED_TAGS:
+      self.skipped_depth -= 1
+
+  def data(self, data: str) -> None:
+    if not self.skipped_depth:
+      self.chunks.append(data)
+
+  def close(self) -> str:
+    return ''.join(self.chunks)
+
+
+def check_content_length(content_length: Union[int, None], max_size: int):
+  """
+  Reject a body that is announced to be too large before reading it
+  :param content_length: announced size of the body
+  :param max_size: max. no. of bytes of the body
+  :return:
+  :raises ContentTooLargeError:
+  """
+  if content_length is not None and content_length > max_size:
+    raise ContentTooLargeError(
+      'The body has {} bytes, more than the {} allowed'.format(
+        content_length, max_size
+      )
+    )
+
+async def read_body(content: StreamReader, max_size: int) -> bytes:
+  """
+  Read a body piece-by-piece, giving up as soon as it goes over the limit
+  :param content: stream of the body
+  :param max_size: max. no. of bytes of the body
+  :return:
+  :raises ContentTooLargeError:
+  """
+  chunks = []
+  size = 0
+  chunk = await content.read(CHUNK_SIZE)
+  while chunk:
+    size += len(chunk)
+    check_content_length(size, max_size)
+    chunks.append(chunk)
+    chunk = await content.read(CHUNK_SIZE)
+
+  return b''.join(chunks)
+
+async def read_html_text(
+    content: StreamReader,
+    max_size: int,
+    encoding: str='utf-8'
+) -> str:
+  """
+  Read an HTML body piece-by-piece, feeding every piece to an incremental
+  parser so that only the text of the document is kept in memory rather than
+  the whole body
+  :param content: stream of the body
+  :param max_size: max. no. of bytes of the body
+  :param encoding: encoding of the body, UTF-8 unless the request gives one
+  :return: text of the document
+  :raises ContentTooLargeError:
+  :raises LookupError: if the encoding is not known
+  """
+  parser = lxml.etree.HTMLParser(target=HTMLTextTarget(), encoding=encoding)
+  size = 0
+  chunk = await content.read(CHUNK_SIZE)
+  if not chunk:
+    return ''
+  while chunk:
+    size += len(chunk)
+    check_content_length(size, max_size)
+    parser.feed(chunk)
+    chunk = await content.read(CHUNK_SIZE)
+
+  return parser.close()
@@ -0,0 +1,242 @@
+import asyncio
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Dict, List, NamedTuple, Union
+from .cache import LRUCache
+
+
+class CachedPage(NamedTuple):
+  url: str
+  etag: Union[str, None]
+  last_modified: Union[str, None]
+  text: str  # Text extracted from the page's article
+
+
+def page_size(page: CachedPage) -> int:
+  # Approximate size of a page in memory, in bytes
+  return len(page.url) + len(page.text)
+
+
+class PageCache:
+  """
+  Cache of the articles extracted from fetched web pages, together with the
+  validators (ETag and Last-Modified) needed to revalidate them. Pages are
+  kept in memory and, optionally, in a larger on-disk tier that survives
+  restarts. Both tiers are bounded by size and evict the least recently used
+  pages first.
+  """
+
+  class Stats(NamedTuple):
+    entries: int
+    size: int
+    max_entries: int
+    max_size: int
+    disk_entries: int
+    disk_size: int
+    max_disk_size: int
+    hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+    disk_evictions: int
+    revalidations: int
+    not_modified: int
+    disk_write_errors: int
+
+  def __init__(
+      self,
+      max_entries: int,
+      max_size: int,
+      directory: Union[str, None]=None,
+      max_disk_size: int=0
+  ):
+    """
+    :param max_entries: max. no. of pages kept in memory
+    :param max_size: max. size of the pages kept in memory, in bytes
+    :param directory: directory of the on-disk tier, None to keep pages in
+    memory only
+    :param max_disk_size: max. size of the pages kept on disk, in bytes
+    """
+    self.memory = LRUCache(
+      max_entries=max_entries,
+      max_size=max_size,
+      ttl=None,
+      sizeof=page_size
+    )
+    self.directory = directory
+    self.max_disk_size = max_disk_size
+
+    # Size of every file of the on-disk tier, least recently used first
+    self.disk_index = OrderedDict()
+    self.disk_size = 0
+    if directory is not None:
+      self._load_disk_index()
+
+    self.hits = 0
+    self.disk_hits = 0
+    self.misses = 0
+    self.disk_evictions = 0
+    self.revalidations = 0
+    self.not_modified = 0
+    self.disk_write_errors = 0
+
+  async def get(self, url: str) -> Union[CachedPage, None]:
+    """
+    Get a cached page, looking it up in memory and then on disk
+    :param url:
+    :return: page, None if it is not cached
+    """
+    page = self.memory.get(url)
+    if page is not None:
+      self.hits += 1
+      return page
+
+    file_name = self._file_name(url)
+    if file_name in self.disk_index:
+      page = await asyncio.get_event_loop().run_in_executor(
+        None, self._read_page, file_name
+      )
+      if page is not None and page.url == url:
+        self.disk_index.move_to_end(file_name)
+        self.memory.put(url, page)
+        self.disk_hits += 1
+        return page
+      self.disk_size -= self.disk_index.pop(file_name, 0)
+
+    self.misses += 1
+    return None
+
+  async def put(self, page: CachedPage) -> None:
+    """
+    Cache a page, as long as it has validators to revalidate it with. The
+    page is only kept in memory if it can not be written to disk.
+    :param page:
+    :return:
+    """
+    if page.etag is None and page.last_modified is None:
+      return
+
+    self.memory.put(page.url, page)
+    if self.directory is None:
+      return
+
+    data = json.dumps(page._asdict()).encode('utf-8')
+    file_name = self._file_name(page.url)
+    self.disk_size -= self.disk_index.pop(file_name, 0)
+    if len(data) > self.max_disk_size:
+      return
+
+    self.disk_index[file_name] = len(data)
+    self.disk_size += len(data)
+    evicted_file_names = []
+    while self.disk_size > self.max_disk_size:
+      evicted_file_name, size = self.disk_index.popitem(last=False)
+      self.disk_size -= size
+      self.disk_evictions += 1
+      evicted_file_names.append(evicted_file_name)
+
+    is_written = await asyncio.get_event_loop().run_in_executor(
+      None, self._write_page, file_name, data, evicted_file_names
+    )
+    if not is_written:
+      self.disk_size -= self.disk_index.pop(file_name, 0)
+      self.disk_write_errors += 1
+
+  def conditional_headers(self, page: Union[CachedPage, None]) -> Dict[
+    str, str
+  ]:
+    """
+    Headers asking the server to only send the page if it changed since it
+    was cached
+    :param page: cached page
+    :return:
+    """
+    headers = {}
+    if page is None:
+      return headers
+
+    if page.etag is not None:
+      headers['If-None-Match'] = page.etag
+    if page.last_modified is not None:
+      headers['If-Modified-Since'] = page.last_modified
+    return headers
+
+  def record_revalidation(self, not_modified: bool) -> None:
+    self.revalidations += 1
+    if not_modified:
+      self.not_modified += 1
+
+  def stats(self) -> Stats:
+    memory_stats = self.memory.stats()
+    return PageCache.Stats(
+      memory_stats.entries,
+      memory_stats.size,
+      memory_stats.max_entries,
+      memory_stats.max_size,
+      len(self.disk_index),
+      self.disk_size,
+      self.max_disk_size,
+      self.hits,
+      self.disk_hits,
+      self.misses,
+      memory_stats.evictions,
+      self.disk_evictions,
+      self.revalidations,
+      self.not_modified,
+      self.disk_write_errors
+    )
+
+  def _file_name(self, url: str) -> str:
+    return sha256(url.encode('utf-8')).hexdigest() + '.json'
+
+  def _load_disk_index(self) -> None:
+    os.makedirs(self.directory, exist_ok=True)
+    entries = [
+      entry for entry in os.scandir(self.directory)
+      if entry.is_file() and entry.name.endswith('.json')
+    ]
+    # Pages used last were written last
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries:
+      self.disk_index[entry.name] = entry.stat().st_size
+      self.disk_size += entry.stat().st_size
+
+  def _read_page(self, file_name: str) -> Union[CachedPage, None]:
+    try:
+      with open(os.path.join(self.directory, file_name), 'rb') as f:
+        return CachedPage(**json.loads(f.read().decode('utf-8')))
+    except (OSError, ValueError, TypeError):
+      return None
+
+  def _write_page(
+      self,
+      file_name: str,
+      data: bytes,
+      evicted_file_names: List[str]
+  ) -> bool:
+    # Write to a temporary file of its own first, so that a page is never
+    # read while it is only partly written, even when the same page is
+    # written by several requests at once
+    is_written = True
+    try:
+      fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+      try:
+        with os.fdopen(fd, 'wb') as f:
+          f.write(data)
+        os.replace(temp_path, os.path.join(self.directory, file_name))
+      except OSError:
+        os.remove(temp_path)
+        raise
+    except OSError:
+      is_written = False
+
+    for evicted_file_name in evicted_file_names:
+      try:
+        os.remove(os.path.join(self.directory, evicted_file_name))
+      except OSError:
+        pass
+
+    return is_written
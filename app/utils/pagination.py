@@ -0,0 +1,75 @@
+import base64
+import binascii
+import pytz
+import uuid
+from datetime import datetime, timedelta
+from os import getenv
+from typing import Tuple, Union
+
+# No. of entries of a page when no limit is given, and max. limit of a page
+DEFAULT_PAGE_SIZE = int(getenv('HISTORY_PAGE_SIZE', '50'))
+MAX_PAGE_SIZE = int(getenv('HISTORY_MAX_PAGE_SIZE', '500'))
+
+EPOCH = datetime(1970, 1, 1, tzinfo=pytz.utc)
+
+
+class PaginationError(Exception):
+  """
+  Raised when the limit or the cursor of a page is not valid
+  """
+
+
+def encode_cursor(position: Tuple[datetime, str]) -> str:
+  """
+  Make an opaque cursor out of the position of an entry, i.e. its time and
+  its id
+  :param position:
+  :return:
+  """
+  moment, entry_id = position
+  microseconds = (moment - EPOCH) // timedelta(microseconds=1)
+  cursor = '{}:{}'.format(microseconds, entry_id).encode('utf-8')
+  return base64.urlsafe_b64encode(cursor).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+  """
+  Get the position of an entry back out of its cursor
+  :param cursor:
+  :return: time and id of the entry
+  :raises PaginationError:
+  """
+  try:
+    decoded = base64.urlsafe_b64decode(
+      cursor + '=' * (-len(cursor) % 4)
+    ).decode('utf-8')
+    microseconds, entry_id = decoded.split(':')
+    return (
+      EPOCH + timedelta(microseconds=int(microseconds)),
+      str(uuid.UUID(entry_id))
+    )
+  except (binascii.Error, UnicodeError, ValueError, OverflowError):
+    raise PaginationError('The cursor is not valid')
+
+def get_limit(
+    limit: Union[str, None],
+    default: Union[int, None]=DEFAULT_PAGE_SIZE
+) -> Union[int, None]:
+  """
+  Get the no. of entries of a page requested through a query parameter
+  :param limit: value of the parameter, None if it is not given
+  :param default: no. of entries when no limit is given
+  :return:
+  :raises PaginationError: if the limit is not between 1 and MAX_PAGE_SIZE
+  """
+  if limit is None:
+    return default
+
+  try:
+    page_size = int(limit)
+  except ValueError:
+    page_size = 0
+  if not 1 <= page_size <= MAX_PAGE_SIZE:
+    raise PaginationError(
+      'The limit must be between 1 and {}'.format(MAX_PAGE_SIZE)
+    )
+  return page_size
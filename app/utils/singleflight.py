@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, NamedTuple
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url: str) -> str:
+  """
+  Normalize a URL so that URLs of a same web page compare equal, i.e. with a
+  lowercase scheme and host, no default port and no fragment
+  :param url:
+  :return:
+  """
+  parts = urlsplit(url.strip())
+  scheme = parts.scheme.lower()
+  netloc = parts.netloc.lower()
+  default_port = ':{}'.format(DEFAULT_PORTS.get(scheme))
+  if netloc.endswith(default_port):
+    netloc = netloc[:-len(default_port)]
+
+  return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
+
+
+class SingleFlight:
+  """
+  Coalesces concurrent calls with a same key into a single in-flight call
+  whose result (or exception) is shared by all of the callers. The call is
+  only cancelled once every caller waiting for it was cancelled.
+  """
+
+  class Call:
+    def __init__(self, task: asyncio.Future):
+      self.task = task
+      self.waiters = 0
+
+  class Stats(NamedTuple):
+    in_flight: int
+    calls: int
+    shared: int
+
+  def __init__(self):
+    # Calls in flight, by key
+    self.calls = {}
+    self.started = 0
+    self.shared = 0
+
+  async def run(
+      self,
+      key: Hashable,
+      func: Callable[..., Awaitable],
+      *args
+  ) -> Any:
+    """
+    Call a coroutine function, unless a call with the same key is already in
+    flight, in which case wait for the result of that call instead
+    :param key:
+    :param func: coroutine function
+    :param args:
+    :return: result of the call
+    """
+    call = self.calls.get(key)
+    if call is None:
+      call = SingleFlight.Call(asyncio.ensure_future(func(*args)))
+      self.calls[key] = call
+      call.task.add_done_callback(lambda _: self._forget(key, call))
+      self.started += 1
+    else:
+      self.shared += 1
+
+    call.waiters += 1
+    try:
+      # Shielded, so that a caller that is cancelled does not cancel the call
+      # for the other callers
+      return await asyncio.shield(call.task)
+    finally:
+      call.waiters -= 1
+      if call.waiters == 0 and not call.task.done():
+        call.task.cancel()
+        self._forget(key, call)
+
+  def stats(self) -> Stats:
+    return SingleFlight.Stats(len(self.calls), self.started, self.shared)
+
+  def _forget(self, key: Hashable, call: Call) -> None:
+    # A later call with the same key may already be in flight
+    if self.calls.get(key) is call:
+      del self.calls[key]
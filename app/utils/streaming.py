@@ -0,0 +1,26 @@
+import json
+from aiohttp.web import StreamResponse
+
+
+async def write_line(response: StreamResponse, data: dict) -> None:
+  """
+  Write a line of newline-delimited JSON, waiting for the client to keep up
+  :param response: prepared response
+  :param data:
+  :return:
+  """
+  response.write(json.dumps(data).encode('utf-8') + b'\n')
+  await response.drain()
+
+async def write_event(response: StreamResponse, event: str, data: dict) -> None:
+  """
+  Write a Server-Sent Event, waiting for the client to keep up
+  :param response: prepared response
+  :param event: name of the event
+  :param data:
+  :return:
+  """
+  response.write('event: {}\ndata: {}\n\n'.format(
+    event, json.dumps(data)
+  ).encode('utf-8'))
+  await response.drain()
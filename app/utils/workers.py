@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from time import perf_counter
+from typing import Any, Callable, NamedTuple, Tuple, Union
+
+
+def timed_call(func: Callable, args: tuple) -> Tuple[Any, float]:
+  """
+  Call a function, measuring how long it runs. Runs within the workers.
+  :param func:
+  :param args:
+  :return: result of the function and its execution time, in seconds
+  """
+  start = perf_counter()
+  result = func(*args)
+  return result, perf_counter() - start
+
+
+class WorkerPool:
+  """
+  Runs CPU-bound functions in a pool of worker processes so that they do not
+  block the event loop. With no workers the functions are run inline, on the
+  event loop.
+  """
+
+  class Stats(NamedTuple):
+    workers: int
+    pending: int
+    queued: int
+    completed: int
+    failed: int
+    timeouts: int
+    execution_time: float
+    max_execution_time: float
+    wait_time: float
+
+  def __init__(
+      self,
+      max_workers: int,
+      timeout: Union[float, None]=None,
+      executor: Union[Executor, None]=None
+  ):
+    """
+    :param max_workers: no. of worker processes, 0 to run functions inline
+    :param timeout: max. time to wait for the result of a function, in
+    seconds, None to wait for as long as it takes
+    :param executor: runs the functions, a process pool by default
+    """
+    self.max_workers = max_workers
+    self.timeout = timeout
+    self.executor = executor
+    if self.executor is None and max_workers > 0:
+      self.executor = ProcessPoolExecutor(max_workers=max_workers)
+
+    self.pending = 0
+    self.completed = 0
+    self.failed = 0
+    self.timeouts = 0
+    self.execution_time = 0.0
+    self.max_execution_time = 0.0
+    self.wait_time = 0.0
+
+  async def run(self, func: Callable, *args) -> Any:
+    """
+    Run a function in a worker and wait for its result. The function and its
+    arguments are pickled, so the function must be defined at module level
+    and the arguments should be kept compact.
+    A function that times out is not interrupted: its worker stays busy
+    until it returns, but its result is dropped.
+    :param func:
+    :param args:
+    :return: result of the function
+    :raises asyncio.TimeoutError: if the function does not return in time
+    """
+    submitted_at = perf_counter()
+    self.pending += 1
+    try:
+      if self.executor is None:
+        result, execution_time = timed_call(func, args)
+      else:
+        loop = asyncio.get_event_loop()
+        result, execution_time = await asyncio.wait_for(
+          loop.run_in_executor(
+            self.executor, partial(timed_call, func, args)
+          ),
+          self.timeout
+        )
+    except asyncio.TimeoutError:
+      self.timeouts += 1
+      raise
+    except Exception:
+      self.failed += 1
+      raise
+    finally:
+      self.pending -= 1
+
+    self.completed += 1
+    self.execution_time += execution_time
+    self.max_execution_time = max(self.max_execution_time, execution_time)
+    self.wait_time += max(perf_counter() - submitted_at - execution_time, 0)
+    return result
+
+  def shutdown(self) -> None:
+    if self.executor is not None:
+      self.executor.shutdown(wait=False)
+
+  def stats(self) -> Stats:
+    return WorkerPool.Stats(
+      self.max_workers,
+      self.pending,
+      # Functions waiting for a free worker
+      max(self.pending - self.max_workers, 0),
+      self.completed,
+      self.failed,
+      self.timeouts,
+      self.execution_time,
+      self.max_execution_time,
+      self.wait_time
+    )
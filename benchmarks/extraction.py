@@ -0,0 +1,87 @@
+"""
+Compare extracting the article of web pages from the tree readability
+already parsed against the previous implementation, which parsed
+readability's output again with BeautifulSoup.
+
+Run from the base of the project directory with:
+  python -m benchmarks.extraction [directory of saved .html pages]
+
+Without a directory, pages are generated from the test corpus.
+"""
+import glob
+import os
+import sys
+from html import escape
+from app import SummaryController
+from . import legacy, utils
+
+SIZES = [50 * 1024, 200 * 1024, 1024 * 1024]
+
+
+def generate_page(size: int) -> bytes:
+  """
+  Build a news-like page around an article of roughly the given size
+  :param size:
+  :return:
+  """
+  paragraphs = "".join(
+    "<p>{}</p>\n    ".format(escape(paragraph))
+    for paragraph in utils.load_document(size).split(". ")
+  )
+  navigation = "".join(
+    '<li><a href="/section/{0}">Section {0}</a></li>'.format(i)
+    for i in range(30)
+  )
+  return """<!DOCTYPE html>
+<html>
+<head>
+  <title>Article</title>
+  <style>body {{ font-family: serif; }}</style>
+  <script>window.analytics = {{ enabled: true }};</script>
+</head>
+<body>
+  <header><nav><ul>{}</ul></nav></header>
+  <div class="article-body">
+    <h1>Article  headline</h1>
+    {}
+    <script>renderAd("inline");</script>
+  </div>
+  <footer class="footer">Copyright &copy; The Newspaper</footer>
+</body>
+</html>
+""".format(navigation, paragraphs).encode("utf-8")
+
+def load_pages(directory: str):
+  for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+    with open(path, "rb") as f:
+      yield os.path.basename(path), f.read()
+
+def main():
+  if len(sys.argv) > 1:
+    pages = list(load_pages(sys.argv[1]))
+  else:
+    pages = [
+      ("generated ({} KB)".format(size // 1024), generate_page(size))
+      for size in SIZES
+    ]
+
+  before_total = after_total = 0
+  for name, html in pages:
+    if SummaryController.extract_article_text(html) != \
+        legacy.extract_article_text(html):
+      print("{}: the extracted text differs".format(name))
+
+    before = utils.best_of(lambda: legacy.extract_article_text(html), repeat=3)
+    after = utils.best_of(
+      lambda: SummaryController.extract_article_text(html), repeat=3
+    )
+    before_total += before
+    after_total += after
+    utils.report(name[:40], before, after)
+
+  if len(pages) > 1:
+    utils.report("total", before_total, after_total)
+
+
+if __name__ == "__main__":
+  main()
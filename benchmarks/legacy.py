@@ -0,0 +1,163 @@
+"""
+Previous implementations of the code paths being benchmarked, kept verbatim
+so every benchmark compares against what used to run in production.
+"""
+import os
+import re
+import sys
+
+
+# The code for this function was made by D Greenberg and can be found at:
+# https://stackoverflow.com/questions/4576077/python-split-text-on-sentences
+def split_into_sentences(text):
+  caps = "([A-Z])"
+  prefixes = "(Mr|St|Mrs|Ms|Dr)[.]"
+  suffixes = "(Inc|Ltd|Jr|Sr|Co|Corp)"
+  starters = r"(Mr|Mrs|Ms|Dr|He\s|She\s|It\s|They\s|Their\s|Our\s|We\s|But\s|However\s|That\s|This\s|Wherever)"
+  acronyms = "([A-Z][.][A-Z][.](?:[A-Z][.])?)"
+  websites = "[.](com|net|org|io|gov)"
+
+  text = " " + text + "  "
+  text = text.replace("\n"," ")
+  text = re.sub(prefixes,"\\1<prd>",text)
+  text = re.sub(websites,"<prd>\\1",text)
+  if "Ph.D" in text: text = text.replace("Ph.D.","Ph<prd>D<prd>")
+  text = re.sub(r"\s" + caps + "[.] "," \\1<prd> ",text)
+  text = re.sub(acronyms+" "+starters,"\\1<stop> \\2",text)
+  text = re.sub(caps + "[.]" + caps + "[.]" + caps + "[.]","\\1<prd>\\2<prd>\\3<prd>",text)
+  text = re.sub(caps + "[.]" + caps + "[.]","\\1<prd>\\2<prd>",text)
+  text = re.sub(" "+suffixes+"[.] "+starters," \\1<stop> \\2",text)
+  text = re.sub(" "+suffixes+"[.]"," \\1<prd>",text)
+  text = re.sub(" " + caps + "[.]"," \\1<prd>",text)
+  if "”" in text: text = text.replace(".”","”.")
+  if "\"" in text: text = text.replace(".\"","\".")
+  if "!" in text: text = text.replace("!\"","\"!")
+  if "?" in text: text = text.replace("?\"","\"?")
+  text = text.replace(".",".<stop>")
+  text = text.replace("?","?<stop>")
+  text = text.replace("!","!<stop>")
+  text = text.replace("<prd>",".")
+  sentences = text.split("<stop>")
+  sentences = sentences[:-1]
+  sentences = [s.strip() for s in sentences]
+  return sentences
+
+# Returns a dict with every word in the text and its relative frequency
+def calc_word_freq(sentences):
+  word_count = {}
+  total_words = 0
+  word_freq = {}
+
+  # Count the number of times each word appears in the text
+  for s in sentences:
+    for word in s.split():
+      word = word.strip('.!?,()\n').lower()
+      if word not in word_count:
+        word_count[word] = 1
+      else:
+        word_count[word] += 1
+      total_words += 1
+
+  # Calculate the frequency of each word
+  for word, count in word_count.items():
+    word_freq[word] = count / total_words
+
+  return word_freq
+
+
+LUHN_STOP_WORD_LIST = os.path.join(
+  os.path.dirname(__file__), "..", "app", "summarizers", "stop-word-list.txt"
+)
+LUHN_MIN_FREQ = 0.00001
+LUHN_MAX_FREQ = 0.5
+LUHN_MIN_SENTENCE_LENGTH = 5
+
+# Returns the stop word list
+def luhn_get_stop_word_list():
+  l = []
+
+  f = open(LUHN_STOP_WORD_LIST)
+  for word in f.read().split():
+    l.append(word)
+
+  f.close()
+
+  return l
+
+# Returns a list of the signifcant words extracted from the text
+def luhn_get_significant_words(word_freq, stop_words):
+  significant_words = []
+
+  for word, freq in word_freq.items():
+    if word not in stop_words and freq > LUHN_MIN_FREQ and freq < LUHN_MAX_FREQ:
+      significant_words.append(word)
+
+  return significant_words
+
+# Returns the score of a sentence
+def luhn_calc_sentence_score(sentence, significant_words):
+  if len(sentence.split()) < LUHN_MIN_SENTENCE_LENGTH:
+    return 0.0
+
+  num_important_words = 0
+  max_dist = 0 # Maximum distance between two significant words
+  pos_last_sign_word = 0
+  curr_pos = 0
+
+  for word in sentence.split():
+    word = word.strip('.!?,()\n').lower()
+    if word in significant_words:
+      num_important_words += 1
+      dist = curr_pos - pos_last_sign_word
+      if dist > max_dist:
+        max_dist  = dist
+
+    curr_pos += 1
+
+  score = sys.float_info.max
+  if max_dist > 0:
+    score = float(num_important_words ** 2) / float(max_dist)
+
+  return score
+
+def luhn_summarize(text, num_summarized_sentences):
+  stop_words = luhn_get_stop_word_list()
+  sentences = split_into_sentences(text)
+  word_freq = calc_word_freq(sentences)
+  significant_words = luhn_get_significant_words(word_freq, stop_words)
+
+  scored_sentences = [(s, luhn_calc_sentence_score(s, significant_words), order) for order, s in enumerate(sentences)]
+
+  ranked_sentences = sorted(scored_sentences, key=lambda x: x[1], reverse=True)
+  ranked_sentences = ranked_sentences[0:num_summarized_sentences]
+  ranked_sentences = sorted(ranked_sentences, key=lambda x: x[2])
+
+  return [s[0] for s in ranked_sentences]
+
+
+def extract_text_from_html(html):
+  from bs4 import BeautifulSoup
+
+  soup = BeautifulSoup(html, "html.parser")
+  
+  # Remove all script and style tags in the html
+  for s in soup(["style", "script"]):
+    s.extract()
+
+  text = soup.get_text()
+  # Break the text into lines and also remove all leading and trailing space 
+  # in any of the lines
+  lines = (line.strip() for line in text.splitlines())
+  # Break multi-headlines into individual lines
+  chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+  # Remove all blank lines
+  text = ' '.join(chunk for chunk in chunks if chunk)
+  
+  return text
+
+def extract_article_text(html):
+  from readability import readability
+
+  article = readability.Document(html).summary()
+  
+  return extract_text_from_html(article)
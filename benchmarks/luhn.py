@@ -0,0 +1,50 @@
+"""
+Compare the Luhn summarizer (stop words loaded once, hashed significant
+word index, single pass scoring) against the previous implementation.
+
+Run from the base of the project directory with:
+  python -m benchmarks.luhn
+"""
+from app.summarizers import Luhn, utils as summarizer_utils
+from . import legacy, utils
+
+SIZES = [50 * 1024, 200 * 1024, 1024 * 1024]
+
+
+def main():
+  for size in SIZES:
+    text = utils.load_document(size)
+    doc = summarizer_utils.tokenize(text)
+    sentences = legacy.split_into_sentences(text)
+    word_freq = legacy.calc_word_freq(sentences)
+    significant_words = legacy.luhn_get_significant_words(
+      word_freq, legacy.luhn_get_stop_word_list()
+    )
+    significant_ids = Luhn.get_significant_words(
+      doc, summarizer_utils.calc_word_freq(doc), Luhn.STOP_WORDS
+    )
+
+    utils.report(
+      "luhn_summarize ({} KB)".format(size // 1024),
+      utils.best_of(lambda: legacy.luhn_summarize(
+        text, Luhn.NUM_SUMMARIZED_SENTENCES
+      ), repeat=3),
+      utils.best_of(lambda: Luhn.luhn_summarize(
+        summarizer_utils.tokenize(text), Luhn.NUM_SUMMARIZED_SENTENCES
+      ), repeat=3)
+    )
+    utils.report(
+      "sentence scoring ({} KB)".format(size // 1024),
+      utils.best_of(lambda: [
+        legacy.luhn_calc_sentence_score(s, significant_words)
+        for s in sentences
+      ], repeat=3),
+      utils.best_of(lambda: [
+        Luhn.calc_sentence_score(tokens, significant_ids)
+        for tokens in doc.sentence_tokens
+      ], repeat=3)
+    )
+
+
+if __name__ == "__main__":
+  main()
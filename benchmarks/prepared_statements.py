@@ -0,0 +1,98 @@
+"""
+Compare the latency of repository queries sent as SQL text on every run
+against the same queries prepared once per connection and executed by name.
+
+Needs a disposable database. Run from the base of the project directory
+with:
+  POSTGRES_TEST_DSN="dbname=... user=..." python -m benchmarks.prepared_statements
+"""
+import asyncio
+import aiopg
+import uuid
+from os import getenv
+from time import perf_counter
+from typing import Awaitable, Callable
+from app.db import migrations, utils as db_utils
+from app.db.DocumentRepository import DocumentRepository
+from app.db.UserRepository import UserRepository
+from . import utils
+
+NUM_QUERIES = 2000
+NUM_WARMUP_QUERIES = 10
+
+
+async def time_query(
+    run: Callable[[], Awaitable],
+    prepare_threshold: int
+) -> float:
+  """
+  Run a query many times, one run after the other
+  :param run: runs the query once
+  :param prepare_threshold: no. of runs before the query is prepared, 0 to
+  never prepare it
+  :return: mean time of a single run, in seconds
+  """
+  db_utils.PREPARE_THRESHOLD = prepare_threshold
+  # Warm up the connections, preparing the query on them if it is to be
+  # prepared
+  for _ in range(NUM_WARMUP_QUERIES):
+    await run()
+
+  start = perf_counter()
+  for _ in range(NUM_QUERIES):
+    await run()
+  return (perf_counter() - start) / NUM_QUERIES
+
+async def main(dsn: str) -> None:
+  # Migrations need a second connection besides the one they lock through
+  pool = await aiopg.create_pool(dsn=dsn, minsize=1, maxsize=2)
+  await migrations.migrate(pool)
+
+  users = UserRepository(pool)
+  documents = DocumentRepository(pool)
+  username = 'benchmark-{}'.format(uuid.uuid4().hex[:8])
+  await users.create(UserRepository.UserCreate(
+    'Bench', 'Mark', username, 'password'
+  ))
+  user = await users.getby_credentials(username, 'password')
+  document = await documents.create(DocumentRepository.DocumentCreate(
+    user.user_id,
+    'https://benchmark.test/{}'.format(username),
+    utils.load_document(50 * 1024)
+  ))
+
+  try:
+    for name, run in [
+      (
+        'DocumentRepository.getby_url',
+        lambda: documents.getby_url(document.url)
+      ),
+      (
+        'DocumentRepository.getby_url_meta',
+        lambda: documents.getby_url_meta(document.url)
+      ),
+      (
+        'UserRepository.getby_id_public',
+        lambda: users.getby_id_public(user.user_id)
+      )
+    ]:
+      before = await time_query(run, 0)
+      after = await time_query(run, 1)
+      utils.report(name, before, after)
+  finally:
+    await db_utils.query(
+      pool=pool,
+      query='DELETE FROM "document" WHERE id=%s',
+      query_tuple=(document.document_id,)
+    )
+    await documents.delete_unused_bodies()
+    await users.deleteby_id(user.user_id)
+    pool.close()
+    await pool.wait_closed()
+
+
+if __name__ == "__main__":
+  dsn = getenv('POSTGRES_TEST_DSN')
+  if not dsn:
+    raise SystemExit('POSTGRES_TEST_DSN is not set')
+  asyncio.get_event_loop().run_until_complete(main(dsn))
@@ -0,0 +1,34 @@
+"""
+Compare the single-scan sentence splitter against the previous regex
+cascade.
+
+Run from the base of the project directory with:
+  python -m benchmarks.sentence_splitter
+"""
+from app.summarizers import splitter, utils as summarizer_utils
+from . import legacy, utils
+
+SIZES = [10 * 1024, 50 * 1024, 200 * 1024, 1024 * 1024]
+
+
+def main():
+  for size in SIZES:
+    text = utils.load_document(size)
+    # Both splitters must agree on the segmentation being timed
+    assert len(splitter.split_spans(text)) == \
+      len([s for s in legacy.split_into_sentences(text) if s])
+
+    utils.report(
+      "split_into_sentences ({} KB)".format(size // 1024),
+      utils.best_of(lambda: legacy.split_into_sentences(text)),
+      utils.best_of(lambda: splitter.split_spans(text))
+    )
+    utils.report(
+      "split_into_sentences, strings ({} KB)".format(size // 1024),
+      utils.best_of(lambda: legacy.split_into_sentences(text)),
+      utils.best_of(lambda: summarizer_utils.split_into_sentences(text))
+    )
+
+
+if __name__ == "__main__":
+  main()
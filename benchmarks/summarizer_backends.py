@@ -0,0 +1,31 @@
+"""
+Compare the PYTHON and NUMPY summarizer backends on an already tokenized
+document.
+
+Run from the base of the project directory with:
+  python -m benchmarks.summarizer_backends
+"""
+from app.summarizers import Summarizer, utils as summarizer_utils
+from . import utils
+
+SIZES = [50 * 1024, 200 * 1024, 1024 * 1024]
+
+
+def main():
+  for size in SIZES:
+    doc = summarizer_utils.tokenize(utils.load_document(size))
+
+    for summarizer_type in Summarizer.SUMMARIZER_TYPES:
+      utils.report(
+        "{} ({} KB)".format(summarizer_type, size // 1024),
+        utils.best_of(lambda: Summarizer.summarize_document(
+          doc, summarizer_type, "PYTHON"
+        )),
+        utils.best_of(lambda: Summarizer.summarize_document(
+          doc, summarizer_type, "NUMPY"
+        ))
+      )
+
+
+if __name__ == "__main__":
+  main()
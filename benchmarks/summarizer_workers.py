@@ -0,0 +1,49 @@
+"""
+Measure the throughput of summarizing many 500 KB documents concurrently
+through the summarizer worker pool, for an increasing no. of workers.
+
+Run from the base of the project directory with:
+  python -m benchmarks.summarizer_workers
+"""
+import asyncio
+from os import cpu_count
+from time import perf_counter
+from app.summarizers import Summarizer
+from app.utils.workers import WorkerPool
+from . import utils
+
+SIZE = 500 * 1024
+NUM_DOCUMENTS = 16
+
+
+async def summarize_all(pool: WorkerPool, payload: bytes) -> None:
+  await asyncio.gather(*(
+    pool.run(
+      Summarizer.summarize_payload,
+      payload,
+      tuple(Summarizer.SUMMARIZER_TYPES)
+    )
+    for _ in range(NUM_DOCUMENTS)
+  ))
+
+def main():
+  payload = utils.load_document(SIZE).encode("utf-8")
+  loop = asyncio.get_event_loop()
+
+  for workers in sorted(set([0, 1, 2, 4, cpu_count() or 1])):
+    pool = WorkerPool(workers)
+    # Start the worker processes before measuring
+    loop.run_until_complete(pool.run(len, b""))
+
+    start = perf_counter()
+    loop.run_until_complete(summarize_all(pool, payload))
+    elapsed = perf_counter() - start
+    pool.shutdown()
+
+    print("{:>2} workers  {:>6.2f} documents/s".format(
+      workers, NUM_DOCUMENTS / elapsed
+    ))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,37 @@
+import os
+import timeit
+from typing import Callable
+
+CORPUS_DIR = os.path.join(
+  os.path.dirname(__file__), "..", "tests", "summarizers", "corpus"
+)
+
+
+def load_document(size: int) -> str:
+  """
+  Build a document of roughly the given size (in characters) by repeating
+  the articles of the test corpus
+  :param size:
+  :return:
+  """
+  with open(os.path.join(CORPUS_DIR, "article.txt")) as f:
+    article = f.read()
+  with open(os.path.join(CORPUS_DIR, "edge_cases.txt")) as f:
+    article += "\n" + f.read().rsplit("\n", 2)[0] + "\n"
+
+  return (article * (size // len(article) + 1))[:size].rsplit(".", 1)[0] + "."
+
+def best_of(fn: Callable, repeat: int = 5, number: int = 1) -> float:
+  """
+  Run fn and return the best time of a single call, in seconds
+  :param fn:
+  :param repeat:
+  :param number:
+  :return:
+  """
+  return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+def report(name: str, before: float, after: float) -> None:
+  print("{:<40} before {:>9.2f} ms  after {:>9.2f} ms  speedup {:>6.1f}x".format(
+    name, before * 1000, after * 1000, before / after
+  ))
@@ -6,6 +6,9 @@ import app.UserController as User
 from app.AuthenticateController import authenticate
 import app.SummaryController as Summary
 import app.HistoryController as History
+import app.MetricsController as Metrics
+from app.startup import on_startup
+from app.cleanup import on_cleanup
 from app.db.startup import on_startup as db_on_startup
 from app.db.cleanup import on_cleanup as db_on_cleanup
 
@@ -24,8 +27,11 @@ app.router.add_post(path="/user/{user_id}", handler=User.update)
 app.router.add_delete(path="/user/{user_id}", handler=User.delete)
 app.router.add_post(path="/authenticate", handler=authenticate)
 app.router.add_post(path="/summary", handler=Summary.summarize)
+app.router.add_post(path="/summary/batch", handler=Summary.summarize_batch)
+app.router.add_post(path="/summary/stream", handler=Summary.summarize_stream)
 app.router.add_get(path="/summary/types", handler=Summary.get_summarizer_types)
 app.router.add_get(path="/user/{user_id}/history", handler=History.index)
+app.router.add_get(path="/metrics", handler=Metrics.index)
 
 cors = aiohttp_cors.setup(app, defaults={
   "*": aiohttp_cors.ResourceOptions(
@@ -37,7 +43,9 @@ cors = aiohttp_cors.setup(app, defaults={
 for route in list(app.router.routes()):
     cors.add(route)
 
+app.on_startup.append(on_startup)
 app.on_startup.append(db_on_startup)
+app.on_cleanup.append(on_cleanup)
 app.on_cleanup.append(db_on_cleanup)
 
 aiohttp.web.run_app(
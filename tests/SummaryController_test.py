@@ -0,0 +1,503 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+import asynctest
+from multidict import MultiDict
+from asynctest import CoroutineMock
+from app import SummaryController
+from app.utils.cache import LRUCache
+from app.utils.singleflight import SingleFlight
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), 'summarizers', 'corpus')
+
+ARTICLE = """<html>
+<head><script>track();</script></head>
+<body>
+  <nav><a href="/">Home</a> <a href="/news">News</a></nav>
+  <div class="article">
+    <h2>Title  Subtitle</h2>
+    <p>The first paragraph of the article, which is long enough to be kept by
+    readability as part of the content of the article.</p>
+    <script>renderAd();</script>
+    <style>p { color: black; }</style>
+    <p>The second paragraph &amp; its entity, also long enough to be kept by
+    readability as part of the content of the article.</p>
+  </div>
+</body>
+</html>"""
+
+
+class ExtractionTest(TestCase):
+
+  def test_extract_text_from_html(self):
+    self.assertEqual(
+      SummaryController.extract_text_from_html(
+        "<div>\n  Headline  Subheadline \n<p>A\tparagraph</p>"
+        "<script>x();</script> tail.</div>"
+      ),
+      "Headline Subheadline A\tparagraph tail."
+    )
+
+  def test_extract_text_from_empty_html(self):
+    self.assertEqual(SummaryController.extract_text_from_html(""), "")
+    self.assertEqual(SummaryController.extract_text_from_html(None), "")
+
+  def test_extract_article_text(self):
+    text = SummaryController.extract_article_text(ARTICLE.encode("utf-8"))
+
+    self.assertIn(
+      "The first paragraph of the article, which is long enough to be kept "
+      "by readability as part of the content of the article.",
+      text
+    )
+    self.assertIn("The second paragraph & its entity", text)
+    self.assertNotIn("renderAd", text)
+    self.assertNotIn("color", text)
+
+
+class RequestedTypesTest(TestCase):
+
+  def test_get_requested_types(self):
+    self.assertListEqual(
+      SummaryController.get_requested_types("LUHN"), ["LUHN"]
+    )
+    self.assertListEqual(
+      SummaryController.get_requested_types(["LUHN", "FREQUENCY", "LUHN"]),
+      ["LUHN", "FREQUENCY"]
+    )
+    self.assertListEqual(
+      SummaryController.get_requested_types("ALL"),
+      SummaryController.Summarizer.SUMMARIZER_TYPES
+    )
+
+  def test_get_requested_types_invalid(self):
+    self.assertIsNone(SummaryController.get_requested_types("UNKNOWN"))
+    self.assertIsNone(
+      SummaryController.get_requested_types(["LUHN", "UNKNOWN"])
+    )
+    self.assertIsNone(SummaryController.get_requested_types([]))
+
+
+class Content:
+  """
+  Stream of a request body
+  """
+
+  def __init__(self, body: bytes):
+    self.body = body
+
+  async def read(self, n: int=-1) -> bytes:
+    chunk, self.body = self.body[:n], self.body[n:]
+    return chunk
+
+
+class RequestBodyTest(asynctest.TestCase):
+
+  def get_request(self, content_type: str, charset: str, body: bytes):
+    request = MagicMock()
+    request.content_length = len(body)
+    request.content_type = content_type
+    request.charset = charset
+    request.query = MultiDict([('url', 'http://a.test')])
+    request.content = Content(body)
+    return request
+
+  async def test_html(self):
+    request_body = await SummaryController.read_request_body(
+      self.get_request('text/html', None, '<p>Café.</p>'.encode('utf-8'))
+    )
+    self.assertDictEqual(
+      request_body, {'url': 'http://a.test', 'domContent': 'Café.'}
+    )
+
+  async def test_unknown_charset(self):
+    for content_type, body in [
+      ('text/html', b'<p>Text.</p>'),
+      ('application/json', b'{"url": "http://a.test"}')
+    ]:
+      self.assertIsNone(await SummaryController.read_request_body(
+        self.get_request(content_type, 'bogus-charset', body)
+      ))
+
+
+class Response:
+  """
+  Stream response that keeps what is written to it
+  """
+
+  def __init__(self, status: int, headers: dict):
+    self.status = status
+    self.headers = headers
+    self.body = b''
+
+  async def prepare(self, request) -> None:
+    pass
+
+  def write(self, data: bytes) -> None:
+    self.body += data
+
+  async def drain(self) -> None:
+    pass
+
+  async def write_eof(self) -> None:
+    pass
+
+
+class StreamedHandlerTest(asynctest.TestCase):
+  """
+  Runs the streamed handlers on a logged in request, with the storage of
+  documents mocked out
+  """
+
+  def setUp(self):
+    self.request = MagicMock()
+    self.request.app = {'db_pool': MagicMock()}
+    self.patches = [
+      patch.object(SummaryController, 'StreamResponse', Response),
+      patch.object(
+        SummaryController.auth, 'get_request_session_token',
+        return_value='token'
+      ),
+      patch.object(
+        SummaryController.session_token, 'get_contents',
+        return_value={'user_id': 'user_id'}
+      )
+    ]
+    for patcher in self.patches:
+      patcher.start()
+
+  def tearDown(self):
+    for patcher in self.patches:
+      patcher.stop()
+
+  def set_request_body(self, request_body: dict) -> None:
+    patcher = patch.object(
+      SummaryController, 'read_request_body',
+      CoroutineMock(return_value=request_body)
+    )
+    patcher.start()
+    self.patches.append(patcher)
+
+
+class SummaryRequestTest(StreamedHandlerTest):
+
+  async def test_not_logged_in(self):
+    self.set_request_body({'url': 'http://a.test', 'summarizerType': 'LUHN'})
+    with patch.object(
+        SummaryController.auth, 'get_request_session_token', return_value=None
+    ):
+      for handler in [
+        SummaryController.summarize, SummaryController.summarize_stream
+      ]:
+        response = await handler(self.request)
+        self.assertEqual(response.status, 404)
+        self.assertDictEqual(json.loads(response.text), {
+          'status': 404,
+          'message': 'The user must be logged in to access his or her history.'
+        })
+
+  async def test_invalid_type(self):
+    self.set_request_body({
+      'urls': ['http://a.test'], 'summarizerType': 'LUHNN'
+    })
+    response = await SummaryController.summarize_batch(self.request)
+
+    self.assertEqual(response.status, 400)
+    self.assertEqual(
+      json.loads(response.text)['message'], 'Can not summarize documents.'
+    )
+
+  async def test_too_large(self):
+    patcher = patch.object(
+      SummaryController, 'read_request_body', CoroutineMock(
+        side_effect=SummaryController.ContentTooLargeError('Too large.')
+      )
+    )
+    patcher.start()
+    self.patches.append(patcher)
+    for handler in [
+      SummaryController.summarize,
+      SummaryController.summarize_batch,
+      SummaryController.summarize_stream
+    ]:
+      response = await handler(self.request)
+      self.assertEqual(response.status, 413)
+      self.assertEqual(json.loads(response.text)['errors'], 'Too large.')
+
+
+class BatchTest(StreamedHandlerTest):
+
+  def setUp(self):
+    super().setUp()
+    self.set_request_body({
+      'urls': ['http://a.test', 'http://b.test', 'http://c.test'],
+      'summarizerType': 'LUHN'
+    })
+    self.summary_repository = MagicMock()
+    self.summary_repository.return_value.getby_urls = CoroutineMock(
+      return_value={}
+    )
+    self.document_repository = MagicMock()
+    self.document_repository.return_value.getby_urls_meta = CoroutineMock(
+      return_value={}
+    )
+    self.store_batch = CoroutineMock()
+    for patcher in [
+      patch.object(
+        SummaryController, 'SummaryRepository', self.summary_repository
+      ),
+      patch.object(
+        SummaryController, 'DocumentRepository', self.document_repository
+      ),
+      patch.object(SummaryController, 'store_batch', self.store_batch)
+    ]:
+      patcher.start()
+      self.patches.append(patcher)
+
+  async def summarize_batch(self) -> dict:
+    response = await SummaryController.summarize_batch(self.request)
+    lines = [json.loads(line) for line in response.body.splitlines()]
+    return {line.get('url'): line for line in lines}
+
+  async def test_failing_url(self):
+    async def summarize_batch_url(app, url, *args):
+      if url == 'http://b.test':
+        raise ValueError('Document is empty')
+      return SummaryController.BatchSummary(
+        url, None, 'text', {'LUHN': ['Text.']}, ['LUHN']
+      )
+
+    with patch.object(
+        SummaryController, 'summarize_batch_url', summarize_batch_url
+    ):
+      lines = await self.summarize_batch()
+
+    # The other URLs are summarized and stored all the same
+    self.assertEqual(lines['http://a.test']['status'], 200)
+    self.assertEqual(lines['http://c.test']['status'], 200)
+    self.assertEqual(lines['http://b.test']['status'], 500)
+    self.assertIn('Document is empty', lines['http://b.test']['errors'])
+    self.store_batch.assert_called_once()
+    self.assertSetEqual(
+      {summary.url for summary in self.store_batch.call_args[0][2]},
+      {'http://a.test', 'http://c.test'}
+    )
+
+  async def test_client_gone(self):
+    async def summarize_batch_url(app, url, *args):
+      return SummaryController.BatchSummary(
+        url, None, 'text', {'LUHN': ['Text.']}, ['LUHN']
+      )
+
+    drain = CoroutineMock(side_effect=[None, ConnectionResetError])
+    self.store_batch.side_effect = SummaryController.psycopg2.OperationalError
+    with patch.object(
+        SummaryController, 'summarize_batch_url', summarize_batch_url
+    ), patch.object(Response, 'drain', drain):
+      # Failing to store does not hide why the response stopped
+      with self.assertRaises(ConnectionResetError):
+        await SummaryController.summarize_batch(self.request)
+
+    # Including the URL whose line could not be written, and the URL that
+    # was summarized but not written yet
+    self.store_batch.assert_called_once()
+    self.assertSetEqual(
+      {summary.url for summary in self.store_batch.call_args[0][2]},
+      {'http://a.test', 'http://b.test', 'http://c.test'}
+    )
+
+  async def test_concurrency(self):
+    running = 0
+    max_running = 0
+
+    async def summarize_batch_url(app, url, *args):
+      nonlocal running, max_running
+      running += 1
+      max_running = max(max_running, running)
+      await asyncio.sleep(0.01)
+      running -= 1
+      return SummaryController.BatchSummary(
+        url, None, 'text', {'LUHN': ['Text.']}, ['LUHN']
+      )
+
+    with patch.object(
+        SummaryController, 'summarize_batch_url', summarize_batch_url
+    ), patch.object(SummaryController, 'BATCH_CONCURRENCY', 2):
+      lines = await self.summarize_batch()
+
+    self.assertEqual(max_running, 2)
+    self.assertEqual(len(lines), 3)
+
+
+def read_events(response: Response) -> list:
+  events = []
+  for event in response.body.decode('utf-8').strip().split('\n\n'):
+    name, data = event.split('\n')
+    events.append((name[len('event: '):], json.loads(data[len('data: '):])))
+  return events
+
+
+class StreamTest(StreamedHandlerTest):
+
+  def setUp(self):
+    super().setUp()
+    self.set_request_body({
+      'url': 'http://a.test', 'summarizerType': 'LUHN'
+    })
+
+  async def summarize_stream(self) -> list:
+    response = await SummaryController.summarize_stream(self.request)
+    return read_events(response)
+
+  async def test_done(self):
+    with patch.object(SummaryController, 'stream_summaries', CoroutineMock()):
+      events = await self.summarize_stream()
+
+    self.assertListEqual(events, [
+      ('done', {'status': 200, 'message': 'Summarization was successful'})
+    ])
+
+  async def test_failure(self):
+    async def stream_summaries(app, response, *args):
+      await SummaryController.write_event(response, 'phase', {
+        'phase': 'fetched', 'source': 'web'
+      })
+      raise SummaryController.psycopg2.OperationalError('server closed')
+
+    with patch.object(
+        SummaryController, 'stream_summaries', stream_summaries
+    ):
+      events = await self.summarize_stream()
+
+    # Failing partway still ends the stream with an error and done
+    self.assertListEqual(
+      [name for name, _ in events], ['phase', 'error', 'done']
+    )
+    self.assertEqual(events[1][1]['status'], 400)
+    self.assertEqual(events[1][1]['errors'], 'server closed')
+    self.assertEqual(events[2][1]['status'], 400)
+
+  async def test_summary_error(self):
+    error = SummaryController.SummaryError(504, 'Too slow.', 'Timed out.')
+    with patch.object(
+        SummaryController, 'stream_summaries', CoroutineMock(side_effect=error)
+    ):
+      events = await self.summarize_stream()
+
+    self.assertListEqual(events, [
+      ('error', {
+        'status': 504, 'message': 'Too slow.', 'errors': 'Timed out.'
+      }),
+      ('done', {'status': 504, 'message': 'Too slow.'})
+    ])
+
+
+class StreamSummariesTest(asynctest.TestCase):
+
+  def setUp(self):
+    with open(os.path.join(CORPUS_DIR, 'article.txt')) as f:
+      self.text = f.read()
+
+    async def run(func, *args):
+      return func(*args)
+
+    summarizer_pool = MagicMock()
+    summarizer_pool.run = CoroutineMock(side_effect=run)
+    self.app = {
+      'db_pool': MagicMock(),
+      'summary_cache': LRUCache(100, 1024 * 1024, None),
+      'summary_flights': SingleFlight(),
+      'summarizer_pool': summarizer_pool
+    }
+    self.response = Response(200, {})
+
+    summary_repository = MagicMock()
+    summary_repository.return_value.getby_url_with_history = CoroutineMock(
+      return_value=[
+        SummaryController.SummaryRepository.SummaryView(
+          'document_id', 'LUHN', 5, ['Stored.'], datetime.now()
+        )
+      ]
+    )
+    document_repository = MagicMock()
+    document_repository.return_value.getby_url_meta = CoroutineMock(
+      return_value=SummaryController.DocumentRepository.DocumentMetaView(
+        'document_id', 'user_id', 'http://a.test', 'hash',
+        SummaryController.get_fresh_after() +
+        SummaryController.DOCUMENT_MAX_AGE
+      )
+    )
+    document_repository.return_value.get_contents = CoroutineMock(
+      return_value=self.text
+    )
+    self.store_document = CoroutineMock()
+    self.patches = [
+      patch.object(
+        SummaryController, 'SummaryRepository', summary_repository
+      ),
+      patch.object(
+        SummaryController, 'DocumentRepository', document_repository
+      ),
+      patch.object(SummaryController, 'store_document', self.store_document)
+    ]
+    for patcher in self.patches:
+      patcher.start()
+
+  def tearDown(self):
+    for patcher in self.patches:
+      patcher.stop()
+
+  async def test_stored_and_cached(self):
+    SummaryController.cache_summaries(
+      self.app['summary_cache'],
+      SummaryController.content_hash(self.text),
+      {'FREQUENCY': ['Cached.']}
+    )
+
+    await SummaryController.stream_summaries(
+      self.app, self.response, 'http://a.test', None,
+      ['LUHN', 'FREQUENCY', 'SUMBASIC'], None, 'user_id'
+    )
+    events = read_events(self.response)
+
+    # Stored and cached summaries are written right away, and only the
+    # missing summarizer type is sent to the summarizers
+    self.assertTupleEqual(events[0], ('summary', {
+      'summarizerType': 'LUHN', 'source': 'stored', 'summary': ['Stored.']
+    }))
+    self.assertIn(('summary', {
+      'summarizerType': 'FREQUENCY', 'source': 'cached', 'summary': ['Cached.']
+    }), events)
+    self.assertTupleEqual(
+      self.app['summarizer_pool'].run.call_args[0][2:], (('SUMBASIC',), None)
+    )
+    sentences = [data for name, data in events if name == 'sentence']
+    self.assertListEqual(
+      [data['sentence'] for data in sentences],
+      SummaryController.Summarizer.summarize(self.text, 'SUMBASIC')
+    )
+    for data in sentences:
+      self.assertEqual(
+        self.text[data['start']:data['end']].replace('\n', ' '),
+        data['sentence']
+      )
+
+    # Only the summaries that are not stored yet are stored
+    args = self.store_document.call_args[0]
+    self.assertListEqual(args[7], ['FREQUENCY', 'SUMBASIC'])
+    self.assertListEqual(args[6]['FREQUENCY'], ['Cached.'])
+
+  async def test_all_stored(self):
+    await SummaryController.stream_summaries(
+      self.app, self.response, 'http://a.test', None, ['LUHN'], None,
+      'user_id'
+    )
+
+    self.assertListEqual(read_events(self.response), [('summary', {
+      'summarizerType': 'LUHN', 'source': 'stored', 'summary': ['Stored.']
+    })])
+    self.app['summarizer_pool'].run.assert_not_called()
+    self.store_document.assert_not_called()
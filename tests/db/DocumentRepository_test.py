@@ -1,7 +1,9 @@
 from asynctest import TestCase, MagicMock, CoroutineMock
 from aiopg import Pool, Cursor, Connection
 from tidbit.app.db.DocumentRepository import DocumentRepository
+from tidbit.app.utils.cache import content_hash
 from datetime import datetime
+import zlib
 
 class DocumentRepositoryTest(TestCase):
 
@@ -21,27 +23,33 @@ class DocumentRepositoryTest(TestCase):
     
   async def test_create(self):
     summarized_at = datetime.now()
-    self.mock_cursor.fetchone = CoroutineMock(return_value=(
-      "document_id", "user_id", "www.test.com", "contents",
-      summarized_at
-    ))
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
+      "document_id", "user_id", "www.test.com", summarized_at
+    )])
     
     doc = DocumentRepository(self.postgres_pool_mock)
-    await doc.create(DocumentRepository.DocumentCreate(
+    obtained_doc = await doc.create(DocumentRepository.DocumentCreate(
       "user_id", "wwww.test.com", "contents"
     ))
 
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
+
+    # The contents are stored compressed, by hash
+    query_tuple = self.mock_cursor.execute.call_args[0][1]
+    self.assertEqual(zlib.decompress(query_tuple[1]), b"contents")
+    self.assertEqual(query_tuple[0], query_tuple[4])
+    self.assertEqual(obtained_doc.contents, "contents")
+    self.assertIs(obtained_doc.summarized_at, summarized_at)
     
   async def test_getby_id(self):
     summarized_at = datetime.now()
-    self.mock_cursor.fetchone = CoroutineMock(return_value=(
-      "document_id", "user_id", "www.test.com", "contents",
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
+      "document_id", "user_id", "www.test.com", zlib.compress(b"contents"),
       summarized_at
-    ))
+    )])
     
     doc = DocumentRepository(self.postgres_pool_mock)
     obtained_doc = await doc.getby_id(1)
@@ -49,7 +57,7 @@ class DocumentRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
     
     self.assertIsInstance(obtained_doc, DocumentRepository.DocumentView)
     self.assertEqual(obtained_doc.document_id, "document_id")
@@ -61,10 +69,10 @@ class DocumentRepositoryTest(TestCase):
     
   async def test_getby_url(self):
     summarized_at = datetime.now()
-    self.mock_cursor.fetchone = CoroutineMock(return_value=(
-      "document_id", "user_id", "www.test.com", "contents",
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
+      "document_id", "user_id", "www.test.com", zlib.compress(b"contents"),
       summarized_at
-    ))
+    )])
     
     doc = DocumentRepository(self.postgres_pool_mock)
     obtained_doc = await doc.getby_url("www.test.com")
@@ -72,7 +80,7 @@ class DocumentRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
     
     self.assertIsInstance(obtained_doc, DocumentRepository.DocumentView)
     self.assertEqual(obtained_doc.document_id, "document_id")
@@ -82,3 +90,177 @@ class DocumentRepositoryTest(TestCase):
     self.assertIs(obtained_doc.summarized_at, summarized_at)
 	  
   
+
+  async def test_update_contents(self):
+    summarized_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
+      "document_id", "user_id", "www.test.com", summarized_at
+    )])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    obtained_doc = await doc.update_contents("document_id", "new contents")
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+
+    self.assertIsInstance(obtained_doc, DocumentRepository.DocumentView)
+    self.assertEqual(obtained_doc.contents, "new contents")
+
+  async def test_upsert_with_history(self):
+    self.mock_cursor.fetchmany = CoroutineMock(
+      return_value=[("document_id",)]
+    )
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    document_id = await doc.upsert_with_history(
+      DocumentRepository.DocumentCreate("user_id", "www.test.com", "contents"),
+      False,
+      [("FREQUENCY", 5, ["First."]), ("LUHN", 5, ["Second."])],
+      ["FREQUENCY", "LUHN"]
+    )
+
+    # The document, its summaries and the history in a single statement
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    self.assertEqual(document_id, "document_id")
+
+    query, query_tuple = self.mock_cursor.execute.call_args[0]
+    self.assertIn('INSERT INTO "document"', query)
+    self.assertIn('INSERT INTO "summary"', query)
+    self.assertIn('INSERT INTO "history"', query)
+    self.assertEqual(zlib.decompress(query_tuple[1]), b"contents")
+    self.assertListEqual(query_tuple[-1], ["FREQUENCY", "LUHN"])
+
+  async def test_upsert_with_history_keep_contents(self):
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    document_id = await doc.upsert_with_history(
+      DocumentRepository.DocumentCreate("user_id", "www.test.com", "contents"),
+      True,
+      [],
+      ["FREQUENCY"]
+    )
+
+    self.mock_cursor.execute.assert_called_once()
+    self.assertIsNone(document_id)
+
+    # Neither the contents nor the summaries are stored
+    query, query_tuple = self.mock_cursor.execute.call_args[0]
+    self.assertNotIn('INSERT INTO "document"', query)
+    self.assertNotIn('INSERT INTO "summary"', query)
+    self.assertEqual(query_tuple[0], "www.test.com")
+
+  async def test_create_many(self):
+    summarized_at = datetime.now()
+    body_hash = content_hash("contents")
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        ("document_id", "user_id", "www.test.com", body_hash, summarized_at),
+        ("document_id2", "user_id", "www.test2.com", body_hash, summarized_at)
+      ],
+      []
+    ])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    obtained_docs = await doc.create_many([
+      DocumentRepository.DocumentCreate("user_id", "www.test.com", "contents"),
+      DocumentRepository.DocumentCreate("user_id", "www.test2.com", "contents")
+    ])
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    # A single body for the same contents
+    self.assertEqual(len(self.mock_cursor.execute.call_args[0][1]), 10)
+
+    self.assertEqual(len(obtained_docs), 2)
+    self.assertEqual(obtained_docs[1].contents, "contents")
+    self.assertIsInstance(obtained_docs[0], DocumentRepository.DocumentView)
+    self.assertEqual(obtained_docs[1].url, "www.test2.com")
+
+  async def test_create_many_empty(self):
+    doc = DocumentRepository(self.postgres_pool_mock)
+    self.assertListEqual(await doc.create_many([]), [])
+
+    self.postgres_pool_mock.acquire.assert_not_called()
+
+  async def test_update_contents_many(self):
+    summarized_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        (
+          "document_id", "user_id", "www.test.com",
+          content_hash("new contents"), summarized_at
+        )
+      ],
+      []
+    ])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    obtained_docs = await doc.update_contents_many([
+      ("document_id", "new contents")
+    ])
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+
+    self.assertEqual(len(obtained_docs), 1)
+    self.assertEqual(obtained_docs[0].contents, "new contents")
+
+  async def test_getby_url_meta(self):
+    summarized_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
+      "document_id", "user_id", "www.test.com", "body_hash", summarized_at
+    )])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    obtained_doc = await doc.getby_url_meta("www.test.com")
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    # The contents are left out
+    self.assertNotIn("contents", self.mock_cursor.execute.call_args[0][0])
+
+    self.assertIsInstance(obtained_doc, DocumentRepository.DocumentMetaView)
+    self.assertEqual(obtained_doc.document_id, "document_id")
+    self.assertEqual(obtained_doc.body_hash, "body_hash")
+    self.assertIs(obtained_doc.summarized_at, summarized_at)
+
+  async def test_getby_urls_meta(self):
+    summarized_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        ("document_id", "user_id", "www.test.com", "body_hash", summarized_at)
+      ],
+      []
+    ])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    obtained_docs = await doc.getby_urls_meta(
+      ["www.test.com", "www.test2.com"]
+    )
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+
+    self.assertListEqual(list(obtained_docs), ["www.test.com"])
+    self.assertEqual(obtained_docs["www.test.com"].document_id, "document_id")
+
+  async def test_get_contents(self):
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
+      zlib.compress("contents".encode("utf-8")),
+    )])
+
+    doc = DocumentRepository(self.postgres_pool_mock)
+    contents = await doc.get_contents("body_hash")
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    self.assertEqual(contents, "contents")
@@ -29,3 +29,25 @@ class HistoryRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
+
+  async def test_create_many(self):
+    hist = HistoryRepository(self.postgres_pool_mock)
+    await hist.create_many([
+      HistoryRepository.HistoryCreate(
+        "user_id", "document_id", "FREQUENCY"
+      ),
+      HistoryRepository.HistoryCreate(
+        "user_id", "document_id", "LUHN"
+      )
+    ])
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    self.assertEqual(len(self.mock_cursor.execute.call_args[0][1]), 8)
+
+  async def test_create_many_empty(self):
+    hist = HistoryRepository(self.postgres_pool_mock)
+    await hist.create_many([])
+
+    self.postgres_pool_mock.acquire.assert_not_called()
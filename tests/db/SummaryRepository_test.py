@@ -0,0 +1,126 @@
+from asynctest import TestCase, MagicMock, CoroutineMock
+from aiopg import Pool, Cursor, Connection
+from app.db.SummaryRepository import SummaryRepository
+from datetime import datetime
+
+
+class SummaryRepositoryTest(TestCase):
+
+  mock_cursor = MagicMock(Cursor)
+  mock_connection = MagicMock(Connection)
+  mock_connection.cursor = CoroutineMock(
+    return_value=mock_cursor
+  )
+  postgres_pool_mock = MagicMock(Pool)
+  postgres_pool_mock.acquire = CoroutineMock(
+    return_value=mock_connection
+  )
+
+  async def tearDown(self):
+    self.mock_cursor.reset_mock()
+    self.postgres_pool_mock.reset_mock()
+
+  async def test_create_many(self):
+    summary = SummaryRepository(self.postgres_pool_mock)
+    await summary.create_many([
+      SummaryRepository.SummaryCreate(
+        "document_id", "FREQUENCY", 5, ["First.", "Second."]
+      ),
+      SummaryRepository.SummaryCreate(
+        "document_id", "LUHN", 5, ["First."]
+      )
+    ])
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    self.assertEqual(len(self.mock_cursor.execute.call_args[0][1]), 10)
+
+  async def test_getby_url(self):
+    created_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        ("document_id", "FREQUENCY", 5, ["First."], created_at)
+      ],
+      []
+    ])
+
+    summary = SummaryRepository(self.postgres_pool_mock)
+    obtained_summaries = await summary.getby_url(
+      "www.test.com", [("FREQUENCY", 5), ("LUHN", 5)], created_at
+    )
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+
+    self.assertEqual(len(obtained_summaries), 1)
+    self.assertIsInstance(
+      obtained_summaries[0], SummaryRepository.SummaryView
+    )
+    self.assertEqual(obtained_summaries[0].summarizer_type, "FREQUENCY")
+    self.assertListEqual(obtained_summaries[0].sentences, ["First."])
+
+  async def test_getby_url_with_history(self):
+    created_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        ("document_id", "FREQUENCY", 5, ["First."], created_at)
+      ],
+      []
+    ])
+
+    summary = SummaryRepository(self.postgres_pool_mock)
+    obtained_summaries = await summary.getby_url_with_history(
+      "www.test.com", [("FREQUENCY", 5), ("LUHN", 5)], created_at, "user_id"
+    )
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+    query, query_tuple = self.mock_cursor.execute.call_args[0]
+    self.assertIn('INSERT INTO "history"', query)
+    # History is only recorded when both summaries are stored
+    self.assertEqual(query_tuple[-1], 2)
+
+    self.assertEqual(len(obtained_summaries), 1)
+    self.assertEqual(obtained_summaries[0].summarizer_type, "FREQUENCY")
+
+  async def test_getby_url_without_keys(self):
+    summary = SummaryRepository(self.postgres_pool_mock)
+    obtained_summaries = await summary.getby_url(
+      "www.test.com", [], datetime.now()
+    )
+
+    self.postgres_pool_mock.acquire.assert_not_called()
+    self.assertListEqual(obtained_summaries, [])
+
+  async def test_getby_urls(self):
+    created_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        ("www.test.com", "document_id", "FREQUENCY", 5, ["First."], created_at),
+        ("www.test.com", "document_id", "LUHN", 5, ["Second."], created_at),
+        ("www.test2.com", "document_id2", "LUHN", 5, ["Third."], created_at)
+      ],
+      []
+    ])
+
+    summary = SummaryRepository(self.postgres_pool_mock)
+    obtained_summaries = await summary.getby_urls(
+      ["www.test.com", "www.test2.com"],
+      [("FREQUENCY", 5), ("LUHN", 5)],
+      created_at
+    )
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once()
+    self.mock_cursor.execute.assert_called_once()
+
+    self.assertEqual(len(obtained_summaries["www.test.com"]), 2)
+    self.assertIsInstance(
+      obtained_summaries["www.test2.com"][0], SummaryRepository.SummaryView
+    )
+    self.assertEqual(
+      obtained_summaries["www.test2.com"][0].document_id, "document_id2"
+    )
+
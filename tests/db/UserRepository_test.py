@@ -2,6 +2,7 @@ from asynctest import TestCase, MagicMock, CoroutineMock
 from aiopg import Pool, Cursor, Connection
 from app.db.UserRepository import UserRepository
 from datetime import datetime
+import aitertools
 
 
 class UserRepositoryTest(TestCase):
@@ -41,10 +42,10 @@ class UserRepositoryTest(TestCase):
   async def test_update_exists(self):
     joined_at = datetime.now()
     last_login_at = datetime.now()
-    self.mock_cursor.fetchone = CoroutineMock(return_value=(
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
       "firstName", "lastName", "username", "password",
       joined_at, last_login_at
-    ))
+    )])
 
     user = UserRepository(self.postgres_pool_mock)
     updated_user = await user.updateby_id(1, UserRepository.UserUpdate(
@@ -54,7 +55,7 @@ class UserRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
 
     self.assertIsInstance(updated_user, UserRepository.UserPublicView)
     self.assertEqual(updated_user.first_name, "firstName")
@@ -65,7 +66,7 @@ class UserRepositoryTest(TestCase):
     self.assertIs(updated_user.last_login_at, last_login_at)
 
   async def test_update_notexists(self):
-    self.mock_cursor.fetchone = CoroutineMock(return_value=None)
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[])
 
     user = UserRepository(self.postgres_pool_mock)
     updated_user = await user.updateby_id(1, UserRepository.UserUpdate(
@@ -75,17 +76,17 @@ class UserRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
 
     self.assertEqual(updated_user, None)
 
   async def test_getpublic_exists(self):
     joined_at = datetime.now()
     last_login_at = datetime.now()
-    self.mock_cursor.fetchone = CoroutineMock(return_value=(
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[(
       "firstName", "lastName", "username", "password",
       joined_at, last_login_at
-    ))
+    )])
 
     user = UserRepository(self.postgres_pool_mock)
     obtained_user = await user.getby_id_public(1)
@@ -93,7 +94,7 @@ class UserRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
 
     self.assertIsInstance(obtained_user, UserRepository.UserPublicView)
     self.assertEqual(obtained_user.first_name, "firstName")
@@ -104,7 +105,7 @@ class UserRepositoryTest(TestCase):
     self.assertIs(obtained_user.last_login_at, last_login_at)
 
   async def test_getpublic_notexists(self):
-    self.mock_cursor.fetchone = CoroutineMock(return_value=None)
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[])
 
     user = UserRepository(self.postgres_pool_mock)
     obtained_user = await user.getby_id_public('1')
@@ -112,7 +113,7 @@ class UserRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
 
     self.assertEqual(obtained_user, None)
 
@@ -123,37 +124,82 @@ class UserRepositoryTest(TestCase):
 
     )
 
-    history_object = ("someUrl", datetime.now())
+    accessed_at = datetime.now()
     mock = CoroutineMock()
-    mock.side_effect = [history_object, None]
-    self.mock_cursor.fetchone = mock
+    mock.side_effect = [[("someUrl", "FREQUENCY", accessed_at, "id")], []]
+    self.mock_cursor.fetchmany = mock
 
     user = UserRepository(self.postgres_pool_mock)
     user.getby_id_public = CoroutineMock(
       return_value=returned_user
     )
-    obtained_user = await user.getby_id_private('1')
+    obtained_user = await user.getby_id_private('1', 1)
 
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
     self.assertEqual(
-      self.mock_cursor.fetchone.call_count,
+      self.mock_cursor.fetchmany.call_count,
       2
     )
     user.getby_id_public.assert_called_once()
 
     self.assertIsInstance(obtained_user, UserRepository.UserPrivateView)
-    self.assertListEqual(obtained_user.history, [history_object])
+    self.assertListEqual(obtained_user.history, [("someUrl", accessed_at)])
+    self.assertIsNone(obtained_user.history_next_cursor)
+
+  async def test_get_history(self):
+    accessed_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [
+        ("someUrl", "FREQUENCY", accessed_at, "id"),
+        ("someUrl2", "LUHN", accessed_at, "id2"),
+        ("someUrl3", "LUHN", accessed_at, "id3")
+      ],
+      []
+    ])
+
+    user = UserRepository(self.postgres_pool_mock)
+    history = await user.get_history_by_id(
+      '1', 2, UserRepository.HistoryCursor(accessed_at, "id0")
+    )
+
+    query, query_tuple = self.mock_cursor.execute.call_args[0]
+    self.assertIn('(history.accessed_at, history.id) < ', query)
+    # One more entry than the page tells that there is a next page
+    self.assertTupleEqual(query_tuple, ('1', accessed_at, "id0", 3))
+    self.assertListEqual(history.history, [
+      ("someUrl", "FREQUENCY", accessed_at),
+      ("someUrl2", "LUHN", accessed_at)
+    ])
+    self.assertEqual(
+      history.next_cursor, UserRepository.HistoryCursor(accessed_at, "id2")
+    )
+
+  async def test_get_history_last_page(self):
+    accessed_at = datetime.now()
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [("someUrl", "FREQUENCY", accessed_at, "id")],
+      []
+    ])
+
+    user = UserRepository(self.postgres_pool_mock)
+    history = await user.get_history_by_id('1', 2)
+
+    query, query_tuple = self.mock_cursor.execute.call_args[0]
+    self.assertNotIn('(history.accessed_at, history.id) < ', query)
+    self.assertTupleEqual(query_tuple, ('1', 3))
+    self.assertEqual(len(history.history), 1)
+    self.assertIsNone(history.next_cursor)
 
   async def test_getbycredentials_exists(self):
     sample_id = 'id-sample1'
     sample_username = 'username-sample1'
     sample_last_login_at = datetime.now()
-    self.mock_cursor.fetchone = CoroutineMock(
-      return_value=(
+    self.mock_cursor.fetchmany = CoroutineMock(
+      return_value=[(
         sample_id, sample_username, sample_last_login_at
-      )
+      )]
     )
 
     user = UserRepository(self.postgres_pool_mock)
@@ -170,8 +216,8 @@ class UserRepositoryTest(TestCase):
     )
 
   async def test_getbycredentials_notexists(self):
-    self.mock_cursor.fetchone = CoroutineMock(
-      return_value=None
+    self.mock_cursor.fetchmany = CoroutineMock(
+      return_value=[]
     )
 
     user = UserRepository(self.postgres_pool_mock)
@@ -184,4 +230,43 @@ class UserRepositoryTest(TestCase):
     self.postgres_pool_mock.acquire.assert_called_once()
     self.postgres_pool_mock.release.assert_called_once()
     self.mock_cursor.execute.assert_called_once()
-    self.mock_cursor.fetchone.assert_called_once()
+    self.mock_cursor.fetchmany.assert_called_once()
+
+  async def test_stream_history(self):
+    accessed_at = datetime.now()
+    history_objects = [
+      ("someUrl", "FREQUENCY", accessed_at, "id1"),
+      ("someUrl", "LUHN", accessed_at, "id2"),
+      ("otherUrl", "FREQUENCY", accessed_at, "id3")
+    ]
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      history_objects[:2], [], history_objects[2:], []
+    ])
+
+    user = UserRepository(self.postgres_pool_mock)
+    history = await aitertools.alist(
+      user.stream_history_by_id('1', page_size=2)
+    )
+
+    # A query per page, each on a connection released before the next one
+    self.assertEqual(self.postgres_pool_mock.acquire.call_count, 2)
+    self.assertEqual(self.postgres_pool_mock.release.call_count, 2)
+    query, query_tuple = self.mock_cursor.execute.call_args[0]
+    self.assertIn('(history.accessed_at, history.id) < ', query)
+    self.assertTupleEqual(query_tuple, ('1', accessed_at, 'id2', 2))
+    self.assertListEqual(history, history_objects)
+
+  async def test_stream_history_limit(self):
+    history_object = ("someUrl", "FREQUENCY", datetime.now(), "id")
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [history_object], []
+    ])
+
+    user = UserRepository(self.postgres_pool_mock)
+    history = await aitertools.alist(
+      user.stream_history_by_id('1', limit=1, page_size=2)
+    )
+
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.assertTupleEqual(self.mock_cursor.execute.call_args[0][1], ('1', 1))
+    self.assertListEqual(history, [history_object])
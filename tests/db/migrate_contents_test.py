@@ -0,0 +1,54 @@
+from asynctest import TestCase, MagicMock, CoroutineMock
+from aiopg import Pool, Cursor, Connection
+from app.db import migrate_contents
+from app.utils.cache import content_hash
+import zlib
+
+
+class MigrateContentsTest(TestCase):
+
+  mock_cursor = MagicMock(Cursor)
+  mock_connection = MagicMock(Connection)
+  mock_connection.cursor = CoroutineMock(
+    return_value=mock_cursor
+  )
+  postgres_pool_mock = MagicMock(Pool)
+  postgres_pool_mock.acquire = CoroutineMock(
+    return_value=mock_connection
+  )
+
+  async def tearDown(self):
+    self.mock_cursor.reset_mock()
+    self.postgres_pool_mock.reset_mock()
+
+  async def test_migrate(self):
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[
+      [(1,)],  # The contents column exists
+      [("document_id", "contents"), ("document_id2", "contents")],
+      [],
+      []
+    ])
+
+    migrated = await migrate_contents.migrate(self.postgres_pool_mock)
+
+    self.assertEqual(migrated, 2)
+    # Column check, schema change, 2 batches, moving the first batch and
+    # dropping the column
+    self.assertEqual(self.mock_cursor.execute.call_count, 6)
+
+    # The documents with the same contents share a single body
+    query_tuple = self.mock_cursor.execute.call_args_list[3][0][1]
+    body_hash = content_hash("contents")
+    self.assertEqual(query_tuple[0], body_hash)
+    self.assertEqual(zlib.decompress(query_tuple[1]), b"contents")
+    self.assertEqual(
+      query_tuple[2:], ("document_id", body_hash, "document_id2", body_hash)
+    )
+
+  async def test_migrate_done(self):
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[])
+
+    migrated = await migrate_contents.migrate(self.postgres_pool_mock)
+
+    self.assertEqual(migrated, 0)
+    self.mock_cursor.execute.assert_called_once()
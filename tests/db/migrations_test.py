@@ -0,0 +1,155 @@
+from asynctest import TestCase, MagicMock, CoroutineMock
+from aiopg import Pool, Cursor, Connection
+from os import getenv
+from unittest import skipUnless
+from datetime import datetime
+import aiopg
+import pytz
+from app.db import migrations
+from app.db.UserRepository import UserRepository, get_history_query
+
+# DSN of a disposable DB to check the query plans against
+POSTGRES_TEST_DSN = getenv('POSTGRES_TEST_DSN')
+
+
+class MigrateTest(TestCase):
+
+  mock_cursor = MagicMock(Cursor)
+  mock_connection = MagicMock(Connection)
+  mock_connection.cursor = CoroutineMock(
+    return_value=mock_cursor
+  )
+  postgres_pool_mock = MagicMock(Pool)
+  postgres_pool_mock.acquire = CoroutineMock(
+    return_value=mock_connection
+  )
+
+  async def tearDown(self):
+    self.mock_cursor.reset_mock()
+    self.postgres_pool_mock.reset_mock()
+
+  async def test_migrate(self):
+    # Version 1 is applied already
+    self.mock_cursor.fetchmany = CoroutineMock(side_effect=[[(1,)], []])
+    first_migration = migrations.Migration(1, 'First', CoroutineMock())
+    second_migration = migrations.Migration(2, 'Second', CoroutineMock())
+
+    applied = await migrations.migrate(
+      self.postgres_pool_mock, [first_migration, second_migration]
+    )
+
+    self.assertListEqual(applied, [2])
+    first_migration.apply.assert_not_called()
+    second_migration.apply.assert_called_once_with(self.postgres_pool_mock)
+
+    # Lock, schema_migrations, applied versions, version 2 and unlock
+    self.assertEqual(self.mock_cursor.execute.call_count, 5)
+    self.assertIn(
+      'pg_advisory_lock', self.mock_cursor.execute.call_args_list[0][0][0]
+    )
+    self.assertEqual(
+      self.mock_cursor.execute.call_args_list[3][0][1][0], 2
+    )
+    self.assertIn(
+      'pg_advisory_unlock', self.mock_cursor.execute.call_args_list[4][0][0]
+    )
+
+  async def test_migrate_failure(self):
+    self.mock_cursor.fetchmany = CoroutineMock(return_value=[])
+    failing_migration = migrations.Migration(
+      1, 'Failing', CoroutineMock(side_effect=RuntimeError)
+    )
+
+    with self.assertRaises(RuntimeError):
+      await migrations.migrate(self.postgres_pool_mock, [failing_migration])
+
+    # The version is not recorded, but the lock is released
+    self.assertIn(
+      'pg_advisory_unlock', self.mock_cursor.execute.call_args[0][0]
+    )
+    self.assertEqual(self.mock_cursor.execute.call_count, 4)
+
+  async def test_run_statements(self):
+    apply = migrations.run_statements('SELECT 1', 'SELECT 2')
+    await apply(self.postgres_pool_mock)
+
+    # Every statement in a single transaction
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.assertListEqual(
+      [call[0][0] for call in self.mock_cursor.execute.call_args_list],
+      ['BEGIN', 'SELECT 1', 'SELECT 2', 'COMMIT']
+    )
+
+
+@skipUnless(POSTGRES_TEST_DSN, 'POSTGRES_TEST_DSN is not set')
+class QueryPlanTest(TestCase):
+
+  async def setUp(self):
+    self.pool = await aiopg.create_pool(dsn=POSTGRES_TEST_DSN)
+    await migrations.migrate(self.pool)
+
+  async def tearDown(self):
+    self.pool.close()
+    await self.pool.wait_closed()
+
+  async def explain(self, query: str, query_tuple: tuple) -> str:
+    connection = await self.pool.acquire()
+    try:
+      cursor = await connection.cursor()
+      # The tables of a test DB are too small for an index to be worth it
+      # otherwise
+      await cursor.execute('SET enable_seqscan = off')
+      await cursor.execute('EXPLAIN ' + query, query_tuple)
+      plan = '\n'.join(row[0] for row in await cursor.fetchall())
+      await cursor.execute('RESET enable_seqscan')
+      return plan
+    finally:
+      self.pool.release(connection)
+
+  async def test_migrate_again(self):
+    self.assertListEqual(await migrations.migrate(self.pool), [])
+
+  async def test_document_by_url(self):
+    plan = await self.explain(
+      'SELECT id, user_id, url, body_hash, summarized_at '
+      'FROM "document" '
+      'WHERE url=%s',
+      ('www.test.com',)
+    )
+    self.assertIn('document_url_key', plan)
+
+  async def test_history_by_user(self):
+    plan = await self.explain(*get_history_query(
+      '00000000-0000-0000-0000-000000000000', 50, None
+    ))
+    self.assertIn('history_user_id_accessed_at_idx', plan)
+
+  async def test_history_page_by_user(self):
+    plan = await self.explain(*get_history_query(
+      '00000000-0000-0000-0000-000000000000',
+      50,
+      UserRepository.HistoryCursor(
+        datetime.now(tz=pytz.utc), '00000000-0000-0000-0000-000000000000'
+      )
+    ))
+    # The page starts from where the index is read, rather than filtering it
+    self.assertRegex(
+      plan, r'history_user_id_accessed_at_idx[^\n]*\n\s*Index Cond: .*ROW'
+    )
+
+  async def test_history_by_document(self):
+    plan = await self.explain(
+      'SELECT id FROM history WHERE document_id=%s',
+      ('00000000-0000-0000-0000-000000000000',)
+    )
+    self.assertIn('history_document_id_idx', plan)
+
+  async def test_unused_bodies(self):
+    plan = await self.explain(
+      'SELECT hash FROM "document_body" b '
+      'WHERE NOT EXISTS ('
+      ' SELECT 1 FROM "document" d WHERE d.body_hash = b.hash'
+      ')',
+      ()
+    )
+    self.assertIn('document_body_hash_idx', plan)
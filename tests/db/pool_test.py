@@ -0,0 +1,100 @@
+from asynctest import TestCase, MagicMock, CoroutineMock
+from aiopg import Pool, Cursor, Connection
+import asyncio
+from psycopg2.extensions import QueryCanceledError
+from app.db import utils
+from app.db.pool import InstrumentedPool
+
+
+class InstrumentedPoolTest(TestCase):
+
+  def setUp(self):
+    self.mock_cursor = MagicMock(Cursor)
+    self.mock_connection = MagicMock(Connection)
+    self.mock_connection.cursor = CoroutineMock(
+      return_value=self.mock_cursor
+    )
+    self.postgres_pool_mock = MagicMock(Pool)
+    self.postgres_pool_mock.acquire = CoroutineMock(
+      return_value=self.mock_connection
+    )
+    self.postgres_pool_mock.size = 3
+    self.postgres_pool_mock.freesize = 1
+
+  async def test_query(self):
+    pool = InstrumentedPool(self.postgres_pool_mock)
+    await utils.query(pool=pool, query='SELECT 1')
+
+    self.postgres_pool_mock.release.assert_called_once_with(
+      self.mock_connection
+    )
+    self.mock_connection.close.assert_not_called()
+
+    stats = pool.stats()
+    self.assertEqual(stats.acquisitions, 1)
+    self.assertEqual(stats.queries, 1)
+    self.assertEqual(stats.statement_timeouts, 0)
+    self.assertEqual(stats.in_use, 2)
+    self.assertEqual(stats.idle, 1)
+
+  async def test_query_in_transaction(self):
+    pool = InstrumentedPool(self.postgres_pool_mock)
+    async with utils.transaction(pool) as transaction:
+      await utils.query(pool=transaction, query='SELECT 1')
+      await utils.query(pool=transaction, query='SELECT 2')
+
+    self.assertEqual(pool.stats().acquisitions, 1)
+    self.assertEqual(pool.stats().queries, 2)
+
+  async def test_statement_timeout(self):
+    # aiopg turns the error of a statement cancelled by the DB into a
+    # cancellation
+    async def execute(*args):
+      try:
+        raise QueryCanceledError
+      except QueryCanceledError:
+        raise asyncio.CancelledError
+    self.mock_cursor.execute = execute
+
+    pool = InstrumentedPool(self.postgres_pool_mock)
+    with self.assertRaises(QueryCanceledError):
+      await utils.query(pool=pool, query='SELECT pg_sleep(60)')
+
+    self.postgres_pool_mock.release.assert_called_once()
+    self.assertEqual(pool.stats().statement_timeouts, 1)
+
+  async def test_cancelled(self):
+    self.mock_cursor.execute = CoroutineMock(
+      side_effect=asyncio.CancelledError
+    )
+
+    pool = InstrumentedPool(self.postgres_pool_mock)
+    with self.assertRaises(asyncio.CancelledError):
+      await utils.query(pool=pool, query='SELECT 1')
+
+    self.assertEqual(pool.stats().statement_timeouts, 0)
+
+  async def test_acquire_timeout(self):
+    async def acquire():
+      await asyncio.sleep(1)
+    self.postgres_pool_mock.acquire = acquire
+
+    pool = InstrumentedPool(self.postgres_pool_mock, acquire_timeout=0.01)
+    with self.assertRaises(asyncio.TimeoutError):
+      await utils.query(pool=pool, query='SELECT 1')
+
+    stats = pool.stats()
+    self.assertEqual(stats.acquisitions, 0)
+    self.assertEqual(stats.acquire_timeouts, 1)
+    self.assertEqual(stats.waiting, 0)
+
+  async def test_recycle(self):
+    pool = InstrumentedPool(self.postgres_pool_mock, recycle=0)
+    await utils.query(pool=pool, query='SELECT 1')
+
+    # The connection is closed before it goes back to the pool
+    self.mock_connection.close.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once_with(
+      self.mock_connection
+    )
+    self.assertEqual(pool.stats().recycled, 1)
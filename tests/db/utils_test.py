@@ -0,0 +1,212 @@
+from asynctest import TestCase, MagicMock, CoroutineMock
+from aiopg import Pool, Cursor, Connection
+from psycopg2 import OperationalError
+import aitertools
+from app.db import utils
+
+
+class TransactionTest(TestCase):
+
+  mock_cursor = MagicMock(Cursor)
+  mock_connection = MagicMock(Connection)
+  mock_connection.cursor = CoroutineMock(
+    return_value=mock_cursor
+  )
+  postgres_pool_mock = MagicMock(Pool)
+  postgres_pool_mock.acquire = CoroutineMock(
+    return_value=mock_connection
+  )
+
+  async def tearDown(self):
+    self.mock_cursor.reset_mock()
+    self.mock_connection.close.reset_mock()
+    self.postgres_pool_mock.reset_mock()
+
+  async def test_commit(self):
+    async with utils.transaction(self.postgres_pool_mock) as transaction:
+      await utils.query(pool=transaction, query='SELECT 1')
+      await utils.query(pool=transaction, query='SELECT 2')
+
+    # A single connection for both queries
+    self.postgres_pool_mock.acquire.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once_with(
+      self.mock_connection
+    )
+    self.assertListEqual(
+      [call[0][0] for call in self.mock_cursor.execute.call_args_list],
+      ['BEGIN', 'SELECT 1', 'SELECT 2', 'COMMIT']
+    )
+
+  async def test_rollback(self):
+    with self.assertRaises(RuntimeError):
+      async with utils.transaction(self.postgres_pool_mock) as transaction:
+        await utils.query(pool=transaction, query='SELECT 1')
+        raise RuntimeError
+
+    self.postgres_pool_mock.release.assert_called_once_with(
+      self.mock_connection
+    )
+    self.assertEqual(self.mock_cursor.execute.call_args[0][0], 'ROLLBACK')
+
+  async def test_rollback_failure(self):
+    execute = self.mock_cursor.execute
+    self.mock_cursor.execute = CoroutineMock(
+      side_effect=[None, None, OperationalError('server closed')]
+    )
+    try:
+      # The error of the block is not replaced by the one of the rollback
+      with self.assertRaises(RuntimeError):
+        async with utils.transaction(self.postgres_pool_mock) as transaction:
+          await utils.query(pool=transaction, query='SELECT 1')
+          raise RuntimeError
+    finally:
+      self.mock_cursor.execute = execute
+
+    # Nor is the connection reused
+    self.mock_connection.close.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once_with(
+      self.mock_connection
+    )
+
+  async def test_commit_failure(self):
+    execute = self.mock_cursor.execute
+    self.mock_cursor.execute = CoroutineMock(
+      side_effect=[None, OperationalError('server closed')]
+    )
+    try:
+      with self.assertRaises(OperationalError):
+        async with utils.transaction(self.postgres_pool_mock):
+          pass
+    finally:
+      self.mock_cursor.execute = execute
+
+    self.mock_connection.close.assert_called_once()
+    self.postgres_pool_mock.release.assert_called_once_with(
+      self.mock_connection
+    )
+
+
+class PreparedStatementTest(TestCase):
+
+  def setUp(self):
+    self.mock_cursor = MagicMock(Cursor)
+    self.mock_connection = MagicMock(Connection)
+    self.mock_connection.cursor = CoroutineMock(
+      return_value=self.mock_cursor
+    )
+    self.postgres_pool_mock = MagicMock(Pool)
+    self.postgres_pool_mock.acquire = CoroutineMock(
+      return_value=self.mock_connection
+    )
+    # Not prepared on the connection yet
+    self.mock_cursor.fetchone = CoroutineMock(return_value=None)
+    self.prepare_threshold = utils.PREPARE_THRESHOLD
+    utils.PREPARE_THRESHOLD = 2
+
+  def tearDown(self):
+    utils.PREPARE_THRESHOLD = self.prepare_threshold
+
+  def test_to_numbered_parameters(self):
+    self.assertEqual(
+      utils.to_numbered_parameters(
+        "SELECT id FROM t WHERE a=%s AND b LIKE '%%x' AND c=%s"
+      ),
+      "SELECT id FROM t WHERE a=$1 AND b LIKE '%x' AND c=$2"
+    )
+
+  async def test_prepare(self):
+    for _ in range(3):
+      await utils.query(
+        pool=self.postgres_pool_mock,
+        query='DELETE FROM t WHERE id=%s AND b=%s',
+        query_tuple=(1, 2),
+        statement_name='t_delete'
+      )
+
+    # Prepared on its second run, and executed by name from then on
+    self.assertListEqual(
+      [call[0] for call in self.mock_cursor.execute.call_args_list],
+      [
+        ('DELETE FROM t WHERE id=%s AND b=%s', (1, 2)),
+        (
+          'SELECT 1 FROM pg_prepared_statements WHERE name=%s',
+          ('t_delete',)
+        ),
+        ('PREPARE t_delete AS DELETE FROM t WHERE id=$1 AND b=$2',),
+        ('EXECUTE t_delete(%s, %s)', (1, 2)),
+        ('EXECUTE t_delete(%s, %s)', (1, 2))
+      ]
+    )
+
+  async def test_prepared_already(self):
+    self.mock_cursor.fetchone = CoroutineMock(return_value=(1,))
+    for _ in range(2):
+      await utils.query(
+        pool=self.postgres_pool_mock,
+        query='SELECT 1',
+        statement_name='t_select'
+      )
+
+    # Not prepared again
+    queries = [call[0][0] for call in self.mock_cursor.execute.call_args_list]
+    self.assertFalse(any(query.startswith('PREPARE') for query in queries))
+    self.assertEqual(queries[-1], 'EXECUTE t_select')
+
+  async def test_prepared_already_in_transaction(self):
+    self.mock_cursor.fetchone = CoroutineMock(return_value=(1,))
+    async with utils.transaction(self.postgres_pool_mock) as transaction:
+      for _ in range(2):
+        await utils.query(
+          pool=transaction,
+          query='SELECT 1',
+          statement_name='t_select'
+        )
+
+    # Nothing fails within the transaction, so it is committed
+    self.assertListEqual(
+      [call[0][0] for call in self.mock_cursor.execute.call_args_list],
+      [
+        'BEGIN',
+        'SELECT 1',
+        'SELECT 1 FROM pg_prepared_statements WHERE name=%s',
+        'EXECUTE t_select',
+        'COMMIT'
+      ]
+    )
+
+  async def test_unnamed(self):
+    for _ in range(3):
+      await utils.query(pool=self.postgres_pool_mock, query='SELECT 1')
+
+    self.assertEqual(self.mock_cursor.execute.call_count, 3)
+    self.assertEqual(self.mock_cursor.execute.call_args[0][0], 'SELECT 1')
+
+
+class FetchTest(TestCase):
+
+  def setUp(self):
+    self.mock_cursor = MagicMock(Cursor)
+    self.mock_connection = MagicMock(Connection)
+    self.mock_connection.cursor = CoroutineMock(
+      return_value=self.mock_cursor
+    )
+    self.postgres_pool_mock = MagicMock(Pool)
+    self.postgres_pool_mock.acquire = CoroutineMock(
+      return_value=self.mock_connection
+    )
+
+  async def test_query_with_result(self):
+    self.mock_cursor.fetchmany = CoroutineMock(
+      side_effect=[[(1,), (2,)], [(3,)], []]
+    )
+
+    records = await aitertools.alist(utils.query_with_result(
+      pool=self.postgres_pool_mock,
+      query='SELECT id FROM t',
+      fetch_size=2
+    ))
+
+    self.assertListEqual(records, [(1,), (2,), (3,)])
+    self.mock_cursor.fetchmany.assert_called_with(2)
+    self.assertEqual(self.mock_cursor.fetchmany.call_count, 3)
+    self.postgres_pool_mock.release.assert_called_once()
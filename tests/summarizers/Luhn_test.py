@@ -0,0 +1,31 @@
+import sys
+from unittest import TestCase
+from app.summarizers import Luhn, utils
+
+
+class LuhnTest(TestCase):
+
+  def test_stop_words(self):
+    self.assertIsInstance(Luhn.STOP_WORDS, frozenset)
+    self.assertIn("the", Luhn.STOP_WORDS)
+
+  def test_get_significant_words(self):
+    doc = utils.tokenize("The cat sat. The dog sat. The bird flew.")
+
+    significant_words = Luhn.get_significant_words(
+      doc, utils.calc_word_freq(doc), Luhn.STOP_WORDS
+    )
+
+    self.assertSetEqual(
+      {doc.vocabulary[word_id] for word_id in significant_words},
+      {"cat", "sat", "dog", "bird", "flew"}
+    )
+
+  def test_calc_sentence_score(self):
+    self.assertEqual(Luhn.calc_sentence_score([0, 1, 2], {1}), 0.0)
+    self.assertEqual(
+      Luhn.calc_sentence_score([0, 1, 2, 1, 3, 4], {1, 4}), 3 ** 2 / 5
+    )
+    self.assertEqual(
+      Luhn.calc_sentence_score([1, 0, 2, 3, 4], {1}), sys.float_info.max
+    )
@@ -0,0 +1,43 @@
+from unittest import TestCase
+from app.summarizers import SumBasic, utils
+
+
+class SumBasicTest(TestCase):
+
+  def test_summarize(self):
+    doc = utils.tokenize(
+      "Cats purr when they are happy and calm. "
+      "Dogs bark at the mailman every single day. "
+      "Cats and dogs can live together in one home. "
+      "Birds sing in the early morning hours. "
+      "Fish swim in the small glass bowl quietly. "
+      "The mailman fears the dogs but likes the cats."
+    )
+
+    self.assertListEqual(SumBasic.sumbasic_summarize(doc, 2), [
+      "Birds sing in the early morning hours.",
+      "The mailman fears the dogs but likes the cats."
+    ])
+
+  def test_summarize_exhausted_word(self):
+    # After picking the 4th and 6th sentences, the probability of "b" is
+    # still the highest although every sentence containing it was picked
+    doc = utils.tokenize(
+      "d g e d f b. c j c e c. b. b g b a d b. b. e e a a a a. e b."
+    )
+
+    self.assertListEqual(SumBasic.sumbasic_summarize(doc, 5), [
+      "d g e d f b.", "c j c e c.", "b.", "b g b a d b.", "e e a a a a."
+    ])
+
+  def test_select_sentences_runs_out(self):
+    doc = utils.tokenize("a b. b a.")
+    word_prob = utils.calc_word_freq(doc)
+    inverted_index = SumBasic.build_inverted_index(
+      doc, SumBasic.rank_sentences(doc, word_prob)
+    )
+
+    self.assertListEqual(
+      list(SumBasic.select_sentences(doc, inverted_index, word_prob, 3)),
+      [0, 1]
+    )
@@ -0,0 +1,87 @@
+import importlib
+import os
+from unittest import TestCase
+from unittest.mock import patch
+from app.summarizers import Summarizer
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+class SummarizerTest(TestCase):
+
+  def setUp(self):
+    with open(os.path.join(CORPUS_DIR, "article.txt")) as f:
+      self.text = f.read()
+
+  def test_summarize_many(self):
+    summaries = Summarizer.summarize_many(
+      self.text, Summarizer.SUMMARIZER_TYPES
+    )
+
+    self.assertListEqual(
+      list(summaries.keys()), Summarizer.SUMMARIZER_TYPES
+    )
+    for summarizer_type in Summarizer.SUMMARIZER_TYPES:
+      self.assertListEqual(
+        summaries[summarizer_type],
+        Summarizer.summarize(self.text, summarizer_type),
+        summarizer_type
+      )
+
+  def test_summarize_many_backends(self):
+    for backend in Summarizer.get_available_backends():
+      self.assertDictEqual(
+        Summarizer.summarize_many(self.text, ["LUHN", "SUMBASIC"], backend),
+        Summarizer.summarize_many(self.text, ["LUHN", "SUMBASIC"], "PYTHON"),
+        backend
+      )
+
+  def test_summarize_payload_spans(self):
+    num_sentences, spans = Summarizer.summarize_payload_spans(
+      self.text.encode("utf-8"), Summarizer.SUMMARIZER_TYPES
+    )
+    summaries = Summarizer.summarize_many(
+      self.text, Summarizer.SUMMARIZER_TYPES
+    )
+
+    self.assertGreater(num_sentences, 0)
+    for summarizer_type in Summarizer.SUMMARIZER_TYPES:
+      sentence_ids = [
+        sentence_id for sentence_id, _, _ in spans[summarizer_type]
+      ]
+      self.assertListEqual(sentence_ids, sorted(sentence_ids), summarizer_type)
+      self.assertListEqual(
+        [
+          self.text[start:end].replace("\n", " ")
+          for _, start, end in spans[summarizer_type]
+        ],
+        summaries[summarizer_type],
+        summarizer_type
+      )
+
+  def test_invalid_default_backend(self):
+    with patch.dict(os.environ, {'SUMMARIZER_BACKEND': 'NUMPYY'}):
+      with self.assertRaises(ValueError):
+        importlib.reload(Summarizer)
+    importlib.reload(Summarizer)
+    self.assertIn(
+      Summarizer.DEFAULT_SUMMARIZER_BACKEND, Summarizer.SUMMARIZER_BACKENDS
+    )
+
+  def test_summarize_tokenized_ids_repeated_sentences(self):
+    sentence = "The same sentence appears in the text more than once. "
+    doc = Summarizer.utils.tokenize(sentence * 3 + self.text)
+    expected = Summarizer.summarize_tokenized_ids(
+      doc, Summarizer.SUMMARIZER_TYPES, "PYTHON"
+    )
+    for backend in Summarizer.get_available_backends():
+      summaries = Summarizer.summarize_tokenized_ids(
+        doc, Summarizer.SUMMARIZER_TYPES, backend
+      )
+      for summarizer_type, sentence_ids in summaries.items():
+        self.assertEqual(
+          len(set(sentence_ids)), len(sentence_ids), summarizer_type
+        )
+        self.assertListEqual(
+          sentence_ids, expected[summarizer_type], summarizer_type
+        )
@@ -0,0 +1,34 @@
+import os
+from unittest import TestCase, skipUnless
+from app.summarizers import matrix, Summarizer, utils
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+@skipUnless(matrix.is_available(), "NumPy is not installed")
+class MatrixTest(TestCase):
+
+  def test_build(self):
+    doc = utils.tokenize("a b a. c.")
+    term_matrix = matrix.build(doc)
+
+    self.assertListEqual(term_matrix.rows.tolist(), [0, 0, 0, 1])
+    self.assertListEqual(term_matrix.columns.tolist(), [0, 1, 0, 2])
+    self.assertListEqual(term_matrix.positions.tolist(), [0, 1, 2, 0])
+    self.assertListEqual(term_matrix.sentence_lengths.tolist(), [3, 1])
+
+  def test_top_k_ties(self):
+    scores = matrix.numpy.array([1.0, 3.0, 2.0, 3.0, 2.0])
+
+    self.assertListEqual(matrix.top_k(scores, 3).tolist(), [1, 3, 2])
+
+  def test_same_summaries_as_python_backend(self):
+    with open(os.path.join(CORPUS_DIR, "article.txt")) as f:
+      doc = utils.tokenize(f.read() * 3)
+
+    for summarizer_type in Summarizer.SUMMARIZER_TYPES:
+      self.assertListEqual(
+        Summarizer.summarize_document(doc, summarizer_type, "NUMPY"),
+        Summarizer.summarize_document(doc, summarizer_type, "PYTHON"),
+        summarizer_type
+      )
@@ -0,0 +1,48 @@
+import json
+import os
+import re
+from unittest import TestCase
+from app.summarizers import splitter
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+
+def canonical(sentence):
+  # The previous splitter moved terminators after closing quotes, dropped the
+  # period of suffixes such as "Corp." and turned newlines into spaces, so
+  # only the words of every sentence are compared
+  return re.sub(r'[\s.!?"”]', '', sentence)
+
+
+class SplitterTest(TestCase):
+
+  def test_regression_corpus(self):
+    with open(os.path.join(CORPUS_DIR, "expected_sentences.json")) as f:
+      expected = json.load(f)
+
+    for name, expected_sentences in expected.items():
+      with open(os.path.join(CORPUS_DIR, name)) as f:
+        text = f.read()
+
+      sentences = [text[start:end] for start, end in splitter.split_spans(text)]
+      self.assertListEqual(
+        [canonical(s) for s in sentences],
+        [canonical(s) for s in expected_sentences if s],
+        name
+      )
+
+  def test_spans(self):
+    text = " He met Dr. Brown.\nThey left! "
+
+    self.assertListEqual(splitter.split_spans(text), [(1, 18), (19, 29)])
+
+  def test_closing_quote(self):
+    text = 'He said "hi." Then he left.'
+
+    self.assertListEqual(
+      [text[start:end] for start, end in splitter.split_spans(text)],
+      ['He said "hi."', 'Then he left.']
+    )
+
+  def test_unterminated_text(self):
+    self.assertListEqual(splitter.split_spans("No terminator here"), [])
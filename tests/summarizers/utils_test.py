@@ -0,0 +1,31 @@
+from unittest import TestCase
+from app.summarizers import utils
+
+
+class UtilsTest(TestCase):
+
+  def test_tokenize(self):
+    doc = utils.tokenize(
+      "The cat sat on the mat. The (dog) barked at the cat!"
+    )
+
+    self.assertIsInstance(doc, utils.TokenizedDocument)
+    self.assertListEqual(doc.sentences, [
+      "The cat sat on the mat.", "The (dog) barked at the cat!"
+    ])
+    self.assertListEqual(
+      doc.vocabulary,
+      ["the", "cat", "sat", "on", "mat", "dog", "barked", "at"]
+    )
+    self.assertListEqual(doc.sentence_tokens, [
+      [0, 1, 2, 3, 0, 4], [0, 5, 6, 7, 0, 1]
+    ])
+    self.assertListEqual(doc.term_counts, [4, 2, 1, 1, 1, 1, 1, 1])
+    self.assertEqual(doc.total_words, 12)
+
+  def test_calc_word_freq(self):
+    doc = utils.tokenize("A b a. B c a.")
+
+    self.assertListEqual(
+      utils.calc_word_freq(doc), [3 / 6, 2 / 6, 1 / 6]
+    )
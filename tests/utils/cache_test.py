@@ -0,0 +1,62 @@
+from unittest import TestCase
+from app.utils.cache import LRUCache, content_hash
+
+
+class FakeClock:
+
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self) -> float:
+    return self.now
+
+
+class LRUCacheTest(TestCase):
+
+  def setUp(self):
+    self.clock = FakeClock()
+    self.cache = LRUCache(
+      max_entries=2, max_size=10, ttl=60, sizeof=len, clock=self.clock
+    )
+
+  def test_hit_and_miss(self):
+    self.assertIsNone(self.cache.get("a"))
+    self.cache.put("a", "xyz")
+
+    self.assertEqual(self.cache.get("a"), "xyz")
+    stats = self.cache.stats()
+    self.assertEqual((stats.hits, stats.misses), (1, 1))
+
+  def test_evicts_least_recently_used(self):
+    self.cache.put("a", "1")
+    self.cache.put("b", "2")
+    self.cache.get("a")
+    self.cache.put("c", "3")
+
+    self.assertEqual(self.cache.get("a"), "1")
+    self.assertIsNone(self.cache.get("b"))
+    self.assertEqual(self.cache.stats().evictions, 1)
+
+  def test_evicts_by_size(self):
+    self.cache.put("a", "123456")
+    self.cache.put("b", "12345")
+
+    self.assertIsNone(self.cache.get("a"))
+    self.assertEqual(self.cache.stats().size, 5)
+
+  def test_skips_values_larger_than_cache(self):
+    self.cache.put("a", "12345678901")
+
+    self.assertEqual(len(self.cache), 0)
+
+  def test_expires_entries(self):
+    self.cache.put("a", "1")
+    self.clock.now = 60
+
+    self.assertIsNone(self.cache.get("a"))
+    stats = self.cache.stats()
+    self.assertEqual((stats.entries, stats.expirations), (0, 1))
+
+  def test_content_hash(self):
+    self.assertEqual(content_hash("text"), content_hash("text"))
+    self.assertNotEqual(content_hash("text"), content_hash("text."))
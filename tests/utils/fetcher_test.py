@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+import zlib
+from asynctest import TestCase
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from app.utils.fetcher import (
+  Fetcher, FetchError, BodyTooLargeError, create_session
+)
+
+ARTICLE = b'<html><body><p>The article.</p></body></html>'
+MAX_BODY_SIZE = 1024
+
+
+async def article(request: web.Request) -> web.Response:
+  return web.Response(body=ARTICLE, content_type='text/html')
+
+async def gzipped_article(request: web.Request) -> web.Response:
+  return web.Response(
+    body=gzip.compress(ARTICLE),
+    headers={'Content-Encoding': 'gzip', 'Content-Type': 'text/html'}
+  )
+
+async def deflated_article(request: web.Request) -> web.Response:
+  return web.Response(
+    body=zlib.compress(ARTICLE),
+    headers={'Content-Encoding': 'deflate', 'Content-Type': 'text/html'}
+  )
+
+async def large_page(request: web.Request) -> web.Response:
+  return web.Response(body=b'a' * (MAX_BODY_SIZE + 1))
+
+async def gzip_bomb(request: web.Request) -> web.Response:
+  # Small once compressed, but larger than allowed once decoded
+  return web.Response(
+    body=gzip.compress(b'a' * (MAX_BODY_SIZE * 100)),
+    headers={'Content-Encoding': 'gzip'}
+  )
+
+async def slow_page(request: web.Request) -> web.Response:
+  await asyncio.sleep(1)
+  return web.Response(body=ARTICLE)
+
+async def cached_article(request: web.Request) -> web.Response:
+  if request.headers.get('If-None-Match') == '"v1"':
+    return web.Response(status=304, headers={'ETag': '"v1"'})
+  return web.Response(body=ARTICLE, headers={'ETag': '"v1"'})
+
+async def missing_page(request: web.Request) -> web.Response:
+  return web.Response(status=404)
+
+
+class FetcherTest(TestCase):
+
+  async def setUp(self):
+    app = web.Application()
+    app.router.add_get('/article', article)
+    app.router.add_get('/gzip', gzipped_article)
+    app.router.add_get('/deflate', deflated_article)
+    app.router.add_get('/large', large_page)
+    app.router.add_get('/bomb', gzip_bomb)
+    app.router.add_get('/slow', slow_page)
+    app.router.add_get('/cached', cached_article)
+    app.router.add_get('/missing', missing_page)
+
+    self.server = TestServer(app)
+    await self.server.start_server(loop=self.loop)
+    self.fetcher = Fetcher(
+      create_session(
+        max_connections=10,
+        max_connections_per_host=2,
+        keepalive_timeout=30,
+        connect_timeout=1,
+        read_timeout=0.2
+      ),
+      max_body_size=MAX_BODY_SIZE,
+      timeout=0.5
+    )
+
+  async def tearDown(self):
+    await self.fetcher.close()
+    await self.server.close()
+
+  async def test_fetch(self):
+    page = await self.fetcher.fetch(str(self.server.make_url('/article')))
+
+    self.assertEqual(page.status, 200)
+    self.assertEqual(page.body, ARTICLE)
+
+  async def test_fetch_decodes_body(self):
+    for path in ['/gzip', '/deflate']:
+      page = await self.fetcher.fetch(str(self.server.make_url(path)))
+
+      self.assertEqual(page.body, ARTICLE, path)
+
+  async def test_fetch_reuses_connections(self):
+    for _ in range(3):
+      await self.fetcher.fetch(str(self.server.make_url('/article')))
+
+    self.assertEqual(
+      sum(
+        len(connections)
+        for connections in self.fetcher.session.connector._conns.values()
+      ),
+      1
+    )
+
+  async def test_fetch_too_large(self):
+    for path in ['/large', '/bomb']:
+      with self.assertRaises(BodyTooLargeError, msg=path):
+        await self.fetcher.fetch(str(self.server.make_url(path)))
+
+  async def test_fetch_timeout(self):
+    with self.assertRaises(FetchError):
+      await self.fetcher.fetch(str(self.server.make_url('/slow')))
+
+  async def test_fetch_not_modified(self):
+    url = str(self.server.make_url('/cached'))
+    page = await self.fetcher.fetch(url)
+    revalidated_page = await self.fetcher.fetch(
+      url, {'If-None-Match': page.headers['etag']}
+    )
+
+    self.assertEqual(revalidated_page.status, 304)
+    self.assertEqual(revalidated_page.body, b'')
+
+  async def test_fetch_error_status(self):
+    with self.assertRaises(FetchError):
+      await self.fetcher.fetch(str(self.server.make_url('/missing')))
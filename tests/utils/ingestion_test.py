@@ -0,0 +1,75 @@
+from io import BytesIO
+from asynctest import TestCase
+from app.utils.ingestion import (
+  ContentTooLargeError, check_content_length, read_body, read_html_text
+)
+
+MAX_SIZE = 1024
+
+
+class Content:
+  """
+  Stream of a request body, read in pieces of at most chunk_size bytes
+  """
+
+  def __init__(self, body: bytes, chunk_size: int=7):
+    self.body = BytesIO(body)
+    self.chunk_size = chunk_size
+    self.read_size = 0
+
+  async def read(self, n: int=-1) -> bytes:
+    chunk = self.body.read(min(n, self.chunk_size))
+    self.read_size += len(chunk)
+    return chunk
+
+
+class IngestionTest(TestCase):
+  def test_check_content_length(self):
+    check_content_length(None, MAX_SIZE)
+    check_content_length(MAX_SIZE, MAX_SIZE)
+    with self.assertRaises(ContentTooLargeError):
+      check_content_length(MAX_SIZE + 1, MAX_SIZE)
+
+  async def test_read_body(self):
+    body = b'{"url": "https://example.com"}'
+    self.assertEqual(await read_body(Content(body), MAX_SIZE), body)
+
+  async def test_read_body_too_large(self):
+    content = Content(b'a' * (MAX_SIZE * 10), chunk_size=MAX_SIZE)
+    with self.assertRaises(ContentTooLargeError):
+      await read_body(content, MAX_SIZE)
+    # Stops reading as soon as the body goes over the limit
+    self.assertEqual(content.read_size, MAX_SIZE * 2)
+
+  async def test_read_html_text(self):
+    html = (
+      '<html><head><title>Title</title><style>p {}</style></head>'
+      '<body><p>First <b>sentence</b>.</p><script>var a = 1;</script>'
+      '<p>Second sentence, déjà vu.</p></body></html>'
+    ).encode('utf-8')
+    text = await read_html_text(Content(html), MAX_SIZE, 'utf-8')
+    self.assertEqual(text, 'TitleFirst sentence.Second sentence, déjà vu.')
+
+  async def test_read_html_text_default_encoding(self):
+    html = '<p>Café résumé, déjà vu.</p>'.encode('utf-8')
+    # Split within multi-byte characters
+    text = await read_html_text(Content(html, chunk_size=4), MAX_SIZE)
+    self.assertEqual(text, 'Café résumé, déjà vu.')
+
+  async def test_read_html_text_charset(self):
+    html = '<p>Café résumé.</p>'.encode('iso-8859-1')
+    text = await read_html_text(Content(html), MAX_SIZE, 'iso-8859-1')
+    self.assertEqual(text, 'Café résumé.')
+
+  async def test_read_html_text_unknown_encoding(self):
+    with self.assertRaises(LookupError):
+      await read_html_text(Content(b'<p>Text.</p>'), MAX_SIZE, 'bogus-charset')
+
+  async def test_read_html_text_empty(self):
+    self.assertEqual(await read_html_text(Content(b''), MAX_SIZE), '')
+
+  async def test_read_html_text_too_large(self):
+    content = Content(b'<p>' + b'a' * (MAX_SIZE * 10), chunk_size=MAX_SIZE)
+    with self.assertRaises(ContentTooLargeError):
+      await read_html_text(content, MAX_SIZE)
+    self.assertEqual(content.read_size, MAX_SIZE * 2)
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+from unittest.mock import patch
+from asynctest import TestCase
+from app.utils.page_cache import PageCache, CachedPage
+
+PAGE = CachedPage(
+  "http://www.test.com/article", '"v1"', None, "The article."
+)
+
+
+class PageCacheTest(TestCase):
+
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  async def test_get_and_put(self):
+    cache = PageCache(max_entries=10, max_size=1024)
+    self.assertIsNone(await cache.get(PAGE.url))
+    await cache.put(PAGE)
+
+    self.assertEqual(await cache.get(PAGE.url), PAGE)
+    stats = cache.stats()
+    self.assertEqual((stats.hits, stats.misses), (1, 1))
+
+  async def test_put_without_validators(self):
+    cache = PageCache(max_entries=10, max_size=1024)
+    await cache.put(PAGE._replace(etag=None))
+
+    self.assertIsNone(await cache.get(PAGE.url))
+
+  async def test_conditional_headers(self):
+    cache = PageCache(max_entries=10, max_size=1024)
+    page = PAGE._replace(last_modified="Wed, 21 Oct 2015 07:28:00 GMT")
+
+    self.assertDictEqual(cache.conditional_headers(None), {})
+    self.assertDictEqual(cache.conditional_headers(page), {
+      'If-None-Match': '"v1"',
+      'If-Modified-Since': "Wed, 21 Oct 2015 07:28:00 GMT"
+    })
+
+  async def test_disk_tier(self):
+    cache = PageCache(
+      max_entries=10, max_size=1024,
+      directory=self.directory.name, max_disk_size=1024
+    )
+    await cache.put(PAGE)
+
+    # A new cache (e.g. after a restart) finds the page on disk
+    cache = PageCache(
+      max_entries=10, max_size=1024,
+      directory=self.directory.name, max_disk_size=1024
+    )
+    self.assertEqual(await cache.get(PAGE.url), PAGE)
+    self.assertEqual(await cache.get(PAGE.url), PAGE)
+    stats = cache.stats()
+    self.assertEqual((stats.disk_hits, stats.hits), (1, 1))
+
+  async def test_disk_eviction(self):
+    cache = PageCache(
+      max_entries=0, max_size=0,
+      directory=self.directory.name, max_disk_size=150
+    )
+    await cache.put(PAGE)
+    await cache.put(PAGE._replace(url="http://www.test.com/other"))
+
+    self.assertIsNone(await cache.get(PAGE.url))
+    self.assertIsNotNone(await cache.get("http://www.test.com/other"))
+    self.assertEqual(cache.stats().disk_evictions, 1)
+
+  async def test_disk_write_error(self):
+    cache = PageCache(
+      max_entries=10, max_size=1024,
+      directory=self.directory.name, max_disk_size=1024
+    )
+    with patch('app.utils.page_cache.os.replace', side_effect=OSError):
+      await cache.put(PAGE)
+
+    # The page is still cached in memory
+    self.assertEqual(await cache.get(PAGE.url), PAGE)
+    stats = cache.stats()
+    self.assertEqual(stats.disk_write_errors, 1)
+    self.assertEqual((stats.disk_entries, stats.disk_size), (0, 0))
+    self.assertListEqual(os.listdir(self.directory.name), [])
+
+  async def test_concurrent_disk_writes(self):
+    cache = PageCache(
+      max_entries=0, max_size=0,
+      directory=self.directory.name, max_disk_size=1024 * 1024
+    )
+    await asyncio.gather(*[
+      cache.put(PAGE._replace(text="The article, version {}.".format(i)))
+      for i in range(20)
+    ])
+
+    # A single complete page, and no temporary file left behind
+    self.assertEqual(len(os.listdir(self.directory.name)), 1)
+    page = await cache.get(PAGE.url)
+    self.assertTrue(page.text.startswith("The article, version "))
+    self.assertEqual(cache.stats().disk_write_errors, 0)
@@ -0,0 +1,41 @@
+from datetime import datetime
+from unittest import TestCase
+import pytz
+from psycopg2.tz import FixedOffsetTimezone
+from app.utils.pagination import (
+  MAX_PAGE_SIZE, PaginationError, decode_cursor, encode_cursor, get_limit
+)
+
+ENTRY_ID = '9b2d1c6e-8f8b-4d2a-a1b5-2c3f4e5d6a7b'
+
+
+class PaginationTest(TestCase):
+  def test_cursor(self):
+    # As given by psycopg2 for a TIMESTAMPTZ
+    accessed_at = datetime(
+      2017, 6, 1, 12, 30, 15, 123456,
+      tzinfo=FixedOffsetTimezone(offset=-240)
+    )
+
+    cursor = encode_cursor((accessed_at, ENTRY_ID))
+
+    self.assertNotIn(ENTRY_ID, cursor)
+    decoded_at, decoded_id = decode_cursor(cursor)
+    self.assertEqual(decoded_at, accessed_at)
+    self.assertEqual(decoded_at.tzinfo, pytz.utc)
+    self.assertEqual(decoded_id, ENTRY_ID)
+
+  def test_invalid_cursor(self):
+    for cursor in [
+      '', 'not a cursor', encode_cursor((datetime.now(tz=pytz.utc), 'id'))
+    ]:
+      with self.assertRaises(PaginationError):
+        decode_cursor(cursor)
+
+  def test_limit(self):
+    self.assertEqual(get_limit('10'), 10)
+    self.assertEqual(get_limit(None, 20), 20)
+    self.assertIsNone(get_limit(None, None))
+    for limit in ['0', '-1', 'ten', str(MAX_PAGE_SIZE + 1)]:
+      with self.assertRaises(PaginationError):
+        get_limit(limit)
@@ -0,0 +1,111 @@
+import asyncio
+from asynctest import TestCase
+from app.utils.singleflight import SingleFlight, normalize_url
+
+
+class SingleFlightTest(TestCase):
+
+  def setUp(self):
+    self.flights = SingleFlight()
+    self.calls = 0
+    self.release = asyncio.Event()
+
+  async def summarize(self, url: str) -> str:
+    self.calls += 1
+    await self.release.wait()
+    return "Summary of " + url
+
+  async def fail(self) -> None:
+    self.calls += 1
+    await self.release.wait()
+    raise ValueError("failed")
+
+  async def test_burst(self):
+    requests = [
+      asyncio.ensure_future(self.flights.run("url", self.summarize, "url"))
+      for _ in range(50)
+    ]
+    await asyncio.sleep(0)
+    self.assertEqual(self.flights.stats().in_flight, 1)
+    self.release.set()
+    results = await asyncio.gather(*requests)
+
+    self.assertEqual(self.calls, 1)
+    self.assertListEqual(results, ["Summary of url"] * 50)
+    self.assertEqual(self.flights.stats(), SingleFlight.Stats(0, 1, 49))
+
+  async def test_burst_of_different_keys(self):
+    requests = [
+      asyncio.ensure_future(self.flights.run(url, self.summarize, url))
+      for url in ["a", "b", "a", "b"]
+    ]
+    await asyncio.sleep(0)
+    self.release.set()
+    results = await asyncio.gather(*requests)
+
+    self.assertEqual(self.calls, 2)
+    self.assertListEqual(
+      results,
+      ["Summary of a", "Summary of b", "Summary of a", "Summary of b"]
+    )
+
+  async def test_burst_failure(self):
+    requests = [
+      asyncio.ensure_future(self.flights.run("url", self.fail))
+      for _ in range(10)
+    ]
+    await asyncio.sleep(0)
+    self.release.set()
+    results = await asyncio.gather(*requests, return_exceptions=True)
+
+    self.assertEqual(self.calls, 1)
+    for result in results:
+      self.assertIsInstance(result, ValueError)
+
+  async def test_cancel_one_caller(self):
+    first = asyncio.ensure_future(
+      self.flights.run("url", self.summarize, "url")
+    )
+    second = asyncio.ensure_future(
+      self.flights.run("url", self.summarize, "url")
+    )
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    self.release.set()
+
+    self.assertEqual(await second, "Summary of url")
+    self.assertTrue(first.cancelled())
+    self.assertEqual(self.calls, 1)
+
+  async def test_cancel_every_caller(self):
+    requests = [
+      asyncio.ensure_future(self.flights.run("url", self.summarize, "url"))
+      for _ in range(3)
+    ]
+    await asyncio.sleep(0)
+    call = self.flights.calls["url"]
+    for request in requests:
+      request.cancel()
+    await asyncio.gather(*requests, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    self.assertTrue(call.task.cancelled())
+    self.assertEqual(self.flights.stats().in_flight, 0)
+
+    # A later call starts over
+    self.release.set()
+    self.assertEqual(
+      await self.flights.run("url", self.summarize, "url"), "Summary of url"
+    )
+    self.assertEqual(self.calls, 2)
+
+  def test_normalize_url(self):
+    self.assertEqual(
+      normalize_url(" HTTP://Www.Test.com:80/Article?id=1#comments "),
+      "http://www.test.com/Article?id=1"
+    )
+    self.assertEqual(
+      normalize_url("https://www.test.com"),
+      normalize_url("https://www.test.com:443/")
+    )
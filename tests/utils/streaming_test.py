@@ -0,0 +1,23 @@
+from asynctest import TestCase, MagicMock, CoroutineMock
+from app.utils.streaming import write_line, write_event
+
+
+class StreamingTest(TestCase):
+
+  def setUp(self):
+    self.response = MagicMock()
+    self.response.drain = CoroutineMock()
+
+  async def test_write_line(self):
+    await write_line(self.response, {'url': 'http://a.test'})
+
+    self.response.write.assert_called_once_with(b'{"url": "http://a.test"}\n')
+    self.response.drain.assert_called_once()
+
+  async def test_write_event(self):
+    await write_event(self.response, 'done', {'status': 200})
+
+    self.response.write.assert_called_once_with(
+      b'event: done\ndata: {"status": 200}\n\n'
+    )
+    self.response.drain.assert_called_once()
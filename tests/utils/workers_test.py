@@ -0,0 +1,53 @@
+import asyncio
+import time
+from asynctest import TestCase
+from app.utils.workers import WorkerPool
+from app.summarizers import Summarizer
+
+
+def fail():
+  raise ValueError("failed")
+
+
+class WorkerPoolTest(TestCase):
+
+  async def test_run(self):
+    pool = WorkerPool(2)
+    try:
+      summaries = await pool.run(
+        Summarizer.summarize_payload,
+        "The first sentence of the text. The second one.".encode("utf-8"),
+        ("FREQUENCY", "LUHN")
+      )
+    finally:
+      pool.shutdown()
+
+    self.assertListEqual(list(summaries.keys()), ["FREQUENCY", "LUHN"])
+    stats = pool.stats()
+    self.assertEqual((stats.pending, stats.completed), (0, 1))
+
+  async def test_run_inline(self):
+    pool = WorkerPool(0)
+    result = await pool.run(sum, [1, 2, 3])
+
+    self.assertEqual(result, 6)
+    self.assertEqual(pool.stats().completed, 1)
+
+  async def test_run_failure(self):
+    pool = WorkerPool(0)
+    with self.assertRaises(ValueError):
+      await pool.run(fail)
+
+    stats = pool.stats()
+    self.assertEqual((stats.pending, stats.failed), (0, 1))
+
+  async def test_run_timeout(self):
+    pool = WorkerPool(1, timeout=0.1)
+    try:
+      with self.assertRaises(asyncio.TimeoutError):
+        await pool.run(time.sleep, 1)
+    finally:
+      pool.shutdown()
+
+    stats = pool.stats()
+    self.assertEqual((stats.pending, stats.timeouts), (0, 1))